@@ -0,0 +1,174 @@
+"""Async versions of the read-only views for the affiliations service.
+
+These views run on the event loop when the service is served over ASGI (Daphne), so a
+slow client doesn't hold on to a thread while it waits. They return the same data,
+in the same format, as the matching views in `affiliations.views`. The change event
+stream, which holds its connection open, is only served here.
+
+Django can't wrap async views in a transaction, so they opt out of `ATOMIC_REQUESTS`.
+They only read, so they don't need one.
+"""
+
+# Built-in libraries:
+from functools import wraps
+
+# Third-party dependencies:
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET, require_safe
+
+# In-house code:
+from affiliations.events import event_stream
+from affiliations.legacy import (
+    abuild_legacy_affiliations,
+    alegacy_affiliations_snapshot,
+    legacy_affiliations,
+    render_legacy_json,
+    stream_legacy_json,
+)
+from affiliations.models import Affiliation, ClinicalDomainWorkingGroup
+from affiliations.permissions import (
+    HasAffilsAPIKey,
+    get_verified_api_key,
+    is_usable_api_key,
+)
+from affiliations.renderers import FastJSONRenderer
+from affiliations.serializers import (
+    AffiliationSerializer,
+    ClinicalDomainWorkingGroupSerializer,
+)
+from affiliations.streaming import streaming_json_response, wants_stream
+from affiliations.versioning import async_conditional_on_dataset_version
+
+
+def render_json(data, status: int = 200) -> HttpResponse:
+    """Render serialized data the way the DRF views do."""
+    return HttpResponse(
+        FastJSONRenderer().render(data), status=status, content_type="application/json"
+    )
+
+
+def error_response(detail: str, status: int) -> HttpResponse:
+    """Return an error in the same format as `custom_exception_handler`."""
+    return render_json(
+        {"error": "Request Failed", "details": {"detail": detail}}, status=status
+    )
+
+
+def async_api_key_required(view_func):
+    """Only let requests with a usable API key through, like `HasAffilsAPIKey`."""
+
+    @wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        raw_key = HasAffilsAPIKey.key_parser.get(request)
+        if not raw_key or not is_usable_api_key(
+            await sync_to_async(get_verified_api_key)(raw_key)
+        ):
+            return error_response("Authentication credentials were not provided.", 403)
+        return await view_func(request, *args, **kwargs)
+
+    return wrapper
+
+
+@transaction.non_atomic_requests
+@require_safe
+@async_api_key_required
+@async_conditional_on_dataset_version
+async def affiliations_list_json_format(request):
+    """List all affiliations in old JSON format."""
+    if wants_stream(request):
+        return streaming_json_response(
+            request, stream_legacy_json(legacy_affiliations())
+        )
+    return HttpResponse(
+        await alegacy_affiliations_snapshot(), content_type="application/json"
+    )
+
+
+@transaction.non_atomic_requests
+@require_safe
+@async_api_key_required
+@async_conditional_on_dataset_version
+async def affiliation_detail_json_format(request):
+    """List specific affiliation in old JSON format."""
+    affil_id = request.GET.get("affil_id")
+    return HttpResponse(
+        render_legacy_json(
+            await abuild_legacy_affiliations(
+                legacy_affiliations().filter(affiliation_id=affil_id)
+            )
+        ),
+        content_type="application/json",
+    )
+
+
+@transaction.non_atomic_requests
+@require_safe
+@async_conditional_on_dataset_version
+async def affiliation_detail_by_uuid(request, uuid):  # pylint: disable=unused-argument
+    """Look up an affiliation by its UUID."""
+    queryset = AffiliationSerializer.setup_eager_loading(Affiliation.objects.all())
+    try:
+        affiliation = await queryset.filter(uuid=uuid).afirst()
+    except ValidationError:
+        affiliation = None
+    if affiliation is None:
+        return error_response("No Affiliation matches the given query.", 404)
+    return render_json(AffiliationSerializer(affiliation).data)
+
+
+@transaction.non_atomic_requests
+@require_safe
+@async_api_key_required
+@async_conditional_on_dataset_version
+async def cdwg_list(request):  # pylint: disable=unused-argument
+    """List all CDWGs."""
+    cdwgs = [cdwg async for cdwg in ClinicalDomainWorkingGroup.objects.all()]
+    return render_json(ClinicalDomainWorkingGroupSerializer(cdwgs, many=True).data)
+
+
+@transaction.non_atomic_requests
+@require_safe
+@async_api_key_required
+@async_conditional_on_dataset_version
+async def cdwg_detail(request, **kwargs):  # pylint: disable=unused-argument
+    """List a single CDWG, lookup by either name or ID."""
+    if "id" in kwargs:
+        cdwg = await ClinicalDomainWorkingGroup.objects.filter(id=kwargs["id"]).afirst()
+        missing = "A CDWG with that ID does not exist."
+    else:
+        cdwg = await ClinicalDomainWorkingGroup.objects.filter(
+            name=kwargs["name"]
+        ).afirst()
+        missing = "A CDWG with that name does not exist."
+    if cdwg is None:
+        return error_response(missing, 404)
+    return render_json(ClinicalDomainWorkingGroupSerializer(cdwg).data)
+
+
+@transaction.non_atomic_requests
+@require_GET
+@async_api_key_required
+async def affiliation_events(request):
+    """Stream a change event whenever an affiliation or a CDWG changes.
+
+    Clients resume with the `Last-Event-ID` header, or the `last_event_id` query
+    parameter, and are first sent the events they missed.
+    """
+    last_event_id = request.headers.get(
+        "Last-Event-ID", request.GET.get("last_event_id")
+    )
+    if last_event_id is not None:
+        try:
+            last_event_id = int(last_event_id)
+        except ValueError:
+            return error_response("Last-Event-ID must be an event ID.", 400)
+    response = StreamingHttpResponse(
+        event_stream(last_event_id), content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    # Keep proxies from holding back events until they have a buffer's worth.
+    response["X-Accel-Buffering"] = "no"
+    return response
@@ -0,0 +1,108 @@
+"""Find the affiliations that changed since a client last synced.
+
+Affiliations are walked through in `(updated_at, pk)` order. A cursor records the
+position of the last affiliation a client was sent, so the next request only reads
+the affiliations that changed after it, using the index on those columns.
+"""
+
+# Built-in libraries:
+import base64
+import binascii
+from datetime import datetime, timedelta
+
+# Third-party dependencies:
+from django.db import connection
+from django.db.models import Q, QuerySet
+from django.utils import timezone
+
+# In-house code:
+from affiliations.models import Affiliation
+
+# How many changed affiliations are returned at a time, by default and at most.
+CHANGES_PAGE_SIZE = 100
+MAX_CHANGES_PAGE_SIZE = 1000
+
+# Changes newer than this are held back until the next request. A write's timestamp
+# is taken before its transaction commits, so without this a write that commits late
+# could land behind a cursor that has already been handed out. It also allows for the
+# clocks of the web servers and the database being a little apart.
+CHANGES_SETTLE_TIME = timedelta(seconds=5)
+
+# When the oldest transaction that has written and is still open on another
+# connection started. A write in that transaction can't have a timestamp much older
+# than this. Transactions that only read, like a long GET or a backup, don't count.
+OLDEST_WRITE_SQL = """
+    SELECT min(xact_start) FROM pg_stat_activity
+    WHERE datname = current_database()
+    AND backend_type = 'client backend'
+    AND backend_xid IS NOT NULL
+    AND pid <> pg_backend_pid()
+"""
+
+
+def touch_affiliations(pks) -> None:
+    """Mark the affiliations as changed, e.g. because one of their children did."""
+    Affiliation.objects.filter(pk__in=pks).update(updated_at=timezone.now())
+
+
+def encode_cursor(updated_at: datetime, pk: int) -> str:
+    """Return an opaque cursor for the position of an affiliation."""
+    position = f"{updated_at.isoformat()}|{pk}"
+    return base64.urlsafe_b64encode(position.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Return the `(updated_at, pk)` position in a cursor.
+
+    Raises ValueError if the cursor wasn't made by `encode_cursor`.
+    """
+    try:
+        position = base64.urlsafe_b64decode(cursor.encode()).decode()
+        updated_at, pk = position.split("|")
+        return datetime.fromisoformat(updated_at), int(pk)
+    except (binascii.Error, UnicodeError, ValueError) as error:
+        raise ValueError("Invalid cursor.") from error
+
+
+def oldest_write() -> datetime | None:
+    """Return when the oldest transaction that is still writing started.
+
+    On PostgreSQL, a write in that transaction, however long it has been waiting,
+    e.g. on a lock, was made after this. Elsewhere, None is returned.
+    """
+    if connection.vendor != "postgresql":
+        return None
+    with connection.cursor() as cursor:
+        # The activity is otherwise read once per transaction.
+        cursor.execute("SELECT pg_stat_clear_snapshot()")
+        cursor.execute(OLDEST_WRITE_SQL)
+        (oldest,) = cursor.fetchone()
+    return oldest
+
+
+def changes_horizon() -> datetime:
+    """Return the time before which every change has been committed.
+
+    That's the settle time ago, or before the oldest transaction that is still
+    writing, if that's earlier.
+    """
+    horizon = timezone.now() - CHANGES_SETTLE_TIME
+    oldest = oldest_write()
+    if oldest is not None:
+        horizon = min(horizon, oldest - CHANGES_SETTLE_TIME)
+    return horizon
+
+
+def changed_affiliations(since: tuple[datetime, int] | None = None) -> QuerySet:
+    """Return the affiliations that changed after the position, oldest change first.
+
+    Without a position, every affiliation is returned. Changes after the horizon are
+    left for a later request, so none land behind a cursor once it's handed out.
+    """
+    queryset = Affiliation.objects.filter(updated_at__lt=changes_horizon())
+    if since is not None:
+        updated_at, pk = since
+        queryset = queryset.filter(updated_at__gte=updated_at).filter(
+            Q(updated_at__gt=updated_at) | Q(pk__gt=pk)
+        )
+    return queryset.order_by("updated_at", "pk")
@@ -0,0 +1,208 @@
+"""Apply one-off fixes to many rows at once, with a dry run and a summary.
+
+A fix picks the rows it applies to with `filter`, and says what each row should become
+with either `transform`, which runs in Python, or `update`, which runs in the database.
+The changes are worked out in one pass over the rows, then written with a single
+`bulk_update`, or a single SQL `UPDATE`, in one transaction.
+
+For example, to uppercase the short names of GCEPs:
+
+    class UppercaseShortNames(DataFix):
+        fields = ["short_name"]
+        filter = Q(type="GCEP")
+
+        def transform(self, obj):
+            return {"short_name": obj.short_name.upper()}
+
+    print_summary(apply_fix(UppercaseShortNames(), dry_run=True))
+"""
+
+# Built-in libraries:
+from typing import Any
+
+# Third-party dependencies:
+from django.db import models, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+# In-house code:
+from affiliations.events import change_event, record_changes
+from affiliations.models import (
+    Affiliation,
+    ChangeKind,
+    ClinicalDomainWorkingGroup,
+    TimestampedModel,
+)
+from affiliations.versioning import bump_dataset_version
+
+# How many rows are read, and written, at a time.
+BATCH_SIZE = 500
+
+# How many of the changes are printed in a summary.
+SHOWN_CHANGES = 20
+
+
+class DataFix:
+    """Describe a change to make to many rows of a model.
+
+    Set `update` to a dict of field names to expressions, e.g.
+    `{"full_name": Upper("full_name")}`, to apply the fix with a single `UPDATE`.
+    Then `filter` has to leave out the rows that are already right. Otherwise, override
+    `transform`, and rows that are already right are skipped.
+    """
+
+    #: The model whose rows are fixed.
+    model: type[models.Model] = Affiliation
+    #: The fields the fix can change.
+    fields: list[str] = []
+    #: Which rows the fix applies to.
+    filter: Q = Q()
+    #: The new values, as database expressions, or None to use `transform`.
+    update: dict[str, Any] | None = None
+
+    @property
+    def name(self) -> str:
+        """Name the fix in summaries."""
+        return type(self).__name__
+
+    def get_queryset(self) -> models.QuerySet:
+        """Return the rows the fix applies to."""
+        return self.model.objects.filter(self.filter).order_by("pk")
+
+    def transform(self, obj) -> dict[str, Any]:  # pylint: disable=unused-argument
+        """Return the new values of the fields for the object.
+
+        Fixes that don't set `update` override this. By default nothing changes.
+        """
+        return {}
+
+
+def apply_fix(fix: DataFix, dry_run: bool = False) -> dict:
+    """Work out the changes the fix makes, and save them unless it's a dry run.
+
+    Returns a summary with the number of rows "checked" and "changed", whether it
+    was a "dry_run", and the "changes" as (pk, {field: (old, new)}) pairs.
+    """
+    queryset = fix.get_queryset()
+    if not dry_run:
+        # Lock the rows until the changes are saved, so the changes that are saved
+        # are the ones in the summary.
+        queryset = queryset.select_for_update()
+
+    with transaction.atomic():
+        if fix.update is not None:
+            checked, changes = sql_changes(fix, queryset)
+        else:
+            checked, changes, objs = python_changes(fix, queryset)
+
+        if changes and not dry_run:
+            # Neither bulk_update nor update sets `updated_at`, or sends the signals
+            # that bump the dataset version and record change events.
+            stamp = {}
+            if issubclass(fix.model, TimestampedModel):
+                stamp["updated_at"] = timezone.now()
+            if fix.update is not None:
+                fix.get_queryset().update(**fix.update, **stamp)
+            else:
+                fields = [
+                    field
+                    for field in fix.fields
+                    if any(field in changed for _, changed in changes)
+                ]
+                for obj in objs:
+                    for field, value in stamp.items():
+                        setattr(obj, field, value)
+                fix.model.objects.bulk_update(
+                    objs, [*fields, *stamp], batch_size=BATCH_SIZE
+                )
+            bump_dataset_version()
+            record_changes(change_events(fix, [pk for pk, _ in changes]))
+
+    return {
+        "fix": fix.name,
+        "checked": checked,
+        "changed": len(changes),
+        "dry_run": dry_run,
+        "changes": changes,
+    }
+
+
+def change_events(fix: DataFix, pks: list) -> list:
+    """Build a change event for each changed affiliation or CDWG.
+
+    Fixes to other models change nothing that is streamed to clients.
+    """
+    if fix.model is Affiliation:
+        return [
+            change_event(ChangeKind.UPDATED, affil)
+            for affil in Affiliation.objects.filter(pk__in=pks).only(
+                "affiliation_id", "expert_panel_id", "uuid"
+            )
+        ]
+    if fix.model is ClinicalDomainWorkingGroup:
+        return [
+            change_event(ChangeKind.CDWG_UPDATED, cdwg=cdwg)
+            for cdwg in ClinicalDomainWorkingGroup.objects.filter(pk__in=pks).only("pk")
+        ]
+    return []
+
+
+def python_changes(fix: DataFix, queryset: models.QuerySet) -> tuple[int, list, list]:
+    """Run the fix's transform on each row, and keep the rows it changes.
+
+    Returns the number of rows checked, the changes, and the changed objects.
+    """
+    checked = 0
+    changes = []
+    objs = []
+    for obj in queryset.iterator(chunk_size=BATCH_SIZE):
+        checked += 1
+        changed = {
+            field: (getattr(obj, field), value)
+            for field, value in fix.transform(obj).items()
+            if getattr(obj, field) != value
+        }
+        if changed:
+            for field, (_, value) in changed.items():
+                setattr(obj, field, value)
+            changes.append((obj.pk, changed))
+            objs.append(obj)
+    return checked, changes, objs
+
+
+def sql_changes(fix: DataFix, queryset: models.QuerySet) -> tuple[int, list]:
+    """Have the database work out the fix's new values, without saving them.
+
+    Returns the number of rows checked, and the changes.
+    """
+    update = fix.update or {}
+    new_names = {field: f"new_{field}" for field in update}
+    rows = queryset.annotate(
+        **{new_names[field]: value for field, value in update.items()}
+    ).values("pk", *update, *new_names.values())
+    checked = 0
+    changes = []
+    for row in rows.iterator(chunk_size=BATCH_SIZE):
+        checked += 1
+        changed = {
+            field: (row[field], row[new_name])
+            for field, new_name in new_names.items()
+            if row[field] != row[new_name]
+        }
+        if changed:
+            changes.append((row["pk"], changed))
+    return checked, changes
+
+
+def print_summary(summary: dict) -> None:
+    """Print how many rows the fix checked and changed, and some of the changes."""
+    outcome = "would change" if summary["dry_run"] else "changed"
+    print(
+        f"{summary['fix']}: checked {summary['checked']} rows,"
+        f" {outcome} {summary['changed']}."
+    )
+    for pk, changed in summary["changes"][:SHOWN_CHANGES]:
+        for field, (old, new) in changed.items():
+            print(f"  {pk} {field}: {old!r} -> {new!r}")
+    if summary["changed"] > SHOWN_CHANGES:
+        print(f"  ... and {summary['changed'] - SHOWN_CHANGES} more.")
@@ -0,0 +1,75 @@
+"""Encode JSON with orjson when it's installed, and the standard library otherwise.
+
+The output is byte for byte the same either way, so orjson is only a speed-up. It's
+an optional dependency; install it with `pipenv install orjson`.
+"""
+
+# Built-in libraries:
+import json
+from collections.abc import Callable
+from typing import Any
+
+# Third-party dependencies:
+from django.core.serializers.json import DjangoJSONEncoder
+
+try:
+    import orjson  # pylint: disable=import-error
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore
+
+# Dates and times are handed to the `default` function rather than encoded by orjson,
+# which formats them differently from the standard library encoders.
+ORJSON_OPTIONS = (
+    orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME if orjson else 0
+)
+
+# Encodes what JSON has no type for, like dates, the way the legacy views do.
+django_default = DjangoJSONEncoder().default
+
+
+def dumps_compact(data: Any, default: Callable[[Any], Any]) -> bytes | None:
+    """Encode JSON without whitespace and without escaping non-ASCII characters.
+
+    Returns None if orjson isn't installed, or can't encode the data the way the
+    standard library would, e.g. integers too big for 64 bits. `default` is called
+    for the objects JSON has no type for, like a `JSONEncoder.default` method.
+    Floats aren't part of any response, and orjson writes some of them differently.
+    """
+    if orjson is None:
+        return None
+    try:
+        return orjson.dumps(data, default=default, option=ORJSON_OPTIONS)
+    except orjson.JSONEncodeError:
+        return None
+
+
+def dumps_legacy(data: Any) -> bytes:
+    """Encode JSON the way the legacy views always have.
+
+    That is `json.dumps` with `DjangoJSONEncoder`, without escaping non-ASCII
+    characters, encoded as UTF-8. Lists are encoded an element at a time, which is
+    quicker with orjson than collapsing one large buffer.
+    """
+    if orjson is not None:
+        try:
+            if isinstance(data, list):
+                return b"[" + b", ".join(map(_orjson_legacy, data)) + b"]"
+            return _orjson_legacy(data)
+        except orjson.JSONEncodeError:
+            pass
+    return json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False).encode("utf-8")
+
+
+def _orjson_legacy(data: Any) -> bytes:
+    """Encode JSON with orjson, with the standard library's `", "` and `": "`.
+
+    orjson only writes separators with spaces when it indents, and indented output
+    only has newlines between tokens, as newlines in strings are escaped. So the
+    newlines and indentation can be taken out, leaving a space after each comma.
+    """
+    indented = orjson.dumps(
+        data,
+        default=django_default,
+        option=ORJSON_OPTIONS | orjson.OPT_INDENT_2,
+    )
+    return b"".join(map(bytes.lstrip, indented.replace(b",\n", b", \n").split(b"\n")))
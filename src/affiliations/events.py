@@ -0,0 +1,273 @@
+"""Push a compact event to clients whenever an affiliation or a CDWG changes.
+
+Changes are recorded as `ChangeEvent` rows in the same transaction. Each process runs
+a single `ChangeBroadcaster`, which polls for new rows on behalf of every client that
+is connected to it, and hands each client the new events through a queue of its own.
+The events are sent as server-sent events, with the row ID as the event ID, so a
+client that reconnects with `Last-Event-ID` is sent the events it missed from the
+database.
+
+A client that can't keep up fills its queue. Its stream is then ended rather than
+letting the queue grow, and it catches up from the database when it reconnects.
+"""
+
+# Built-in libraries:
+import asyncio
+import json
+import logging
+import time
+from collections.abc import AsyncIterator, Iterable
+from datetime import timedelta
+
+# Third-party dependencies:
+from asgiref.sync import sync_to_async
+from django.db import DatabaseError
+from django.db.models import BooleanField, ExpressionWrapper, Q
+from django.db.models.functions import Now
+
+# In-house code:
+from affiliations.changes import oldest_write
+from affiliations.models import ChangeEvent, ChangeKind
+
+logger = logging.getLogger(__name__)
+
+# How often the database is checked for new events, in seconds.
+EVENT_POLL_INTERVAL = 1.0
+# How many events are read from the database at a time.
+EVENT_BATCH_SIZE = 500
+# How many events can wait to be sent to a client before its stream is ended.
+EVENT_BUFFER_SIZE = 100
+# Events newer than this are held back until the next check. An event's ID is taken
+# before its transaction commits, so this keeps a slightly later commit with a lower
+# ID from being skipped.
+EVENT_SETTLE_TIME = timedelta(seconds=1)
+# How long events are kept for clients to catch up on, and how often, in seconds,
+# older ones are deleted.
+EVENT_RETENTION = timedelta(days=7)
+EVENT_PRUNE_INTERVAL = 60 * 60
+# How often, in seconds, an idle stream sends a comment to keep the connection open.
+HEARTBEAT_INTERVAL = 15
+# How long, in milliseconds, clients wait before reconnecting.
+RECONNECT_DELAY = 5000
+
+# Put on a client's queue when it has fallen too far behind.
+OVERFLOW = None
+
+
+def record_change(kind: str, affiliation=None, cdwg=None) -> None:
+    """Record a change to an affiliation or a CDWG with the current transaction."""
+    record_changes([change_event(kind, affiliation, cdwg)])
+
+
+def record_changes(events: list[ChangeEvent]) -> None:
+    """Save the change events in the current transaction.
+
+    They're committed with the changes, and rolled back with them too.
+    """
+    if events:
+        ChangeEvent.objects.bulk_create(events)
+
+
+def change_event(kind: str, affiliation=None, cdwg=None) -> ChangeEvent:
+    """Build an unsaved change event for an affiliation or a CDWG."""
+    if cdwg is not None:
+        return ChangeEvent(kind=kind, cdwg_id=cdwg.pk)
+    return ChangeEvent(
+        kind=kind,
+        affiliation_id=affiliation.affiliation_id,
+        expert_panel_id=affiliation.expert_panel_id,
+        uuid=affiliation.uuid,
+    )
+
+
+def affiliation_change_kind(affiliation, created: bool) -> str:
+    """Return the kind of change a save made to the affiliation."""
+    if created:
+        return ChangeKind.CREATED
+    if affiliation.is_deleted:
+        return ChangeKind.DELETED
+    return ChangeKind.UPDATED
+
+
+def format_event(event: ChangeEvent) -> str:
+    """Format a change event as a server-sent event."""
+    if event.cdwg_id is not None:
+        data = {"kind": event.kind, "cdwg_id": event.cdwg_id}
+    else:
+        data = {
+            "kind": event.kind,
+            "affiliation_id": event.affiliation_id,
+            "expert_panel_id": event.expert_panel_id,
+            "uuid": str(event.uuid) if event.uuid else None,
+        }
+    return (
+        f"id: {event.pk}\nevent: change\n"
+        f"data: {json.dumps(data, separators=(',', ':'))}\n\n"
+    )
+
+
+async def settled_condition() -> Q:
+    """Return the condition that the change events that are settled meet."""
+    condition = Q(created_at__lt=Now() - EVENT_SETTLE_TIME)
+    oldest = await sync_to_async(oldest_write)()
+    if oldest is not None:
+        condition &= Q(created_at__lt=oldest - EVENT_SETTLE_TIME)
+    return condition
+
+
+async def settled_position() -> int:
+    """Return the ID of the newest settled change event, or 0 if there are none.
+
+    Only the events before the first one that isn't settled count, since an event
+    with an ID between them may still be committed.
+    """
+    events = ChangeEvent.objects.all()
+    unsettled = (
+        await events.exclude(await settled_condition())
+        .order_by("pk")
+        .values_list("pk", flat=True)
+        .afirst()
+    )
+    if unsettled is not None:
+        events = events.filter(pk__lt=unsettled)
+    return await events.order_by("-pk").values_list("pk", flat=True).afirst() or 0
+
+
+async def settled_events(after: int) -> list[ChangeEvent]:
+    """Return the settled change events after the ID, oldest first."""
+    settled_before = await settled_condition()
+    events = (
+        ChangeEvent.objects.filter(pk__gt=after)
+        .annotate(
+            settled=ExpressionWrapper(settled_before, output_field=BooleanField())
+        )
+        .order_by("pk")[:EVENT_BATCH_SIZE]
+    )
+    settled = []
+    async for event in events:
+        # Stop at the first event that isn't settled, so none are skipped.
+        if not event.settled:
+            break
+        settled.append(event)
+    return settled
+
+
+async def prune_events() -> None:
+    """Delete the change events that are older than the retention period."""
+    await ChangeEvent.objects.filter(created_at__lt=Now() - EVENT_RETENTION).adelete()
+
+
+class ChangeBroadcaster:
+    """Poll for new change events once, and hand them to every subscriber.
+
+    Polling starts with the first subscriber and stops after the last one leaves.
+    """
+
+    def __init__(
+        self,
+        poll_interval: float = EVENT_POLL_INTERVAL,
+        buffer_size: int = EVENT_BUFFER_SIZE,
+    ):
+        self.poll_interval = poll_interval
+        self.buffer_size = buffer_size
+        self.subscribers: set[asyncio.Queue] = set()
+        #: The ID up to which events have been handed to the subscribers.
+        self.position = 0
+        self._task: asyncio.Task | None = None
+        self._next_prune = 0.0
+
+    def _polling(self) -> bool:
+        """Return whether this event loop is already polling for events."""
+        return (
+            self._task is not None
+            and not self._task.done()
+            and self._task.get_loop() is asyncio.get_running_loop()
+        )
+
+    async def subscribe(self) -> tuple[asyncio.Queue, int]:
+        """Return a queue that is sent every new event, and the position it starts at.
+
+        Events up to and including the position aren't sent to the queue.
+        """
+        if not self._polling():
+            position = await settled_position()
+            # Another subscriber may have started polling in the meantime.
+            if not self._polling():
+                self.position = position
+                self._task = asyncio.create_task(self._poll())
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.buffer_size)
+        self.subscribers.add(queue)
+        return queue, self.position
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        """Stop sending events to the queue."""
+        self.subscribers.discard(queue)
+
+    def publish(self, events: Iterable[ChangeEvent]) -> None:
+        """Hand the events to every subscriber, dropping the ones that fall behind."""
+        for event in events:
+            self.position = event.pk
+            for queue in list(self.subscribers):
+                try:
+                    queue.put_nowait(event)
+                except asyncio.QueueFull:
+                    self.unsubscribe(queue)
+                    while not queue.empty():
+                        queue.get_nowait()
+                    queue.put_nowait(OVERFLOW)
+
+    async def _poll(self) -> None:
+        """Check for new events until there are no subscribers left."""
+        while self.subscribers:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                self.publish(await settled_events(self.position))
+                if time.monotonic() >= self._next_prune:
+                    self._next_prune = time.monotonic() + EVENT_PRUNE_INTERVAL
+                    await prune_events()
+            except DatabaseError:
+                logger.exception("Couldn't check for change events.")
+
+
+broadcaster = ChangeBroadcaster()
+
+
+async def event_stream(
+    last_event_id: int | None = None, source: ChangeBroadcaster = broadcaster
+) -> AsyncIterator[str]:
+    """Yield the change events as server-sent events, for as long as the client stays.
+
+    With `last_event_id`, the events after it are sent first. If that event has
+    already been deleted, some of the ones after it may have been too, so a "reset"
+    event is sent, and the client should sync again in full. If the client falls
+    behind, an "overflow" event is sent and the stream ends, and the client should
+    reconnect.
+    """
+    queue, position = await source.subscribe()
+    try:
+        yield f"retry: {RECONNECT_DELAY}\n\n"
+        if last_event_id is not None:
+            if (
+                last_event_id
+                and not await ChangeEvent.objects.filter(pk=last_event_id).aexists()
+            ):
+                yield "event: reset\ndata: {}\n\n"
+            missed = ChangeEvent.objects.filter(
+                pk__gt=last_event_id, pk__lte=position
+            ).order_by("pk")
+            async for event in missed.aiterator(chunk_size=EVENT_BATCH_SIZE):
+                yield format_event(event)
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), HEARTBEAT_INTERVAL)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if event is OVERFLOW:
+                yield "event: overflow\ndata: {}\n\n"
+                return
+            # The feed may start before the last event the client got.
+            if last_event_id is None or event.pk > last_event_id:
+                yield format_event(event)
+    finally:
+        source.unsubscribe(queue)
@@ -0,0 +1,121 @@
+"""Stream admin exports to the client instead of building the whole file in memory.
+
+django-import-export builds every row into a `tablib.Dataset`, then renders the whole
+file into a string before it responds. For the formats below, rows are fetched from
+the database a chunk at a time instead, and each chunk is sent as soon as it's
+rendered. XLSX files can't be sent in pieces, so they're written to a temporary file
+that is streamed from disk.
+"""
+
+# Built-in libraries:
+import csv
+import io
+import json
+import tempfile
+from collections.abc import Iterable, Iterator
+
+# Third-party dependencies:
+from django.http import FileResponse, HttpResponseBase
+from import_export.formats import base_formats  # type: ignore
+from tablib.formats._json import serialize_objects_handler  # type: ignore
+
+# In-house code:
+from affiliations.streaming import (
+    STREAM_CHUNK_SIZE,
+    batched,
+    json_array_chunks,
+    streaming_response,
+)
+
+# The export formats that are streamed. Any other format is exported as usual.
+STREAMED_FORMATS = (
+    base_formats.CSV,
+    base_formats.TSV,
+    base_formats.JSON,
+    base_formats.XLSX,
+)
+
+
+def export_rows(resource, queryset, export_fields=None, **kwargs) -> Iterator[list]:
+    """Yield the exported values of each row, fetching rows a chunk at a time."""
+    fields = resource.get_export_fields(export_fields)
+    rows = resource.filter_export(queryset, **kwargs)
+    for instance in rows.iterator(chunk_size=STREAM_CHUNK_SIZE):
+        yield [resource.export_field(field, instance, **kwargs) for field in fields]
+
+
+def csv_chunks(
+    headers: list[str], rows: Iterable[list], delimiter: str = ","
+) -> Iterator[bytes]:
+    """Encode the rows as CSV, a chunk of rows at a time, after a header row."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=delimiter)
+
+    def flush() -> bytes:
+        chunk = buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+        return chunk
+
+    writer.writerow(headers)
+    yield flush()
+    for batch in batched(rows, STREAM_CHUNK_SIZE):
+        writer.writerows(batch)
+        yield flush()
+
+
+def json_chunks(headers: list[str], rows: Iterable[list]) -> Iterator[bytes]:
+    """Encode the rows as a JSON array of objects, the way tablib does."""
+
+    def encode(row: list) -> bytes:
+        return json.dumps(
+            dict(zip(headers, row)),
+            default=serialize_objects_handler,
+            ensure_ascii=False,
+        ).encode()
+
+    return json_array_chunks(batched(rows, STREAM_CHUNK_SIZE), encode, b", ")
+
+
+def xlsx_file(headers: list[str], rows: Iterable[list]):
+    """Write the rows to a temporary XLSX file, one row at a time."""
+    # openpyxl is only installed when XLSX exports are available.
+    # pylint: disable-next=import-outside-toplevel,import-error
+    import openpyxl  # type: ignore
+
+    # pylint: disable-next=import-outside-toplevel,import-error
+    from openpyxl.utils.exceptions import IllegalCharacterError  # type: ignore
+
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(headers)
+    try:
+        for row in rows:
+            sheet.append(row)
+    except IllegalCharacterError as error:
+        # Like django-import-export, don't echo the offending value back.
+        raise ValueError("export failed due to IllegalCharacterError") from error
+    file = tempfile.TemporaryFile()
+    workbook.save(file)
+    file.seek(0)
+    return file
+
+
+def streaming_export_response(
+    request, file_format, resource, queryset, export_fields=None
+) -> HttpResponseBase:
+    """Export the queryset in the given format, without holding every row at once."""
+    headers = resource.get_export_headers(selected_fields=export_fields)
+    if isinstance(file_format, base_formats.XLSX):
+        rows = export_rows(resource, queryset, export_fields, force_native_type=True)
+        return FileResponse(
+            xlsx_file(headers, rows), content_type=file_format.get_content_type()
+        )
+
+    rows = export_rows(resource, queryset, export_fields)
+    if isinstance(file_format, base_formats.JSON):
+        chunks = json_chunks(headers, rows)
+    else:
+        delimiter = "\t" if isinstance(file_format, base_formats.TSV) else ","
+        chunks = csv_chunks(headers, rows, delimiter)
+    return streaming_response(request, chunks, file_format.get_content_type())
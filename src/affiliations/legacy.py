@@ -0,0 +1,239 @@
+"""Build affiliations in the legacy JSON format.
+
+The curation interfaces (VCI/GCI) still consume affiliations in the shape of the
+original affiliations JSON file, where VCEPs and GCEPs that share an affiliation ID
+are grouped together as "subgroups" of a single affiliation.
+"""
+
+# Built-in libraries:
+from collections.abc import Iterable, Iterator
+
+# Third-party dependencies:
+from django.core.cache import cache
+from django.db.models import QuerySet
+
+# In-house code:
+from affiliations.encoding import dumps_legacy
+from affiliations.models import Affiliation, Approver, DatasetVersion
+from affiliations.streaming import STREAM_CHUNK_SIZE, batched, json_array_chunks
+from affiliations.versioning import acurrent_dataset_version, current_dataset_version
+
+LEGACY_FIELDS = ["id", "type", "affiliation_id", "expert_panel_id", "full_name"]
+
+# The cache key prefix under which the rendered list of all affiliations is stored.
+LEGACY_SNAPSHOT_CACHE_KEY = "affiliations:legacy-list"
+# Snapshots of old dataset versions are never read again, so let them expire.
+LEGACY_SNAPSHOT_TIMEOUT = 60 * 60 * 24
+
+
+def legacy_affiliations() -> QuerySet:
+    """Return the affiliations that are shown in the legacy JSON format."""
+    return Affiliation.objects.filter(is_deleted=False)
+
+
+def approver_rows(affiliation_pks) -> QuerySet:
+    """Return (affiliation primary key, approver name) rows for the affiliations.
+
+    The primary keys can be a list or a queryset of primary keys.
+    """
+    return (
+        Approver.objects.filter(affiliation__in=affiliation_pks)
+        .order_by("pk")
+        .values_list("affiliation_id", "approver_name")
+    )
+
+
+def approvers_by_affiliation(affiliation_pks) -> dict[int, list[str]]:
+    """Map each of the given affiliation primary keys to its approvers' names."""
+    approvers: dict[int, list[str]] = {}
+    for affil_pk, name in approver_rows(affiliation_pks):
+        approvers.setdefault(affil_pk, []).append(name)
+    return approvers
+
+
+async def aapprovers_by_affiliation(affiliation_pks) -> dict[int, list[str]]:
+    """Map each of the given affiliation primary keys to its approvers' names."""
+    approvers: dict[int, list[str]] = {}
+    async for affil_pk, name in approver_rows(affiliation_pks):
+        approvers.setdefault(affil_pk, []).append(name)
+    return approvers
+
+
+def new_legacy_group(
+    affil_type: str, affil_id: str, ep_id: str, full_name: str
+) -> dict:
+    """Start a legacy affiliation from its first subgroup."""
+    if affil_type in ["vcep", "gcep"]:
+        return {
+            "affiliation_id": affil_id,
+            "affiliation_fullname": full_name,
+            "subgroups": {
+                affil_type: {
+                    "id": ep_id,
+                    "fullname": full_name,
+                },
+            },
+        }
+    # Independent curation group format
+    return {
+        "affiliation_id": affil_id,
+        "affiliation_fullname": full_name,
+    }
+
+
+def group_legacy_affiliations(
+    rows: Iterable[tuple[dict, list[str]]],
+) -> Iterator[dict]:
+    """Group affiliation rows and their approvers into the legacy JSON format.
+
+    The rows must be ordered by affiliation ID, so each legacy affiliation can be
+    handed out as soon as the rows for the next affiliation ID start.
+    """
+    group: dict = {}
+    seen_approvers: set[str] = set()
+    for affil, names in rows:
+        affil_type = affil["type"].lower()
+        # In old JSON, SC-VCEPS are only considered VCEPS.
+        if affil_type == "sc_vcep":
+            affil_type = "vcep"
+        # In old JSON, Affiliation IDs and EP Ids are in string format.
+        affil_id = str(affil["affiliation_id"])
+        ep_id = str(affil["expert_panel_id"])
+
+        if not group or group["affiliation_id"] != affil_id:
+            if group:
+                yield group
+            seen_approvers = set()
+            group = new_legacy_group(affil_type, affil_id, ep_id, affil["full_name"])
+        elif affil_type not in group["subgroups"]:
+            # If VCEP or GCEP in full name, add other subgroup to end of name.
+            if ("VCEP" in group["affiliation_fullname"]) or (
+                "GCEP" in group["affiliation_fullname"]
+            ):
+                group["affiliation_fullname"] = (
+                    group["affiliation_fullname"] + "/" + affil["type"]
+                )
+            # Else append affiliation subgroup name to full name
+            else:
+                group["affiliation_fullname"] = (
+                    group["affiliation_fullname"] + "/" + affil["full_name"]
+                )
+
+            group["subgroups"][affil_type] = {
+                "id": ep_id,
+                "fullname": affil["full_name"],
+            }
+        # If there are approvers, add them to the object without duplicates.
+        if names:
+            approver_list = group.setdefault("approver", [])
+            for name in names:
+                if name not in seen_approvers:
+                    seen_approvers.add(name)
+                    approver_list.append(name)
+    if group:
+        yield group
+
+
+def build_legacy_affiliations(queryset: QuerySet) -> list[dict]:
+    """Group the affiliations in the queryset into the legacy JSON format.
+
+    The affiliations and their approvers are fetched in two queries, no matter how
+    many affiliations are in the queryset.
+    """
+    rows = list(queryset.order_by("affiliation_id", "pk").values(*LEGACY_FIELDS))
+    approvers = approvers_by_affiliation(queryset.values("pk"))
+    return list(
+        group_legacy_affiliations((row, approvers.get(row["id"], [])) for row in rows)
+    )
+
+
+async def abuild_legacy_affiliations(queryset: QuerySet) -> list[dict]:
+    """Group the affiliations in the queryset into the legacy JSON format, from
+    async code."""
+    rows = [
+        row
+        async for row in queryset.order_by("affiliation_id", "pk").values(
+            *LEGACY_FIELDS
+        )
+    ]
+    approvers = await aapprovers_by_affiliation(queryset.values("pk"))
+    return list(
+        group_legacy_affiliations((row, approvers.get(row["id"], [])) for row in rows)
+    )
+
+
+def iter_legacy_affiliations(
+    queryset: QuerySet, chunk_size: int = STREAM_CHUNK_SIZE
+) -> Iterator[dict]:
+    """Group the affiliations in the queryset into the legacy JSON format lazily.
+
+    Affiliations are read `chunk_size` rows at a time, with one query for the
+    approvers of each chunk, so memory use doesn't grow with the dataset.
+    """
+    rows = (
+        queryset.order_by("affiliation_id", "pk")
+        .values(*LEGACY_FIELDS)
+        .iterator(chunk_size=chunk_size)
+    )
+
+    def rows_with_approvers():
+        for chunk in batched(rows, chunk_size):
+            approvers = approvers_by_affiliation([row["id"] for row in chunk])
+            for row in chunk:
+                yield row, approvers.get(row["id"], [])
+
+    return group_legacy_affiliations(rows_with_approvers())
+
+
+def encode_legacy_affiliation(affiliation: dict) -> bytes:
+    """Encode one legacy affiliation the way `render_legacy_json` would."""
+    return dumps_legacy(affiliation)
+
+
+def stream_legacy_json(queryset: QuerySet) -> Iterator[bytes]:
+    """Render the affiliations in the queryset as legacy JSON, piece by piece.
+
+    Joined together, the pieces are the same bytes as `render_legacy_json` produces.
+    """
+    return json_array_chunks(
+        batched(iter_legacy_affiliations(queryset), STREAM_CHUNK_SIZE),
+        encode_legacy_affiliation,
+        b", ",
+    )
+
+
+def render_legacy_json(data: list[dict]) -> bytes:
+    """Encode legacy JSON the same way the legacy views always have."""
+    return dumps_legacy(data)
+
+
+def legacy_snapshot_key(version: DatasetVersion | None) -> str:
+    """Return the cache key of the legacy JSON snapshot for the dataset version."""
+    return f"{LEGACY_SNAPSHOT_CACHE_KEY}:{version.number if version else 0}"
+
+
+def legacy_affiliations_snapshot() -> bytes:
+    """Return the rendered legacy JSON for all affiliations.
+
+    The rendered bytes are cached under the current dataset version. Any write bumps
+    the version, so a snapshot is never served after the data it was built from has
+    changed, and most requests don't touch the affiliation tables at all.
+    """
+    key = legacy_snapshot_key(current_dataset_version())
+    content = cache.get(key)
+    if content is None:
+        content = render_legacy_json(build_legacy_affiliations(legacy_affiliations()))
+        cache.set(key, content, timeout=LEGACY_SNAPSHOT_TIMEOUT)
+    return content
+
+
+async def alegacy_affiliations_snapshot() -> bytes:
+    """Return the rendered legacy JSON for all affiliations, from async code."""
+    key = legacy_snapshot_key(await acurrent_dataset_version())
+    content = await cache.aget(key)
+    if content is None:
+        content = render_legacy_json(
+            await abuild_legacy_affiliations(legacy_affiliations())
+        )
+        await cache.aset(key, content, timeout=LEGACY_SNAPSHOT_TIMEOUT)
+    return content
@@ -0,0 +1,231 @@
+"""Logging handlers that keep shipping logs off of the request path."""
+
+# Built-in libraries:
+import copy
+import logging
+import logging.handlers
+import queue
+import threading
+import time
+
+# Put on the queue to tell the background thread to stop.
+_STOP = object()
+
+
+class BatchingQueueHandler(logging.handlers.MemoryHandler):
+    """Pass log records to another handler in batches, from a background thread.
+
+    Logging a record only puts it on a bounded queue, so a slow target (like
+    CloudWatch) never holds up a request. A background thread takes records off the
+    queue, hands them to the target, and flushes the target once per batch. When the
+    queue is full, new records are dropped and counted instead of blocking, and a
+    warning with the number of dropped records is sent once there is room again.
+
+    This subclasses `MemoryHandler` so that `logging.config.dictConfig` resolves the
+    `target` option to the handler with that name.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 10000,
+        target: logging.Handler | None = None,
+        batch_size: int = 100,
+        flush_interval: float = 1.0,
+        **kwargs,
+    ):
+        super().__init__(capacity, target=target, **kwargs)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue: queue.Queue = queue.Queue(maxsize=capacity)
+        # How many records were dropped because the queue was full.
+        self.dropped = 0
+        # How many batches the target failed to flush.
+        self.failed_batches = 0
+        self._reported_dropped = 0
+        self._thread = threading.Thread(
+            target=self._run, name="log-shipper", daemon=True
+        )
+        self._thread.start()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Copy the record with its message and traceback already rendered.
+
+        The arguments and traceback of a record can refer to objects that change, or
+        go away, before the background thread gets to the record.
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """Queue the record for the background thread, or count it as dropped."""
+        try:
+            self.queue.put_nowait(self.prepare(record))
+        except queue.Full:
+            self.dropped += 1
+        except Exception:  # pylint: disable=broad-exception-caught
+            self.handleError(record)
+
+    def flush(self) -> None:
+        """Wait until every queued record has been passed to the target."""
+        if self._thread.is_alive():
+            self.queue.join()
+
+    def close(self) -> None:
+        """Ship what is left on the queue, then stop the background thread."""
+        if self._thread.is_alive():
+            self.queue.put(_STOP)
+            self._thread.join()
+        super().close()
+
+    def _next_batch(self) -> list:
+        """Wait for a record, then take up to a batch of records off the queue."""
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size and batch[-1] is not _STOP:
+            try:
+                timeout = max(0.0, deadline - time.monotonic())
+                batch.append(self.queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        """Ship batches of records to the target until told to stop."""
+        stop = False
+        while not stop:
+            batch = self._next_batch()
+            stop = batch[-1] is _STOP
+            records = [record for record in batch if record is not _STOP]
+            if self.dropped > self._reported_dropped:
+                records.append(self._dropped_record())
+            self._ship(records)
+            for _ in batch:
+                self.queue.task_done()
+
+    def _dropped_record(self) -> logging.LogRecord:
+        """Build a warning about the records dropped since the last warning."""
+        dropped = self.dropped - self._reported_dropped
+        self._reported_dropped = self.dropped
+        return logging.LogRecord(
+            __name__,
+            logging.WARNING,
+            __file__,
+            0,
+            "Dropped %d log records because the log queue was full.",
+            (dropped,),
+            None,
+        )
+
+    def _ship(self, records: list[logging.LogRecord]) -> None:
+        """Pass the records to the target, then flush it."""
+        if self.target is None or not records:
+            return
+        for record in records:
+            self.target.handle(record)
+        try:
+            self.target.flush()
+        except Exception:  # pylint: disable=broad-exception-caught
+            self.failed_batches += 1
+
+
+class LazyCloudWatchLogHandler(logging.Handler):
+    """Send log records to CloudWatch Logs, connecting on the first record.
+
+    Creating the boto3 client and the watchtower handler imports boto3 and calls AWS,
+    which is slow and can hang without a network connection. Doing it on first use
+    keeps that cost out of every `manage.py` command, test run, and worker boot. With
+    `BatchingQueueHandler` in front, it isn't paid on a request thread either.
+
+    If the handler can't be created, records are dropped and counted for
+    `retry_interval` seconds before it is tried again. The AWS credentials and region
+    are used to create the boto3 client. Any other options are passed on to
+    `watchtower.CloudWatchLogHandler`.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        level=logging.NOTSET,
+        *,
+        aws_access_key_id: str | None = None,
+        aws_secret_access_key: str | None = None,
+        region_name: str | None = None,
+        retry_interval: float = 60.0,
+        **handler_options,
+    ):
+        super().__init__(level)
+        self.retry_interval = retry_interval
+        # How many records were dropped while the handler couldn't be created.
+        self.dropped = 0
+        self._retry_at = 0.0
+        self.client_options = {
+            "aws_access_key_id": aws_access_key_id,
+            "aws_secret_access_key": aws_secret_access_key,
+            "region_name": region_name,
+        }
+        self.handler_options = handler_options
+        self._handler: logging.Handler | None = None
+
+    @property
+    def handler(self) -> logging.Handler:
+        """Return the watchtower handler, creating it the first time."""
+        if self._handler is None:
+            # pylint: disable-next=import-outside-toplevel
+            import boto3
+
+            # pylint: disable-next=import-outside-toplevel
+            import watchtower  # type: ignore
+
+            handler = watchtower.CloudWatchLogHandler(
+                boto3_client=boto3.client("logs", **self.client_options),
+                **self.handler_options,
+            )
+            if self.formatter is not None:
+                handler.setFormatter(self.formatter)
+            self._handler = handler
+        return self._handler
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """Pass the record to the watchtower handler."""
+        if time.monotonic() < self._retry_at:
+            self.dropped += 1
+            return
+        try:
+            handler = self.handler
+        except Exception:  # pylint: disable=broad-exception-caught
+            self._retry_at = time.monotonic() + self.retry_interval
+            self.handleError(record)
+            return
+        handler.handle(record)
+
+    def flush(self) -> None:
+        """Send the records the watchtower handler has queued, if it exists."""
+        if self._handler is not None:
+            self._handler.flush()
+
+    def close(self) -> None:
+        """Close the watchtower handler, if it exists."""
+        if self._handler is not None:
+            self._handler.close()
+        super().close()
+
+
+class InMemoryHandler(logging.Handler):
+    """Keep log records in a list, in place of shipping them, for tests."""
+
+    def __init__(self, level=logging.NOTSET):
+        super().__init__(level)
+        self.records: list[logging.LogRecord] = []
+        self.flushes = 0
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """Store the record."""
+        self.records.append(record)
+
+    def flush(self) -> None:
+        """Count how many times the handler was flushed, i.e. batches shipped."""
+        self.flushes += 1
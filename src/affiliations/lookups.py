@@ -0,0 +1,57 @@
+"""Look up many affiliations at once by their identifiers.
+
+Each kind of identifier is resolved with a single `IN` query, along with the queries
+that prefetch what is serialized with each affiliation, however many are asked for.
+"""
+
+# Built-in libraries:
+from collections import defaultdict
+from typing import Any
+
+# In-house code:
+from affiliations.models import Affiliation
+from affiliations.serializers import AffiliationSerializer
+
+# The field each kind of identifier is looked up by.
+LOOKUP_FIELDS = {
+    "uuids": "uuid",
+    "affiliation_ids": "affiliation_id",
+    "expert_panel_ids": "expert_panel_id",
+}
+
+# Affiliation IDs are shared by an affiliation's GCEP and VCEP, so each can match more
+# than one affiliation. The others match one.
+SHARED_IDENTIFIERS = {"affiliation_ids"}
+
+
+def lookup_affiliations(
+    identifiers: dict[str, dict[str, Any]], fields: list[str] | None = None
+) -> dict[str, dict]:
+    """Find the affiliations with the identifiers, keyed by kind and identifier.
+
+    Each identifier, as the client gave it, maps to its parsed value, which is what's
+    looked up. The results are keyed by the identifiers as given, so clients can
+    match them up however they wrote them. Identifiers that match nothing map to
+    None. Affiliation IDs map to a list of affiliations, and the others to the
+    affiliation, or the oldest one if several match. With `fields`, only those
+    fields of the affiliations are loaded.
+    """
+    results = {}
+    for kind, values in identifiers.items():
+        field = LOOKUP_FIELDS[kind]
+        queryset = AffiliationSerializer.setup_eager_loading(
+            Affiliation.objects.filter(**{f"{field}__in": set(values.values())}),
+            fields,
+        ).order_by("pk")
+        found = defaultdict(list)
+        for affil in queryset:
+            found[getattr(affil, field)].append(affil)
+        results[kind] = {
+            given: (
+                (found[value] if kind in SHARED_IDENTIFIERS else found[value][0])
+                if value in found
+                else None
+            )
+            for given, value in values.items()
+        }
+    return results
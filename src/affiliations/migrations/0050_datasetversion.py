@@ -0,0 +1,41 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:36
+
+from django.db import migrations, models
+
+
+def create_initial_version(apps, schema_editor):
+    DatasetVersion = apps.get_model("affiliations", "DatasetVersion")
+    DatasetVersion.objects.create()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("affiliations", "0049_affiliation_uuid"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DatasetVersion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "changed_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Changed At"),
+                ),
+            ],
+            options={
+                "verbose_name": "Dataset Version",
+                "verbose_name_plural": "Dataset Versions",
+            },
+        ),
+        migrations.RunPython(create_initial_version, migrations.RunPython.noop),
+    ]
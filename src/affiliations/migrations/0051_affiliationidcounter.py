@@ -0,0 +1,45 @@
+# Generated by Django 5.2.6 on 2026-10-18 21:02
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def seed_counter(apps, schema_editor):
+    Affiliation = apps.get_model("affiliations", "Affiliation")
+    AffiliationIdCounter = apps.get_model("affiliations", "AffiliationIdCounter")
+    last_id = Affiliation.objects.aggregate(Max("affiliation_id"))[
+        "affiliation_id__max"
+    ]
+    AffiliationIdCounter.objects.create(
+        pk=1, next_id=10000 if last_id is None else last_id + 1
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("affiliations", "0050_datasetversion"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AffiliationIdCounter",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("next_id", models.IntegerField(verbose_name="Next ID")),
+            ],
+            options={
+                "verbose_name": "Affiliation ID Counter",
+                "verbose_name_plural": "Affiliation ID Counters",
+            },
+        ),
+        migrations.RunPython(seed_counter, migrations.RunPython.noop),
+    ]
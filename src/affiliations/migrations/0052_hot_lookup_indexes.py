@@ -0,0 +1,44 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("affiliations", "0051_affiliationidcounter"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="coordinator",
+            name="coordinator_email",
+            field=models.EmailField(
+                db_index=True, max_length=254, verbose_name="Coordinator Email"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="affiliation",
+            index=models.Index(fields=["affiliation_id"], name="affiliation_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="affiliation",
+            index=models.Index(fields=["expert_panel_id"], name="expert_panel_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="affiliation",
+            index=models.Index(fields=["type"], name="affiliation_type_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="affiliation",
+            index=models.Index(fields=["status"], name="affiliation_status_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="affiliation",
+            index=models.Index(
+                condition=models.Q(("is_deleted", False)),
+                fields=["affiliation_id"],
+                name="active_affiliation_id_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.2.6 on 2026-10-18 20:22
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("affiliations", "0052_hot_lookup_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="affiliation",
+            name="created_at",
+            field=models.DateTimeField(
+                auto_now_add=True,
+                default=django.utils.timezone.now,
+                verbose_name="Created At",
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="affiliation",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, verbose_name="Updated At"),
+        ),
+        migrations.AddField(
+            model_name="approver",
+            name="created_at",
+            field=models.DateTimeField(
+                auto_now_add=True,
+                default=django.utils.timezone.now,
+                verbose_name="Created At",
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="approver",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, verbose_name="Updated At"),
+        ),
+        migrations.AddField(
+            model_name="coordinator",
+            name="created_at",
+            field=models.DateTimeField(
+                auto_now_add=True,
+                default=django.utils.timezone.now,
+                verbose_name="Created At",
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="coordinator",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, verbose_name="Updated At"),
+        ),
+        migrations.AddField(
+            model_name="submitter",
+            name="created_at",
+            field=models.DateTimeField(
+                auto_now_add=True,
+                default=django.utils.timezone.now,
+                verbose_name="Created At",
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="submitter",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, verbose_name="Updated At"),
+        ),
+        migrations.AddIndex(
+            model_name="affiliation",
+            index=models.Index(
+                fields=["updated_at", "id"], name="affiliation_updated_at_idx"
+            ),
+        ),
+    ]
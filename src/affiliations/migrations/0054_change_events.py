@@ -0,0 +1,72 @@
+# Generated by Django 5.2.6 on 2026-10-18 20:26
+
+import django.db.models.functions.datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("affiliations", "0053_change_timestamps"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ChangeEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("created", "Affiliation created"),
+                            ("updated", "Affiliation updated"),
+                            ("deleted", "Affiliation deleted"),
+                            ("cdwg_created", "CDWG created"),
+                            ("cdwg_updated", "CDWG updated"),
+                        ],
+                        verbose_name="Kind",
+                    ),
+                ),
+                (
+                    "affiliation_id",
+                    models.IntegerField(
+                        blank=True, null=True, verbose_name="Affiliation ID"
+                    ),
+                ),
+                (
+                    "expert_panel_id",
+                    models.IntegerField(
+                        blank=True, null=True, verbose_name="Expert Panel ID"
+                    ),
+                ),
+                (
+                    "uuid",
+                    models.UUIDField(blank=True, null=True, verbose_name="GPM UUID"),
+                ),
+                (
+                    "cdwg_id",
+                    models.IntegerField(blank=True, null=True, verbose_name="CDWG ID"),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        db_default=django.db.models.functions.datetime.Now(),
+                        verbose_name="Created At",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Change Event",
+                "verbose_name_plural": "Change Events",
+            },
+        ),
+    ]
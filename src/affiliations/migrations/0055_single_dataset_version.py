@@ -0,0 +1,40 @@
+# Generated by Django 5.2.6 on 2026-10-18 20:50
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def keep_newest_version(apps, schema_editor):
+    # Carry the newest version's ID over as the number, so ETags that clients already
+    # have still match now, and never match a later version.
+    DatasetVersion = apps.get_model("affiliations", "DatasetVersion")
+    newest = DatasetVersion.objects.order_by("-pk").first()
+    DatasetVersion.objects.all().delete()
+    DatasetVersion.objects.create(
+        pk=1,
+        number=newest.pk if newest else 0,
+        changed_at=newest.changed_at if newest else django.utils.timezone.now(),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("affiliations", "0054_change_events"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="datasetversion",
+            name="number",
+            field=models.BigIntegerField(default=0, verbose_name="Number"),
+        ),
+        migrations.AlterField(
+            model_name="datasetversion",
+            name="changed_at",
+            field=models.DateTimeField(
+                default=django.utils.timezone.now, verbose_name="Changed At"
+            ),
+        ),
+        migrations.RunPython(keep_newest_version, migrations.RunPython.noop),
+    ]
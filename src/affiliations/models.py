@@ -2,6 +2,8 @@
 
 # Third-party dependencies:
 from django.db import models
+from django.db.models.functions import Now
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from rest_framework_api_key.models import AbstractAPIKey
 
@@ -39,6 +41,22 @@ class AffiliationType(models.TextChoices):  # pylint: disable=too-many-ancestors
     SC_VCEP = "SC_VCEP", _("Somatic Cancer Variant Curation Expert Panel")
 
 
+class TimestampedModel(models.Model):
+    """Record when a row was added, and when it last changed."""
+
+    created_at: models.DateTimeField = models.DateTimeField(
+        auto_now_add=True, verbose_name="Created At"
+    )
+    updated_at: models.DateTimeField = models.DateTimeField(
+        auto_now=True, verbose_name="Updated At"
+    )
+
+    class Meta:
+        """Only add the fields to the models that inherit them."""
+
+        abstract = True
+
+
 class ClinicalDomainWorkingGroup(models.Model):
     """Define the shape of an clinical domain working group(CDWG)."""
 
@@ -58,8 +76,12 @@ class ClinicalDomainWorkingGroup(models.Model):
         return str(self.name)
 
 
-class Affiliation(models.Model):
-    """Define the shape of an affiliation."""
+class Affiliation(TimestampedModel):
+    """Define the shape of an affiliation.
+
+    `updated_at` also changes when the affiliation's coordinators, approvers, or
+    submitter IDs do, so it says when anything returned for the affiliation changed.
+    """
 
     type: models.CharField = models.CharField(
         verbose_name="Type",
@@ -104,6 +126,26 @@ class Affiliation(models.Model):
         unique=True, null=True, blank=True, verbose_name="GPM UUID"
     )
 
+    class Meta:
+        """Index the columns affiliations are looked up and filtered by."""
+
+        indexes = [
+            models.Index(fields=["affiliation_id"], name="affiliation_id_idx"),
+            models.Index(fields=["expert_panel_id"], name="expert_panel_id_idx"),
+            models.Index(fields=["type"], name="affiliation_type_idx"),
+            models.Index(fields=["status"], name="affiliation_status_idx"),
+            # The legacy endpoints only read affiliations that aren't deleted.
+            models.Index(
+                fields=["affiliation_id"],
+                condition=models.Q(is_deleted=False),
+                name="active_affiliation_id_idx",
+            ),
+            # The changes endpoint walks through affiliations in this order.
+            models.Index(
+                fields=["updated_at", "id"], name="affiliation_updated_at_idx"
+            ),
+        ]
+
     def __str__(self):
         """Provide a string representation of an affiliation."""
         return f"Affiliation {self.affiliation_id} {self.full_name}"
@@ -114,7 +156,7 @@ class Affiliation(models.Model):
         self.save(*args, **kwargs)
 
 
-class Coordinator(models.Model):
+class Coordinator(TimestampedModel):
     """Define the shape of an coordinator."""
 
     affiliation = models.ForeignKey(
@@ -124,11 +166,11 @@ class Coordinator(models.Model):
         verbose_name="Coordinator Name"
     )
     coordinator_email: models.EmailField = models.EmailField(
-        verbose_name="Coordinator Email"
+        verbose_name="Coordinator Email", db_index=True
     )
 
 
-class Approver(models.Model):
+class Approver(TimestampedModel):
     """Define the shape of an approver."""
 
     affiliation = models.ForeignKey(
@@ -137,7 +179,7 @@ class Approver(models.Model):
     approver_name: models.CharField = models.CharField(verbose_name="Approver Name")
 
 
-class Submitter(models.Model):
+class Submitter(TimestampedModel):
     """Define the shape of an submitter."""
 
     affiliation = models.ForeignKey(
@@ -146,3 +188,98 @@ class Submitter(models.Model):
     clinvar_submitter_id: models.CharField = models.CharField(
         verbose_name="ClinVar Submitter ID"
     )
+
+
+class DatasetVersion(models.Model):
+    """Count the writes to the affiliations dataset.
+
+    There is a single row. Every write to an affiliation, or anything that hangs off of
+    one, adds one to its `number` as part of the write's transaction. The row stays
+    locked until the write is committed, so concurrent writes add to it one after the
+    other, in the order they commit.
+    """
+
+    number: models.BigIntegerField = models.BigIntegerField(
+        default=0, verbose_name="Number"
+    )
+    changed_at: models.DateTimeField = models.DateTimeField(
+        default=timezone.now, verbose_name="Changed At"
+    )
+
+    class Meta:
+        """Describe the dataset versions."""
+
+        verbose_name = "Dataset Version"
+        verbose_name_plural = "Dataset Versions"
+
+    def __str__(self):
+        """Provide a string representation of a dataset version."""
+        return f"Dataset version {self.number}"
+
+
+class AffiliationIdCounter(models.Model):
+    """Hold the next affiliation ID to hand out.
+
+    There is only ever one row. Locking it, rather than every affiliation, is enough
+    to keep concurrent creates from being given the same affiliation ID.
+    """
+
+    next_id: models.IntegerField = models.IntegerField(verbose_name="Next ID")
+
+    class Meta:
+        """Describe the affiliation ID counter."""
+
+        verbose_name = "Affiliation ID Counter"
+        verbose_name_plural = "Affiliation ID Counters"
+
+    def __str__(self):
+        """Provide a string representation of the counter."""
+        return f"Next affiliation ID {self.next_id}"
+
+
+class ChangeKind(models.TextChoices):  # pylint: disable=too-many-ancestors
+    """Creating choices for the kind of a change event."""
+
+    CREATED = "created", _("Affiliation created")
+    UPDATED = "updated", _("Affiliation updated")
+    DELETED = "deleted", _("Affiliation deleted")
+    CDWG_CREATED = "cdwg_created", _("CDWG created")
+    CDWG_UPDATED = "cdwg_updated", _("CDWG updated")
+
+
+class ChangeEvent(models.Model):
+    """Record a change to an affiliation or a CDWG, for the change event stream.
+
+    Rows are added in the same transaction as the change. Their IDs, which come from a
+    database sequence, are used as the event IDs clients resume from, and events are
+    only sent once no earlier ID can still be committed.
+    """
+
+    kind: models.CharField = models.CharField(
+        choices=ChangeKind.choices, verbose_name="Kind"
+    )
+    affiliation_id: models.IntegerField = models.IntegerField(
+        null=True, blank=True, verbose_name="Affiliation ID"
+    )
+    expert_panel_id: models.IntegerField = models.IntegerField(
+        null=True, blank=True, verbose_name="Expert Panel ID"
+    )
+    uuid: models.UUIDField = models.UUIDField(
+        null=True, blank=True, verbose_name="GPM UUID"
+    )
+    cdwg_id: models.IntegerField = models.IntegerField(
+        null=True, blank=True, verbose_name="CDWG ID"
+    )
+    created_at: models.DateTimeField = models.DateTimeField(
+        db_default=Now(), verbose_name="Created At"
+    )
+
+    class Meta:
+        """Describe the change events."""
+
+        verbose_name = "Change Event"
+        verbose_name_plural = "Change Events"
+
+    def __str__(self):
+        """Provide a string representation of a change event."""
+        return f"Change event {self.pk} ({self.kind})"
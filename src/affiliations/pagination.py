@@ -0,0 +1,28 @@
+"""Pagination for the affiliations service."""
+
+# Third-party dependencies:
+from rest_framework.pagination import CursorPagination
+
+
+class AffiliationCursorPagination(CursorPagination):
+    """Walk through affiliations in pages ordered by affiliation ID.
+
+    Each page starts where the previous one left off instead of counting rows from
+    the start of the table, so every page costs the same however many affiliations
+    there are. Pagination is opt-in: requests without a `cursor` or `page_size` query
+    parameter get every affiliation in one response, like they always have.
+    """
+
+    ordering = ("affiliation_id", "pk")
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Only paginate if the client asked for it."""
+        params = request.query_params
+        if self.cursor_query_param not in params and (
+            self.page_size_query_param not in params
+        ):
+            return None
+        return super().paginate_queryset(queryset, request, view)
@@ -3,9 +3,70 @@
 from rest_framework_api_key.permissions import BaseHasAPIKey
 from rest_framework.exceptions import PermissionDenied
 from rest_framework.permissions import BasePermission
+from django.core.cache import caches
 from django.utils.timezone import now
 from affiliations.models import CustomAPIKey
 
+# The cache key prefix under which verified API keys are stored, by key prefix.
+API_KEY_CACHE_KEY = "affiliations:api-key"
+# Changes to a key clear its entry right away. This only bounds how long a change
+# made some other way, like a bulk update, can go unnoticed.
+API_KEY_CACHE_TIMEOUT = 60 * 5
+
+
+def api_key_cache():
+    """Return the cache that verified API keys are kept in."""
+    return caches["api_keys"]
+
+
+def api_key_cache_key(prefix: str) -> str:
+    """Return the cache key for the API key with the given prefix."""
+    return f"{API_KEY_CACHE_KEY}:{prefix}"
+
+
+def get_verified_api_key(raw_key: str) -> dict | None:
+    """Return the state of the API key, or None if the key isn't valid.
+
+    Once a key has been verified, its hash and state are cached, so later requests
+    with it don't query the database. They're still checked against the cached hash,
+    so another key with the same prefix doesn't get through.
+    """
+    prefix, _, _ = raw_key.partition(".")
+    # Generated prefixes are short and alphanumeric, so anything else can't match.
+    if not (prefix.isascii() and prefix.isalnum()) or len(prefix) > 8:
+        return None
+    key_generator = CustomAPIKey.objects.key_generator
+    state = api_key_cache().get(api_key_cache_key(prefix))
+    if state is not None:
+        return state if key_generator.verify(raw_key, state["hashed_key"]) else None
+
+    api_key = CustomAPIKey.objects.filter(prefix=prefix).first()
+    if api_key is None or not api_key.is_valid(raw_key):
+        return None
+    state = {
+        "hashed_key": api_key.hashed_key,
+        "can_write": api_key.can_write,
+        "revoked": api_key.revoked,
+        "expiry_date": api_key.expiry_date,
+    }
+    api_key_cache().set(api_key_cache_key(prefix), state, API_KEY_CACHE_TIMEOUT)
+    return state
+
+
+def forget_api_key(prefix: str) -> None:
+    """Remove the API key with the given prefix from the cache."""
+    api_key_cache().delete(api_key_cache_key(prefix))
+
+
+def has_expired(state: dict) -> bool:
+    """Return whether the API key has expired."""
+    return state["expiry_date"] is not None and state["expiry_date"] < now()
+
+
+def is_usable_api_key(state: dict | None) -> bool:
+    """Return whether a verified API key can still be used to read affiliations."""
+    return bool(state) and not state["revoked"] and not has_expired(state)
+
 
 class HasWriteAccess(BasePermission):
     """
@@ -20,17 +81,17 @@ class HasWriteAccess(BasePermission):
         if not raw_key:
             raise PermissionDenied("No API key was provided in the request headers.")
 
-        api_key_obj = CustomAPIKey.objects.get_from_key(raw_key)
-        if not api_key_obj:
+        api_key = get_verified_api_key(raw_key)
+        if not api_key:
             raise PermissionDenied("The provided API key is invalid.")
 
-        if api_key_obj.revoked:
+        if api_key["revoked"]:
             raise PermissionDenied("The provided API key has been revoked.")
 
-        if api_key_obj.expiry_date and api_key_obj.expiry_date < now():
+        if has_expired(api_key):
             raise PermissionDenied("The provided API key has expired.")
 
-        if not api_key_obj.can_write:
+        if not api_key["can_write"]:
             raise PermissionDenied("The API key does not have write permissions.")
 
         return True
@@ -42,3 +103,10 @@ class HasAffilsAPIKey(BaseHasAPIKey):
     """
 
     model = CustomAPIKey
+
+    def has_permission(self, request, view):
+        """Check the API key, using the cache of verified keys."""
+        raw_key = self.get_key(request)
+        if not raw_key:
+            return False
+        return is_usable_api_key(get_verified_api_key(raw_key))
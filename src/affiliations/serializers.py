@@ -1,7 +1,11 @@
 """Serializers and deserializers for the affiliations service."""
 
+# Built-in libraries:
+from collections import Counter
+
 # Third-party dependencies:
 from rest_framework import serializers
+from rest_framework.settings import api_settings
 from django.db import transaction
 from django.core.exceptions import ValidationError
 
@@ -12,9 +16,15 @@ from affiliations.models import (
     Approver,
     Submitter,
     ClinicalDomainWorkingGroup,
+    ChangeKind,
 )
 
+from affiliations.changes import touch_affiliations
+from affiliations.events import change_event, record_change, record_changes
 from affiliations.utils import (
+    allocate_affiliation_ids,
+    check_ids_not_assigned,
+    find_existing_affiliation_uuids,
     generate_next_affiliation_id,
     set_expert_panel_id,
     validate_unique_cdwg_name,
@@ -22,6 +32,7 @@ from affiliations.utils import (
     check_duplicate_affiliation_uuid,
     validate_type_and_uuid,
 )
+from affiliations.versioning import bump_dataset_version
 
 
 class CoordinatorSerializer(serializers.ModelSerializer):
@@ -79,6 +90,145 @@ class ClinicalDomainWorkingGroupSerializer(serializers.ModelSerializer):
         return attrs
 
 
+class ClinicalDomainWorkingGroupField(serializers.PrimaryKeyRelatedField):
+    """Look up a CDWG by primary key.
+
+    When the root serializer has already loaded every CDWG into a `cdwgs` map, the
+    CDWG is taken from there instead of being queried for one affiliation at a time.
+    """
+
+    def to_internal_value(self, data):
+        cdwgs = getattr(self.root, "cdwgs", None)
+        if cdwgs is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool) or not str(data).isdigit():
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        cdwg = cdwgs.get(int(data))
+        if cdwg is None:
+            self.fail("does_not_exist", pk_value=data)
+        return cdwg
+
+
+# Bulk updates aren't supported, so `update` is left unimplemented.
+# pylint: disable-next=abstract-method
+class AffiliationListSerializer(serializers.ListSerializer):
+    """Validate and create many affiliations at once.
+
+    Everything that would otherwise cost a query per affiliation (CDWG lookups,
+    UUID duplicate checks, ID generation, and inserts) is done once for the batch.
+    """
+
+    cdwgs: dict | None = None
+
+    def to_internal_value(self, data):
+        self.cdwgs = ClinicalDomainWorkingGroup.objects.in_bulk()
+        validated = super().to_internal_value(data)
+
+        errors: list[dict] = [{} for _ in validated]
+        seen_uuids: set = set()
+        batch_uuids = [attrs["uuid"] for attrs in validated if attrs.get("uuid")]
+        existing_uuids = find_existing_affiliation_uuids(batch_uuids)
+        for attrs, item_errors in zip(validated, errors):
+            uuid_val = attrs.get("uuid")
+            if uuid_val in existing_uuids or uuid_val in seen_uuids:
+                item_errors["uuid"] = ["This UUID already exists."]
+            if uuid_val:
+                seen_uuids.add(uuid_val)
+            try:
+                check_ids_not_assigned(attrs)
+                validate_cdwg_matches_type(attrs)
+            except ValidationError as e:
+                item_errors[api_settings.NON_FIELD_ERRORS_KEY] = e.messages
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return validated
+
+    @transaction.atomic
+    def create(self, validated_data):
+        """Create the affiliations, and their nested objects, in bulk."""
+        affiliation_ids = allocate_affiliation_ids(len(validated_data))
+        affils = []
+        nested = []
+        for affiliation_id, attrs in zip(affiliation_ids, validated_data):
+            attrs = {**attrs, "affiliation_id": affiliation_id}
+            try:
+                set_expert_panel_id(attrs)
+            except ValidationError as e:
+                raise serializers.ValidationError(e.messages)
+            nested.append(
+                (
+                    attrs.pop("coordinators", []),
+                    attrs.pop("approvers", []),
+                    attrs.pop("clinvar_submitter_ids", []),
+                )
+            )
+            affils.append(Affiliation(**attrs))
+
+        Affiliation.objects.bulk_create(affils)
+        Coordinator.objects.bulk_create(
+            Coordinator(affiliation=affil, **data)
+            for affil, (coordinators, _, _) in zip(affils, nested)
+            for data in coordinators
+        )
+        Approver.objects.bulk_create(
+            Approver(affiliation=affil, **data)
+            for affil, (_, approvers, _) in zip(affils, nested)
+            for data in approvers
+        )
+        Submitter.objects.bulk_create(
+            Submitter(affiliation=affil, **data)
+            for affil, (_, _, submitter_ids) in zip(affils, nested)
+            for data in submitter_ids
+        )
+        # Bulk inserts don't send signals, so record the write here.
+        bump_dataset_version()
+        record_changes([change_event(ChangeKind.CREATED, affil) for affil in affils])
+        return affils
+
+
+# The models behind each of an affiliation's nested fields.
+NESTED_MODELS = {
+    "coordinators": Coordinator,
+    "approvers": Approver,
+    "clinvar_submitter_ids": Submitter,
+}
+
+
+def sync_nested_objects(
+    affiliation, related_name, model, fields, items
+) -> tuple[bool, bool]:
+    """Make an affiliation's nested objects match `items`.
+
+    Rows that are already there are kept, rows that aren't wanted anymore are
+    deleted, and any that are missing are inserted in bulk. Returns whether any
+    rows were deleted, and whether any were inserted.
+    """
+    wanted = Counter(tuple(item[field] for field in fields) for item in items)
+    stale = []
+    for obj in getattr(affiliation, related_name).all():
+        key = tuple(getattr(obj, field) for field in fields)
+        if wanted[key] > 0:
+            wanted[key] -= 1
+        else:
+            stale.append(obj.pk)
+    if stale:
+        model.objects.filter(pk__in=stale).delete()
+
+    new_objects = []
+    for item in items:
+        key = tuple(item[field] for field in fields)
+        if wanted[key] > 0:
+            wanted[key] -= 1
+            new_objects.append(model(affiliation=affiliation, **item))
+    model.objects.bulk_create(new_objects)
+    return bool(stale), bool(new_objects)
+
+
+# The fields affiliations are identified by, which are loaded even when they aren't
+# serialized.
+IDENTIFIER_FIELDS = {"affiliation_id", "expert_panel_id", "uuid"}
+
+
 class AffiliationSerializer(serializers.ModelSerializer):
     """Serialize Affiliation objects."""
 
@@ -87,7 +237,7 @@ class AffiliationSerializer(serializers.ModelSerializer):
     approvers = ApproverSerializer(many=True, required=False)
     clinvar_submitter_ids = SubmitterSerializer(many=True, required=False)
 
-    clinical_domain_working_group = serializers.PrimaryKeyRelatedField(
+    clinical_domain_working_group = ClinicalDomainWorkingGroupField(
         queryset=ClinicalDomainWorkingGroup.objects.all(),
     )
 
@@ -95,6 +245,7 @@ class AffiliationSerializer(serializers.ModelSerializer):
         """Describe the fields on an Affiliation object."""
 
         model = Affiliation
+        list_serializer_class = AffiliationListSerializer
         fields = [
             "affiliation_id",
             "expert_panel_id",
@@ -111,6 +262,68 @@ class AffiliationSerializer(serializers.ModelSerializer):
             "uuid",
         ]
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = self.requested_fields(self.context.get("request"))
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    @classmethod
+    def requested_fields(cls, request) -> list[str] | None:
+        """Return the fields a GET request asked for with `?fields=` or `?exclude=`.
+
+        Both take comma-separated field names. Returns None if the request didn't ask
+        for a subset of the fields. Raises ValidationError for unknown field names.
+        """
+        if request is None or request.method not in ("GET", "HEAD"):
+            return None
+        params = request.query_params
+        if "fields" not in params and "exclude" not in params:
+            return None
+
+        def names(param):
+            return {name for name in params.get(param, "").split(",") if name}
+
+        unknown = (names("fields") | names("exclude")) - set(cls.Meta.fields)
+        if unknown:
+            raise serializers.ValidationError(
+                {"fields": [f"Unknown fields: {', '.join(sorted(unknown))}."]}
+            )
+        wanted = names("fields") or set(cls.Meta.fields)
+        return [
+            name
+            for name in cls.Meta.fields
+            if name in wanted and name not in names("exclude")
+        ]
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, fields: list[str] | None = None):
+        """Load everything that is serialized along with each affiliation up front.
+
+        Without this, the nested coordinators, approvers, and submitter IDs each
+        cost an extra query per affiliation. With `fields`, only those fields are
+        loaded, and the columns of the other serialized fields are deferred. The
+        IDs are always loaded, as affiliations are looked up and ordered by them.
+        """
+        if fields is None:
+            fields = cls.Meta.fields
+        else:
+            queryset = queryset.defer(
+                *(
+                    name
+                    for name in cls.Meta.fields
+                    if name not in fields
+                    and name not in NESTED_MODELS
+                    and name not in IDENTIFIER_FIELDS
+                )
+            )
+        if "clinical_domain_working_group" in fields:
+            queryset = queryset.select_related("clinical_domain_working_group")
+        return queryset.prefetch_related(
+            *(name for name in NESTED_MODELS if name in fields)
+        )
+
     def validate(self, attrs):
         # Validate UUID is present on creation
         if self.instance is None:
@@ -118,7 +331,10 @@ class AffiliationSerializer(serializers.ModelSerializer):
             type_ = attrs.get("type")
             if not uuid_val and type_ != "INDEPENDENT_CURATION":
                 raise serializers.ValidationError({"uuid": "This field is required."})
-            if check_duplicate_affiliation_uuid(uuid_val):
+            # Bulk creates check all of their UUIDs at once instead.
+            if not isinstance(
+                self.parent, AffiliationListSerializer
+            ) and check_duplicate_affiliation_uuid(uuid_val):
                 raise serializers.ValidationError({"uuid": "This UUID already exists."})
             try:
                 validate_type_and_uuid(attrs)
@@ -171,27 +387,74 @@ class AffiliationSerializer(serializers.ModelSerializer):
                     {field: f"{field} is a read-only field and cannot be updated."}
                 )
 
-        coordinators_data = validated_data.pop("coordinators", [])
-        approvers_data = validated_data.pop("approvers", [])
-        submitter_ids_data = validated_data.pop("clinvar_submitter_ids", [])
+        nested_data = {name: validated_data.pop(name, []) for name in NESTED_MODELS}
+
+        # Update the main fields on the instance, saving only the ones that changed.
+        changed_fields = [
+            attr
+            for attr, value in validated_data.items()
+            if getattr(instance, attr) != value
+        ]
+        for attr in changed_fields:
+            setattr(instance, attr, validated_data[attr])
+        if changed_fields:
+            # `updated_at` is only set by save() when it's one of the update_fields.
+            instance.save(update_fields=[*changed_fields, "updated_at"])
+
+        # Update nested objects by writing only the rows that differ.
+        nested_changes = [
+            sync_nested_objects(
+                instance,
+                name,
+                model,
+                self.fields[name].child.Meta.fields,
+                nested_data[name],
+            )
+            for name, model in NESTED_MODELS.items()
+        ]
+        # Deletes send signals, but bulk inserts don't, so record those here.
+        if any(inserted for _, inserted in nested_changes):
+            touch_affiliations([instance.pk])
+            bump_dataset_version()
+        # Saving the affiliation has already sent a change event.
+        if any(any(changes) for changes in nested_changes) and not changed_fields:
+            record_change(ChangeKind.UPDATED, affiliation=instance)
 
-        # Update the main fields on the instance
-        for attr, value in validated_data.items():
-            if getattr(instance, attr) != value:
-                setattr(instance, attr, value)
-        instance.save()
+        return instance
 
-        # Update nested objects by delete all existing and re-create.
-        instance.coordinators.all().delete()
-        for data in coordinators_data:
-            Coordinator.objects.create(affiliation=instance, **data)
 
-        instance.approvers.all().delete()
-        for data in approvers_data:
-            Approver.objects.create(affiliation=instance, **data)
+# The most identifiers of each kind that can be looked up with one request.
+LOOKUP_LIMIT = 500
 
-        instance.clinvar_submitter_ids.all().delete()
-        for data in submitter_ids_data:
-            Submitter.objects.create(affiliation=instance, **data)
 
-        return instance
+# Nothing is saved, so `create` and `update` are left unimplemented.
+# pylint: disable-next=abstract-method
+class AffiliationLookupSerializer(serializers.Serializer):
+    """Validate the identifiers of the affiliations to look up."""
+
+    uuids = serializers.ListField(
+        child=serializers.UUIDField(), required=False, max_length=LOOKUP_LIMIT
+    )
+    affiliation_ids = serializers.ListField(
+        child=serializers.IntegerField(), required=False, max_length=LOOKUP_LIMIT
+    )
+    expert_panel_ids = serializers.ListField(
+        child=serializers.IntegerField(), required=False, max_length=LOOKUP_LIMIT
+    )
+
+    def to_internal_value(self, data):
+        """Map each identifier, as it was given, to its parsed value."""
+        attrs = super().to_internal_value(data)
+        return {
+            kind: dict(
+                zip((str(given) for given in self.fields[kind].get_value(data)), values)
+            )
+            for kind, values in attrs.items()
+        }
+
+    def validate(self, attrs):
+        if not any(attrs.values()):
+            raise serializers.ValidationError(
+                "Provide at least one of uuids, affiliation_ids, or expert_panel_ids."
+            )
+        return attrs
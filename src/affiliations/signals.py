@@ -0,0 +1,97 @@
+"""Signal handlers for the affiliations service."""
+
+# Third-party dependencies:
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+# In-house code:
+from affiliations.models import (
+    Affiliation,
+    Approver,
+    ClinicalDomainWorkingGroup,
+    Coordinator,
+    ChangeKind,
+    CustomAPIKey,
+    Submitter,
+)
+from affiliations.changes import touch_affiliations
+from affiliations.events import affiliation_change_kind, record_change
+from affiliations.permissions import forget_api_key
+from affiliations.versioning import bump_dataset_version
+
+# Writes to these models change what the API returns.
+VERSIONED_MODELS = [
+    Affiliation,
+    Coordinator,
+    Approver,
+    Submitter,
+    ClinicalDomainWorkingGroup,
+]
+
+
+def child_changed(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Mark an affiliation as changed when one of its children is saved or deleted.
+
+    This is connected before the dataset version is bumped, so every write locks the
+    affiliation's row before the version's row, the same order as saving the
+    affiliation does, and two writes can't deadlock on them.
+    """
+    touch_affiliations([instance.affiliation_id])
+
+
+for model in [Coordinator, Approver, Submitter]:
+    post_save.connect(child_changed, sender=model)
+    post_delete.connect(child_changed, sender=model)
+
+
+def dataset_changed(sender, **kwargs):  # pylint: disable=unused-argument
+    """Bump the dataset version when an affiliation or its related data is written.
+
+    The new version is part of the write's transaction, so other requests keep
+    seeing the old version, and the old data, until the write is committed.
+    """
+    bump_dataset_version()
+
+
+for model in VERSIONED_MODELS:
+    post_save.connect(dataset_changed, sender=model)
+    post_delete.connect(dataset_changed, sender=model)
+
+
+def affiliation_saved(
+    sender, instance, created, **kwargs
+):  # pylint: disable=unused-argument
+    """Send a change event when an affiliation is saved, or soft-deleted."""
+    record_change(affiliation_change_kind(instance, created), affiliation=instance)
+
+
+def affiliation_deleted(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Send a change event when an affiliation is deleted outright, e.g. in bulk."""
+    record_change(ChangeKind.DELETED, affiliation=instance)
+
+
+post_save.connect(affiliation_saved, sender=Affiliation)
+post_delete.connect(affiliation_deleted, sender=Affiliation)
+
+
+def cdwg_saved(sender, instance, created, **kwargs):  # pylint: disable=unused-argument
+    """Send a change event when a CDWG is saved."""
+    kind = ChangeKind.CDWG_CREATED if created else ChangeKind.CDWG_UPDATED
+    record_change(kind, cdwg=instance)
+
+
+post_save.connect(cdwg_saved, sender=ClinicalDomainWorkingGroup)
+
+
+def api_key_changed(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Stop serving an API key from the cache once it has been saved or deleted.
+
+    The entry is cleared right away, and again once the change is committed, in case
+    a request cached the old state from the database in between.
+    """
+    forget_api_key(instance.prefix)
+    transaction.on_commit(lambda: forget_api_key(instance.prefix))
+
+
+post_save.connect(api_key_changed, sender=CustomAPIKey)
+post_delete.connect(api_key_changed, sender=CustomAPIKey)
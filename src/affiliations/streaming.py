@@ -0,0 +1,71 @@
+"""Stream large JSON arrays to the client instead of building them in memory."""
+
+# Built-in libraries:
+from collections.abc import AsyncIterator, Callable, Iterable, Iterator
+from itertools import islice
+from typing import Any
+
+# Third-party dependencies:
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+
+# How many rows are fetched from the database, and sent to the client, at a time.
+STREAM_CHUNK_SIZE = 500
+
+
+def wants_stream(request) -> bool:
+    """Return whether the client asked for a streamed response."""
+    return request.GET.get("stream", "").lower() == "true"
+
+
+def batched(iterable: Iterable, size: int) -> Iterator[list]:
+    """Split the iterable into lists of at most `size` items."""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def json_array_chunks(
+    batches: Iterable[list], encode: Callable[[Any], bytes], separator: bytes
+) -> Iterator[bytes]:
+    """Encode batches of elements into the pieces of a single JSON array.
+
+    Joined together, the pieces are exactly what encoding the whole list at once
+    with the same element encoding and separator would produce.
+    """
+    yield b"["
+    first = True
+    for batch in batches:
+        body = separator.join(encode(element) for element in batch)
+        yield body if first else separator + body
+        first = False
+    yield b"]"
+
+
+async def _iterate_in_thread(chunks: Iterator[bytes]) -> AsyncIterator[bytes]:
+    """Pull chunks out of a synchronous iterator without blocking the event loop."""
+    done = object()
+    next_chunk = sync_to_async(next, thread_sensitive=True)
+    while (chunk := await next_chunk(chunks, done)) is not done:
+        yield chunk
+
+
+def streaming_response(
+    request, chunks: Iterator[bytes], content_type: str
+) -> StreamingHttpResponse:
+    """Send the chunks to the client as they are produced.
+
+    Under ASGI, Django reads a synchronous iterator all the way through before it
+    sends anything, so ASGI requests get an asynchronous iterator instead.
+    """
+    if isinstance(getattr(request, "_request", request), ASGIRequest):
+        content: Iterator[bytes] | AsyncIterator[bytes] = _iterate_in_thread(chunks)
+    else:
+        content = chunks
+    return StreamingHttpResponse(content, content_type=content_type)
+
+
+def streaming_json_response(request, chunks: Iterator[bytes]) -> StreamingHttpResponse:
+    """Send the chunks of JSON to the client as they are produced."""
+    return streaming_response(request, chunks, "application/json")
@@ -1,10 +1,46 @@
+# pylint: disable=too-many-lines
+
 """Tests for the affiliations service."""
 
 # Third-party dependencies:
+import asyncio
+import csv
+import json
+import logging
+import tempfile
+import threading
+import time
+from contextlib import redirect_stdout
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from unittest import skipUnless
+from unittest.mock import patch
+from uuid import UUID, uuid4
+from operator import itemgetter
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
-from django.test import TestCase
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import F, Q, Value
+from django.db.models.functions import Concat
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+    skipUnlessDBFeature,
+)
+from django.test.utils import CaptureQueriesContext
 from django.utils.timezone import now
+from import_export.formats import base_formats  # type: ignore
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient, APITestCase, APIRequestFactory
 from rest_framework import status, serializers
 from rest_framework.views import APIView
@@ -13,20 +49,56 @@ from rest_framework.response import Response
 # In-house code:
 from affiliations.models import (
     Affiliation,
+    AffiliationIdCounter,
     Coordinator,
     Approver,
     Submitter,
     ClinicalDomainWorkingGroup,
+    ChangeEvent,
+    ChangeKind,
     CustomAPIKey,
+    DatasetVersion,
 )
 
+from affiliations.admin import AffiliationResource
+from affiliations.data_fixes import DataFix, apply_fix
+from affiliations.encoding import dumps_legacy
+from affiliations.events import (
+    OVERFLOW,
+    ChangeBroadcaster,
+    event_stream,
+    format_event,
+    settled_events,
+)
+from affiliations.log_handlers import (
+    BatchingQueueHandler,
+    InMemoryHandler,
+    LazyCloudWatchLogHandler,
+)
+from affiliations.legacy import (
+    build_legacy_affiliations,
+    iter_legacy_affiliations,
+    legacy_affiliations,
+    render_legacy_json,
+)
+from affiliations.renderers import FastJSONRenderer
 from affiliations.serializers import AffiliationSerializer
 from affiliations.utils import (
+    AFFIL_BASE,
+    GCEP_BASE,
+    allocate_affiliation_ids,
     generate_next_affiliation_id,
     set_expert_panel_id,
     validate_cdwg_matches_type,
 )
-from affiliations.permissions import HasWriteAccess
+from affiliations.permissions import (
+    HasAffilsAPIKey,
+    HasWriteAccess,
+    api_key_cache,
+    api_key_cache_key,
+)
+from affiliations.versioning import bump_dataset_version, current_dataset_version
+from scripts import add_uuid, affils_compare, csv_load, gpm_csv
 
 
 class AffiliationsViewsBaseTestCase(APITestCase):
@@ -72,98 +144,1688 @@ class AffiliationsViewsBaseTestCase(APITestCase):
             ]
         )
 
-        cls.cdwg2 = ClinicalDomainWorkingGroup.objects.create(
-            name="Hemostasis/Thrombosis"
-        )
-        cls.create_data = {
-            "full_name": "Test VCEP",
-            "type": "VCEP",
-            "status": "ACTIVE",
-            "uuid": "72b0b9fc-a66e-4825-a747-429db7028ac5",
-            "clinical_domain_working_group": cls.cdwg2.id,
-        }
+        cls.cdwg2 = ClinicalDomainWorkingGroup.objects.create(
+            name="Hemostasis/Thrombosis"
+        )
+        cls.create_data = {
+            "full_name": "Test VCEP",
+            "type": "VCEP",
+            "status": "ACTIVE",
+            "uuid": "72b0b9fc-a66e-4825-a747-429db7028ac5",
+            "clinical_domain_working_group": cls.cdwg2.id,
+        }
+
+    def test_should_be_able_to_view_list_of_affiliations(self):
+        """Make sure we are able to view our list of affiliations."""
+        client = APIClient()
+        response = client.get("/api/database_list/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 1)
+        returned_names = {affil["full_name"] for affil in response.data}
+        self.assertIn("Test Success Result Affil", returned_names)
+
+    def test_should_be_able_to_view_single_affiliation_detail(self):
+        """Make sure we are able to view a single affiliation's details."""
+        client = APIClient()
+        affil = Affiliation.objects.get(full_name="Test Success Result Affil")
+
+        response = client.get(f"/api/database_list/{affil.pk}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.data["full_name"], self.success_affiliation["full_name"]
+        )
+
+    def test_should_be_able_to_look_up_affiliation_by_uuid(self):
+        """Make sure we can look up an affiliation by its GPM UUID."""
+        client = APIClient()
+        response = client.get(
+            f"/api/affiliation_detail/uuid/{self.success_affiliation['uuid']}/"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.data["full_name"], self.success_affiliation["full_name"]
+        )
+
+    def test_detail_affiliation_json_call(self):
+        """Make sure the API response of a single affiliation is returned
+        in the original JSON format ."""
+        self.client.credentials(HTTP_X_API_KEY=self.api_key)
+        response = self.client.get("/api/affiliation_detail/?affil_id=10000")
+        self.assertEqual(
+            response.json(),
+            [
+                {
+                    "affiliation_id": "10000",
+                    "affiliation_fullname": "Test Success Result Affil",
+                    "subgroups": {
+                        "gcep": {
+                            "id": "40000",
+                            "fullname": "Test Success Result Affil",
+                        }
+                    },
+                    "approver": ["Mew"],
+                }
+            ],
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_affiliation_json_call(self):
+        """Make sure the API response of all the affiliations in the db is
+        returned in the original JSON format ."""
+        self.client.credentials(HTTP_X_API_KEY=self.api_key)
+        response = self.client.get("/api/affiliations_list/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 1)
+
+    def test_create_affiliation__success(self):
+        """Test successful creation of affiliation via POST API with valid data."""
+        self.client.credentials(HTTP_X_API_KEY=self.api_key)
+        response = self.client.post(
+            "/api/affiliation/create/",
+            self.create_data,
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIn("affiliation_id", response.data)
+        self.assertIn("expert_panel_id", response.data)
+
+    def test_create_affiliation_missing_required_fields(self):
+        """Test that missing required fields in POST request returns 400 and error messages."""
+        self.client.credentials(HTTP_X_API_KEY=self.api_key)
+        response = self.client.post("/api/affiliation/create/", {}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("full_name", response.data["details"])
+        self.assertIn("type", response.data["details"])
+
+
+class LegacyJSONFormatTest(TestCase):
+    """Tests for building affiliations in the legacy JSON format."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Set up a CDWG shared by the generated affiliations."""
+        cls.cdwg, _ = ClinicalDomainWorkingGroup.objects.get_or_create(
+            name="Kidney Disease"
+        )
+
+    def _create_affiliations(self, count):
+        """Create `count` affiliation IDs, each with a GCEP and a VCEP that share
+        an approver."""
+        affils = Affiliation.objects.bulk_create(
+            Affiliation(
+                affiliation_id=10000 + i,
+                expert_panel_id=base + i,
+                full_name=f"Affil {i} {type_}",
+                status="ACTIVE",
+                type=type_,
+                clinical_domain_working_group=self.cdwg,
+            )
+            for i in range(count)
+            for type_, base in (("GCEP", 40000), ("VCEP", 50000))
+        )
+        Approver.objects.bulk_create(
+            Approver(affiliation=affil, approver_name=name)
+            for affil in affils
+            for name in ("Shared Approver", f"{affil.type} Approver")
+        )
+
+    def test_subgroups_are_grouped_with_deduplicated_approvers(self):
+        """Affiliations sharing an ID should be grouped into one legacy object."""
+        self._create_affiliations(1)
+        self.assertEqual(
+            build_legacy_affiliations(legacy_affiliations()),
+            [
+                {
+                    "affiliation_id": "10000",
+                    "affiliation_fullname": "Affil 0 GCEP/VCEP",
+                    "subgroups": {
+                        "gcep": {"id": "40000", "fullname": "Affil 0 GCEP"},
+                        "vcep": {"id": "50000", "fullname": "Affil 0 VCEP"},
+                    },
+                    "approver": ["Shared Approver", "GCEP Approver", "VCEP Approver"],
+                }
+            ],
+        )
+
+    def test_soft_deleted_affiliations_are_excluded(self):
+        """Soft-deleted affiliations should not show up in the legacy format."""
+        self._create_affiliations(2)
+        Affiliation.objects.filter(affiliation_id=10001).update(is_deleted=True)
+        result = build_legacy_affiliations(legacy_affiliations())
+        self.assertEqual([affil["affiliation_id"] for affil in result], ["10000"])
+
+    def test_query_count_is_constant_for_small_dataset(self):
+        """Building the legacy format for 10 affiliations takes two queries."""
+        self._create_affiliations(10)
+        with self.assertNumQueries(2):
+            result = build_legacy_affiliations(legacy_affiliations())
+        self.assertEqual(len(result), 10)
+
+    def test_query_count_is_constant_for_large_dataset(self):
+        """Building the legacy format for 10,000 affiliations takes two queries."""
+        self._create_affiliations(10000)
+        with self.assertNumQueries(2):
+            result = build_legacy_affiliations(legacy_affiliations())
+        self.assertEqual(len(result), 10000)
+
+
+class LegacySnapshotTest(APITestCase):
+    """Tests for the materialized legacy JSON list of affiliations."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Seed the test database with an affiliation and an API key."""
+        _, cls.api_key = CustomAPIKey.objects.create_key(name="test-service")
+        cls.cdwg, _ = ClinicalDomainWorkingGroup.objects.get_or_create(
+            name="Cardiology"
+        )
+        cls.affiliation = Affiliation.objects.create(
+            affiliation_id=10000,
+            expert_panel_id=40000,
+            full_name="Snapshot GCEP",
+            status="ACTIVE",
+            type="GCEP",
+            clinical_domain_working_group=cls.cdwg,
+        )
+
+    def setUp(self):
+        """Start every test without a snapshot."""
+        cache.clear()
+        self.client.credentials(HTTP_X_API_KEY=self.api_key)
+
+    def _affiliation_queries(self, response_func):
+        """Return the queries against the affiliation tables made by the call."""
+        with CaptureQueriesContext(connection) as ctx:
+            response_func()
+        return [q for q in ctx.captured_queries if "affiliations_a" in q["sql"]]
+
+    def test_snapshot_matches_rendered_legacy_json(self):
+        """The snapshot should hold exactly what the legacy view used to return."""
+        response = self.client.get("/api/affiliations_list/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(
+            response.content,
+            render_legacy_json(build_legacy_affiliations(legacy_affiliations())),
+        )
+
+    def test_snapshot_is_reused_between_requests(self):
+        """Only the first request should query the affiliation tables."""
+        first = self._affiliation_queries(
+            lambda: self.client.get("/api/affiliations_list/")
+        )
+        second = self._affiliation_queries(
+            lambda: self.client.get("/api/affiliations_list/")
+        )
+        self.assertTrue(first)
+        self.assertEqual(second, [])
+
+    def test_serializer_update_rebuilds_snapshot(self):
+        """Updating an affiliation through the serializer invalidates the snapshot."""
+        self.client.get("/api/affiliations_list/")
+        serializer = AffiliationSerializer(
+            instance=self.affiliation, data={"full_name": "Renamed"}, partial=True
+        )
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer.save()
+        response = self.client.get("/api/affiliations_list/")
+        self.assertEqual(response.json()[0]["affiliation_fullname"], "Renamed")
+
+    def test_approver_changes_rebuild_snapshot(self):
+        """Adding and removing approvers invalidates the snapshot."""
+        self.client.get("/api/affiliations_list/")
+        approver = Approver.objects.create(
+            affiliation=self.affiliation, approver_name="Mew"
+        )
+        response = self.client.get("/api/affiliations_list/")
+        self.assertEqual(response.json()[0]["approver"], ["Mew"])
+        approver.delete()
+        response = self.client.get("/api/affiliations_list/")
+        self.assertNotIn("approver", response.json()[0])
+
+    def test_soft_delete_rebuilds_snapshot(self):
+        """Soft-deleting an affiliation removes it from the snapshot."""
+        self.client.get("/api/affiliations_list/")
+        self.affiliation.delete()
+        response = self.client.get("/api/affiliations_list/")
+        self.assertEqual(response.json(), [])
+
+
+class JSONEncodingTest(TestCase):
+    """Tests that the fast JSON encoders match the standard ones byte for byte."""
+
+    # Strings that need escaping, or that look like the separators between tokens.
+    STRINGS = [
+        "",
+        'quote " backslash \\ slash /',
+        "new\nline, tab\t, and \x00\x1f\x7f controls",
+        "  leading spaces,\n  and: colons",
+        "ü — “x” \u2028 \u2029 😀",
+    ]
+
+    def _data(self):
+        """Build data with every kind of value the encoders handle."""
+        return [
+            {
+                "strings": self.STRINGS,
+                "numbers": [0, -1, 2**62],
+                "literals": [True, False, None],
+                "empty": [[], {}, [[]], {"a": {}}],
+                "nested": {"a": [{"b": [1, {"c": "d, e"}]}]},
+                1: "int key",
+                "uuid": UUID("86af9d32-9e14-43de-b2a1-01acd33b2d02"),
+                "decimal": Decimal("1.10"),
+                "datetime": now(),
+                "date": now().date(),
+            },
+            [],
+            "plain",
+        ]
+
+    def test_legacy_encoding_matches_json_dumps(self):
+        """`dumps_legacy` gives the same bytes as the legacy views' json.dumps."""
+        for data in [self._data(), self._data()[0], [], {}, "text", 2**70]:
+            with self.subTest(data=data):
+                expected = json.dumps(
+                    data, cls=DjangoJSONEncoder, ensure_ascii=False
+                ).encode("utf-8")
+                self.assertEqual(dumps_legacy(data), expected)
+                with patch("affiliations.encoding.orjson", None):
+                    self.assertEqual(dumps_legacy(data), expected)
+
+    def test_renderer_matches_drf(self):
+        """`FastJSONRenderer` gives the same bytes as DRF's `JSONRenderer`."""
+        for data, media_type in [
+            (self._data(), None),
+            (self._data(), "application/json; indent=2"),
+            ([2**70], None),
+            (None, None),
+        ]:
+            with self.subTest(data=data, media_type=media_type):
+                expected = JSONRenderer().render(data, media_type)
+                self.assertEqual(FastJSONRenderer().render(data, media_type), expected)
+        self.assertIn(b"\\u2028", FastJSONRenderer().render(self.STRINGS))
+
+
+class DatasetVersionTest(APITestCase):
+    """Tests for ETag and Last-Modified support driven by the dataset version."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Seed the test database with an affiliation and an API key."""
+        _, cls.api_key = CustomAPIKey.objects.create_key(name="test-service")
+        cls.cdwg, _ = ClinicalDomainWorkingGroup.objects.get_or_create(
+            name="Cardiology"
+        )
+        cls.affiliation = Affiliation.objects.create(
+            affiliation_id=10000,
+            expert_panel_id=40000,
+            full_name="Versioned GCEP",
+            status="ACTIVE",
+            type="GCEP",
+            clinical_domain_working_group=cls.cdwg,
+            uuid="86af9d32-9e14-43de-b2a1-01acd33b2d02",
+        )
+
+    def setUp(self):
+        """Authenticate every request with the API key."""
+        self.client.credentials(HTTP_X_API_KEY=self.api_key)
+
+    def test_writes_bump_the_dataset_version(self):
+        """Saving or deleting any affiliation data creates a new version."""
+        writes = [
+            lambda: Coordinator.objects.create(
+                affiliation=self.affiliation,
+                coordinator_name="Oak",
+                coordinator_email="oak@email.com",
+            ),
+            lambda: Approver.objects.create(
+                affiliation=self.affiliation, approver_name="Mew"
+            ),
+            lambda: Submitter.objects.create(
+                affiliation=self.affiliation, clinvar_submitter_id="1"
+            ),
+            lambda: ClinicalDomainWorkingGroup.objects.create(name="Neurology"),
+            lambda: Approver.objects.filter(affiliation=self.affiliation).delete(),
+            self.affiliation.delete,
+        ]
+        for write in writes:
+            before = current_dataset_version()
+            write()
+            self.assertGreater(current_dataset_version().number, before.number)
+
+    def test_not_modified_without_touching_affiliation_tables(self):
+        """A matching If-None-Match header should return 304 from the version."""
+        response = self.client.get("/api/affiliations_list/")
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+        self.assertTrue(response.has_header("Last-Modified"))
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(
+                "/api/affiliations_list/", HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        tables = " ".join(q["sql"] for q in ctx.captured_queries)
+        self.assertNotIn("affiliations_affiliation", tables)
+        self.assertNotIn("affiliations_approver", tables)
+
+    def test_not_modified_since_last_modified(self):
+        """A matching If-Modified-Since header should return 304."""
+        response = self.client.get("/api/database_list/")
+        response = self.client.get(
+            "/api/database_list/",
+            HTTP_IF_MODIFIED_SINCE=response["Last-Modified"],
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_write_changes_the_etag(self):
+        """After a write, the old ETag should no longer match."""
+        etag = self.client.get("/api/cdwg_list/")["ETag"]
+        ClinicalDomainWorkingGroup.objects.create(name="Neurology")
+        response = self.client.get("/api/cdwg_list/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_etags_differ_between_resources(self):
+        """Different URLs at the same dataset version have different ETags."""
+        urls = [
+            "/api/affiliations_list/",
+            "/api/affiliation_detail/?affil_id=10000",
+            "/api/database_list/",
+            f"/api/database_list/{self.affiliation.pk}/",
+            f"/api/affiliation_detail/uuid/{self.affiliation.uuid}/",
+            "/api/cdwg_list/",
+            f"/api/cdwg_detail/id/{self.cdwg.pk}/",
+        ]
+        etags = {self.client.get(url)["ETag"] for url in urls}
+        self.assertEqual(len(etags), len(urls))
+
+    def test_missing_resources_have_no_etag(self):
+        """404 responses shouldn't be cached by clients."""
+        response = self.client.get("/api/database_list/999999/")
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.has_header("ETag"))
+
+    def test_initial_version_exists(self):
+        """The migration should seed a version so ETags work on a fresh database."""
+        self.assertTrue(DatasetVersion.objects.exists())
+
+    def test_writes_update_a_single_version(self):
+        """Writes add to the one version rather than adding rows."""
+        ClinicalDomainWorkingGroup.objects.create(name="Neurology")
+        ClinicalDomainWorkingGroup.objects.create(name="Oncology")
+        self.assertEqual(DatasetVersion.objects.count(), 1)
+
+    def test_writes_lock_the_affiliation_before_the_version(self):
+        """Child writes update the affiliation first, like affiliation saves do."""
+
+        def tables_updated(write):
+            with CaptureQueriesContext(connection) as ctx:
+                write()
+            return [
+                table
+                for query in ctx.captured_queries
+                for table in ("affiliations_affiliation", "affiliations_datasetversion")
+                if query["sql"].startswith(f'UPDATE "{table}"')
+            ]
+
+        expected = ["affiliations_affiliation", "affiliations_datasetversion"]
+        self.assertEqual(tables_updated(self.affiliation.save), expected)
+        self.assertEqual(
+            tables_updated(
+                lambda: Approver.objects.create(
+                    affiliation=self.affiliation, approver_name="Mew"
+                )
+            ),
+            expected,
+        )
+        approver = Approver.objects.get(affiliation=self.affiliation)
+        self.assertEqual(tables_updated(approver.delete), expected)
+
+
+class DatasetVersionConcurrencyTest(TransactionTestCase):
+    """Tests for bumping the dataset version from several connections at once."""
+
+    @skipUnlessDBFeature("has_select_for_update")
+    def test_version_follows_commit_order(self):
+        """A write that started second can't commit a version before the first."""
+        bump_dataset_version()
+        start = current_dataset_version().number
+        first_bumped = threading.Event()
+        release_first = threading.Event()
+        second_done = threading.Event()
+
+        def write(name, bumped=None, release=None):
+            try:
+                with transaction.atomic():
+                    ClinicalDomainWorkingGroup.objects.create(name=name)
+                    if bumped is not None:
+                        bumped.set()
+                        release.wait(10)
+            finally:
+                connection.close()
+
+        def second_write():
+            write("Oncology")
+            second_done.set()
+
+        first = threading.Thread(
+            target=write, args=("Neurology", first_bumped, release_first)
+        )
+        second = threading.Thread(target=second_write)
+        first.start()
+        try:
+            self.assertTrue(first_bumped.wait(10))
+            second.start()
+            # The second write waits for the first one to commit its version.
+            self.assertFalse(second_done.wait(0.5))
+            self.assertEqual(current_dataset_version().number, start)
+        finally:
+            release_first.set()
+            first.join()
+            if second.ident is not None:
+                second.join()
+        self.assertEqual(current_dataset_version().number, start + 2)
+        self.assertEqual(DatasetVersion.objects.count(), 1)
+
+
+class AffiliationPaginationTest(APITestCase):
+    """Tests for opt-in cursor pagination of the affiliations list."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Seed the test database with a GCEP and a VCEP for five affiliation IDs."""
+        cdwg, _ = ClinicalDomainWorkingGroup.objects.get_or_create(name="Cardiology")
+        Affiliation.objects.bulk_create(
+            Affiliation(
+                affiliation_id=10000 + i,
+                expert_panel_id=base + i,
+                full_name=f"Affil {i} {type_}",
+                status="ACTIVE",
+                type=type_,
+                clinical_domain_working_group=cdwg,
+            )
+            for i in range(5)
+            for type_, base in (("GCEP", 40000), ("VCEP", 50000))
+        )
+
+    def test_unpaginated_by_default(self):
+        """Existing clients should keep getting a plain list of everything."""
+        response = self.client.get("/api/database_list/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response.data, list)
+        self.assertEqual(len(response.data), 10)
+
+    def test_walk_every_page(self):
+        """Following the next links should visit every affiliation once, in order."""
+        url = "/api/database_list/?page_size=3"
+        seen = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data["results"]), 3)
+            seen.extend(
+                (a["affiliation_id"], a["expert_panel_id"])
+                for a in response.data["results"]
+            )
+            url = response.data["next"]
+        self.assertEqual(
+            seen,
+            [(10000 + i, base + i) for i in range(5) for base in (40000, 50000)],
+        )
+
+    def test_page_size_is_capped(self):
+        """Clients can't ask for pages bigger than the maximum page size."""
+        response = self.client.get("/api/database_list/?page_size=100000")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), 10)
+        self.assertIsNone(response.data["next"])
+
+
+class AffiliationQueryCountTest(APITestCase):
+    """Tests that reading affiliations costs a fixed number of queries."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Seed the test database with an API key and a CDWG."""
+        _, cls.api_key = CustomAPIKey.objects.create_key(
+            name="test-service", can_write=True
+        )
+        cls.cdwg, _ = ClinicalDomainWorkingGroup.objects.get_or_create(
+            name="Cardiology"
+        )
+
+    def _create_affiliations(self, count, start=0):
+        """Create `count` GCEPs, each with a coordinator, approver and submitter."""
+        affils = Affiliation.objects.bulk_create(
+            Affiliation(
+                affiliation_id=10000 + i,
+                expert_panel_id=40000 + i,
+                full_name=f"Affil {i}",
+                status="ACTIVE",
+                type="GCEP",
+                clinical_domain_working_group=self.cdwg,
+                uuid=f"00000000-0000-0000-0000-{i:012d}",
+            )
+            for i in range(start, start + count)
+        )
+        Coordinator.objects.bulk_create(
+            Coordinator(
+                affiliation=a, coordinator_name="Oak", coordinator_email="o@a.com"
+            )
+            for a in affils
+        )
+        Approver.objects.bulk_create(
+            Approver(affiliation=a, approver_name="Mew") for a in affils
+        )
+        Submitter.objects.bulk_create(
+            Submitter(affiliation=a, clinvar_submitter_id="1") for a in affils
+        )
+        return affils
+
+    def _count_queries(self, url):
+        """Return how many queries a GET request to the URL takes."""
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_list_query_count_does_not_grow(self):
+        """Listing 5 or 50 affiliations should take the same number of queries."""
+        self._create_affiliations(5)
+        small = self._count_queries("/api/database_list/")
+        self._create_affiliations(45, start=5)
+        self.assertEqual(self._count_queries("/api/database_list/"), small)
+
+    def test_paginated_list_query_count_does_not_grow(self):
+        """A page of 5 or 50 affiliations should take the same number of queries."""
+        self._create_affiliations(50)
+        small = self._count_queries("/api/database_list/?page_size=5")
+        self.assertEqual(self._count_queries("/api/database_list/?page_size=50"), small)
+
+    def test_detail_views_use_prefetched_relations(self):
+        """The detail views shouldn't query each nested relation on its own."""
+        affil = self._create_affiliations(1)[0]
+        self.client.credentials(HTTP_X_API_KEY=self.api_key)
+        # The first request with the API key verifies it and caches it.
+        self.client.get(
+            f"/api/affiliation/update/affiliation_id/{affil.affiliation_id}/"
+        )
+        by_pk = self._count_queries(f"/api/database_list/{affil.pk}/")
+        by_uuid = self._count_queries(f"/api/affiliation_detail/uuid/{affil.uuid}/")
+        by_id = self._count_queries(
+            f"/api/affiliation/update/affiliation_id/{affil.affiliation_id}/"
+        )
+        by_ep_id = self._count_queries(
+            f"/api/affiliation/update/expert_panel_id/{affil.expert_panel_id}/"
+        )
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(f"/api/database_list/{affil.pk}/")
+        nested = [
+            q
+            for q in ctx.captured_queries
+            if "affiliations_coordinator" in q["sql"]
+            or "affiliations_approver" in q["sql"]
+            or "affiliations_submitter" in q["sql"]
+        ]
+        self.assertEqual(len(nested), 3)
+        self.assertEqual(by_pk, by_uuid)
+        self.assertEqual(by_id, by_ep_id)
+
+
+class SparseFieldsTest(APITestCase):
+    """Tests for asking for only some of an affiliation's fields."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create an affiliation with nested objects, and an API key."""
+        _, cls.api_key = CustomAPIKey.objects.create_key(name="test-service")
+        cdwg, _ = ClinicalDomainWorkingGroup.objects.get_or_create(name="Cardiology")
+        cls.affil = Affiliation.objects.create(
+            affiliation_id=10000,
+            expert_panel_id=40000,
+            full_name="Affil",
+            status="ACTIVE",
+            type="GCEP",
+            members="Bulbasaur, Charmander, Squirtle",
+            clinical_domain_working_group=cdwg,
+            uuid="00000000-0000-0000-0000-000000000000",
+        )
+        Approver.objects.create(affiliation=cls.affil, approver_name="Mew")
+
+    def _get(self, url, **params):
+        """Make a GET request, return the response body and the SQL it ran."""
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json(), [query["sql"] for query in ctx.captured_queries]
+
+    def test_fields_trims_the_response_and_the_queries(self):
+        """Only the fields asked for are serialized, loaded, or prefetched."""
+        body, queries = self._get(
+            "/api/database_list/", fields="affiliation_id,full_name,approvers"
+        )
+        self.assertEqual(
+            body,
+            [
+                {
+                    "affiliation_id": 10000,
+                    "full_name": "Affil",
+                    "approvers": [{"approver_name": "Mew"}],
+                }
+            ],
+        )
+        (affil_query,) = [q for q in queries if 'FROM "affiliations_affiliation"' in q]
+        self.assertNotIn('"members"', affil_query)
+        self.assertNotIn("affiliations_clinicaldomainworkinggroup", affil_query)
+        self.assertIn("affiliations_approver", " ".join(queries))
+        self.assertNotIn("affiliations_coordinator", " ".join(queries))
+
+    def test_exclude_leaves_out_fields(self):
+        """`exclude` serializes every field but the ones listed."""
+        body, _ = self._get(
+            f"/api/database_list/{self.affil.pk}/", exclude="members,coordinators"
+        )
+        self.assertNotIn("members", body)
+        self.assertNotIn("coordinators", body)
+        self.assertEqual(body["approvers"], [{"approver_name": "Mew"}])
+
+    def test_other_affiliation_endpoints_take_fields(self):
+        """The detail, streamed list, changes, and lookup routes trim fields too."""
+        self.client.credentials(HTTP_X_API_KEY=self.api_key)
+        Affiliation.objects.update(updated_at=F("updated_at") - timedelta(minutes=1))
+        fields = "uuid,full_name"
+        expected = {"full_name": "Affil", "uuid": str(self.affil.uuid)}
+        body, _ = self._get(
+            f"/api/affiliation_detail/uuid/{self.affil.uuid}/", fields=fields
+        )
+        self.assertEqual(body, expected)
+        response = self.client.get(
+            "/api/database_list/", {"stream": "true", "fields": fields}
+        )
+        self.assertEqual(json.loads(response.getvalue()), [expected])
+        body, _ = self._get("/api/affiliations/changes/", fields=fields)
+        self.assertEqual(body["results"], [expected])
+        body, _ = self._get(
+            "/api/affiliations/lookup/", affiliation_ids="10000", fields=fields
+        )
+        self.assertEqual(body["affiliation_ids"]["10000"], [expected])
+
+    def test_unknown_fields_are_rejected(self):
+        """Field names that aren't serialized are rejected."""
+        response = self.client.get("/api/database_list/", {"fields": "full_name,nope"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.json()["details"], {"fields": ["Unknown fields: nope."]}
+        )
+
+
+class StreamingResponseTest(APITestCase):
+    """Tests for streaming the full-dataset endpoints."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Seed the test database with affiliations that have approvers."""
+        _, cls.api_key = CustomAPIKey.objects.create_key(name="test-service")
+        cdwg, _ = ClinicalDomainWorkingGroup.objects.get_or_create(name="Cardiology")
+        affils = Affiliation.objects.bulk_create(
+            Affiliation(
+                affiliation_id=10000 + i,
+                expert_panel_id=base + i,
+                full_name=f"Affil {i} {type_} ü",
+                status="ACTIVE",
+                type=type_,
+                clinical_domain_working_group=cdwg,
+            )
+            for i in range(7)
+            for type_, base in (("GCEP", 40000), ("VCEP", 50000))
+        )
+        Approver.objects.bulk_create(
+            Approver(affiliation=affil, approver_name=f"Approver {affil.type}")
+            for affil in affils
+        )
+
+    def setUp(self):
+        """Authenticate every request with the API key."""
+        self.client.credentials(HTTP_X_API_KEY=self.api_key)
+
+    def test_legacy_stream_matches_rendered_list(self):
+        """The streamed legacy list should be byte-for-byte the regular response."""
+        response = self.client.get("/api/affiliations_list/?stream=true")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(
+            b"".join(response.streaming_content),
+            self.client.get("/api/affiliations_list/").content,
+        )
+
+    def test_legacy_groups_span_chunks(self):
+        """Subgroups split across chunks should still be grouped together."""
+        for chunk_size in (1, 2, 3):
+            self.assertEqual(
+                list(iter_legacy_affiliations(legacy_affiliations(), chunk_size)),
+                build_legacy_affiliations(legacy_affiliations()),
+            )
+
+    def test_database_list_stream_matches_list(self):
+        """The streamed affiliation list should hold the same affiliations."""
+        response = self.client.get("/api/database_list/?stream=true")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        streamed = json.loads(b"".join(response.streaming_content))
+        regular = self.client.get("/api/database_list/").json()
+        key = itemgetter("affiliation_id", "expert_panel_id")
+        self.assertEqual(streamed, sorted(regular, key=key))
+
+    def test_empty_stream_is_valid_json(self):
+        """Streaming no affiliations should produce an empty JSON array."""
+        Affiliation.objects.update(is_deleted=True)
+        response = self.client.get("/api/affiliations_list/?stream=true")
+        self.assertEqual(b"".join(response.streaming_content), b"[]")
+
+    async def test_asgi_stream_is_asynchronous(self):
+        """Under ASGI the stream should be served by an asynchronous iterator."""
+        response = await self.async_client.get(
+            "/api/affiliations_list/?stream=true",
+            headers={"X-Api-Key": self.api_key},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        content = b"".join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(len(json.loads(content)), 7)
+
+
+# The admin pages link static files, which have no manifest until collectstatic runs.
+@override_settings(
+    STORAGES={
+        **settings.STORAGES,
+        "staticfiles": {
+            "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"
+        },
+    }
+)
+class AffiliationAdminTest(TestCase):
+    """Tests for the affiliations admin changelist."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create a superuser and a CDWG."""
+        cls.user = User.objects.create_superuser("admin", "admin@email.com", "pass")
+        cls.cdwg, _ = ClinicalDomainWorkingGroup.objects.get_or_create(
+            name="Cardiology"
+        )
+
+    def setUp(self):
+        """Log in as the superuser."""
+        self.client.force_login(self.user)
+
+    def _create_affiliations(self, start, count):
+        """Create affiliations that each have two coordinators."""
+        affils = Affiliation.objects.bulk_create(
+            Affiliation(
+                affiliation_id=10000 + i,
+                expert_panel_id=40000 + i,
+                full_name=f"Affil {i}",
+                status="ACTIVE",
+                type="GCEP",
+                clinical_domain_working_group=self.cdwg,
+            )
+            for i in range(start, start + count)
+        )
+        Coordinator.objects.bulk_create(
+            Coordinator(
+                affiliation=affil,
+                coordinator_name=f"Coordinator {affil.affiliation_id} {n}",
+                coordinator_email=f"{affil.affiliation_id}.{n}@email.com",
+            )
+            for affil in affils
+            for n in range(2)
+        )
+
+    def _count_queries(self):
+        """Return the number of queries it takes to render the changelist."""
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get("/admin/affiliations/affiliation/")
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_changelist_query_count_does_not_grow(self):
+        """The changelist costs the same number of queries for 2 or 20 rows."""
+        self._create_affiliations(0, 2)
+        small = self._count_queries()
+        self._create_affiliations(2, 18)
+        self.assertEqual(self._count_queries(), small)
+
+    def test_changelist_shows_coordinators(self):
+        """Each row still lists its own coordinators."""
+        self._create_affiliations(0, 2)
+        response = self.client.get("/admin/affiliations/affiliation/")
+        self.assertContains(response, "10001.1@email.com")
+        self.assertContains(response, "Coordinator 10000 0")
+
+    def _add(self, **data):
+        """Submit the admin add form for a GCEP, with no inline rows by default."""
+        form = {
+            "full_name": "New GCEP",
+            "type": "GCEP",
+            "status": "APPLYING",
+            "clinical_domain_working_group": str(self.cdwg.pk),
+        }
+        for prefix in ("coordinators", "approvers", "clinvar_submitter_ids"):
+            form[f"{prefix}-TOTAL_FORMS"] = "0"
+            form[f"{prefix}-INITIAL_FORMS"] = "0"
+        form.update(data)
+        return self.client.post("/admin/affiliations/affiliation/add/", form)
+
+    def test_add_assigns_ids_when_saved(self):
+        """A new affiliation gets matching affiliation and expert panel IDs."""
+        response = self._add()
+        self.assertEqual(response.status_code, 302)
+        affil = Affiliation.objects.get(full_name="New GCEP")
+        self.assertEqual(
+            affil.expert_panel_id - GCEP_BASE, affil.affiliation_id - AFFIL_BASE
+        )
+
+    def test_failed_add_does_not_use_an_id(self):
+        """An add that fails validation in an inline doesn't use up an ID."""
+        counter, _ = AffiliationIdCounter.objects.get_or_create(
+            pk=1, defaults={"next_id": AFFIL_BASE}
+        )
+        response = self._add(
+            **{
+                "coordinators-TOTAL_FORMS": "1",
+                "coordinators-0-coordinator_name": "Oak",
+                "coordinators-0-coordinator_email": "not an email",
+            }
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Affiliation.objects.exists())
+        self.assertEqual(AffiliationIdCounter.objects.get().next_id, counter.next_id)
+        self._add()
+        self.assertEqual(Affiliation.objects.get().affiliation_id, counter.next_id)
+
+    def test_add_with_no_ids_left_shows_an_error(self):
+        """Running out of IDs is reported on the form, not as a server error."""
+        AffiliationIdCounter.objects.update_or_create(pk=1, defaults={"next_id": 20000})
+        response = self._add()
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Affiliation ID out of range.")
+        self.assertFalse(Affiliation.objects.exists())
+        self.assertEqual(AffiliationIdCounter.objects.get().next_id, 20000)
+
+    def _post_export(self, file_format, fields=None):
+        """Submit the admin export form for the format and fields."""
+        fields = fields or AffiliationResource.Meta.fields
+        formats = admin.site.get_model_admin(Affiliation).get_export_formats()
+        data = {"format": str(formats.index(file_format)), "resource": "0"}
+        data.update({f"affiliationresource_{field}": "on" for field in fields})
+        return self.client.post("/admin/affiliations/affiliation/export/", data)
+
+    def _export(self, file_format, fields=None):
+        """Export the affiliations in the given format, return the response and body."""
+        response = self._post_export(file_format, fields)
+        return response, b"".join(response.streaming_content)
+
+    def test_export_other_formats_with_the_library(self):
+        """Formats that aren't streamed are exported by django-import-export."""
+        self._create_affiliations(0, 2)
+        response = self._post_export(base_formats.HTML)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.streaming)
+        self.assertIn("attachment;", response["Content-Disposition"])
+        expected = AffiliationResource().export(Affiliation.objects.order_by("pk"))
+        self.assertEqual(response.content.decode(), expected.html)
+
+    def test_export_streams_csv_with_constant_queries(self):
+        """A CSV export is streamed, and costs the same queries for 2 or 20 rows."""
+        self._create_affiliations(0, 2)
+        with CaptureQueriesContext(connection) as small:
+            self._export(base_formats.CSV)
+        self._create_affiliations(2, 18)
+        with CaptureQueriesContext(connection) as large:
+            response, content = self._export(base_formats.CSV)
+        self.assertEqual(len(large.captured_queries), len(small.captured_queries))
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertIn("attachment;", response["Content-Disposition"])
+        expected = AffiliationResource().export(Affiliation.objects.order_by("pk"))
+        self.assertEqual(content.decode(), expected.csv)
+
+    def test_export_json_matches_default_export(self):
+        """A JSON export is the same as the one django-import-export would build."""
+        self._create_affiliations(0, 3)
+        response, content = self._export(base_formats.JSON)
+        self.assertTrue(response.streaming)
+        expected = AffiliationResource().export(Affiliation.objects.order_by("pk"))
+        self.assertEqual(content.decode(), expected.json)
+
+    def test_export_only_selected_fields(self):
+        """Only the fields picked on the export form are exported."""
+        self._create_affiliations(0, 2)
+        _, content = self._export(
+            base_formats.TSV, fields=["affiliation_id", "full_name"]
+        )
+        self.assertEqual(
+            content.decode().splitlines(),
+            ["affiliation_id\tfull_name", "10000\tAffil 0", "10001\tAffil 1"],
+        )
+
+
+class AsyncViewsTest(APITestCase):
+    """Tests for the async versions of the read-only views."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Seed the test database with affiliations, a CDWG, and an API key."""
+        _, cls.api_key = CustomAPIKey.objects.create_key(name="test-service")
+        cls.cdwg, _ = ClinicalDomainWorkingGroup.objects.get_or_create(
+            name="Cardiology"
+        )
+        affils = Affiliation.objects.bulk_create(
+            Affiliation(
+                affiliation_id=10000 + i,
+                expert_panel_id=base + i,
+                full_name=f"Affil {i} {type_} ü",
+                status="ACTIVE",
+                type=type_,
+                clinical_domain_working_group=cls.cdwg,
+                uuid=f"00000000-0000-{base // 10}-0000-{i:012d}",
+            )
+            for i in range(3)
+            for type_, base in (("GCEP", 40000), ("VCEP", 50000))
+        )
+        Approver.objects.bulk_create(
+            Approver(affiliation=affil, approver_name=f"Approver {affil.type}")
+            for affil in affils
+        )
+        Coordinator.objects.create(
+            affiliation=affils[0],
+            coordinator_name="Oak",
+            coordinator_email="oak@email.com",
+        )
+
+    def setUp(self):
+        """Authenticate every request with the API key."""
+        self.client.credentials(HTTP_X_API_KEY=self.api_key)
+
+    def test_async_views_match_sync_views(self):
+        """Each async route returns the same response as its synchronous route."""
+        paths = [
+            "affiliations_list/",
+            "affiliations_list/?stream=true",
+            "affiliation_detail/?affil_id=10001",
+            "affiliation_detail/uuid/00000000-0000-4000-0000-000000000000/",
+            "affiliation_detail/uuid/00000000-0000-0000-0000-000000000000/",
+            "cdwg_list/",
+            f"cdwg_detail/id/{self.cdwg.id}/",
+            "cdwg_detail/id/999999/",
+            "cdwg_detail/name/Cardiology/",
+        ]
+        for path in paths:
+            with self.subTest(path=path):
+                expected = self.client.get(f"/api/{path}")
+                response = self.client.get(f"/api/async/{path}")
+                self.assertEqual(response.status_code, expected.status_code)
+                self.assertEqual(response.getvalue(), expected.getvalue())
+
+    def test_async_views_require_api_key(self):
+        """Routes that need an API key deny requests without one, like the others."""
+        self.client.credentials()
+        for path in ["affiliations_list/", "cdwg_list/"]:
+            with self.subTest(path=path):
+                expected = self.client.get(f"/api/{path}")
+                response = self.client.get(f"/api/async/{path}")
+                self.assertEqual(response.status_code, 403)
+                self.assertEqual(response.json(), expected.json())
+
+    async def test_async_views_answer_conditional_requests(self):
+        """Under ASGI, a matching ETag gets a 304 response."""
+        headers = {"X-Api-Key": self.api_key}
+        response = await self.async_client.get(
+            "/api/async/affiliations_list/", headers=headers
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(json.loads(response.content)), 3)
+        response = await self.async_client.get(
+            "/api/async/affiliations_list/",
+            headers={**headers, "If-None-Match": response["ETag"]},
+        )
+        self.assertEqual(response.status_code, 304)
+
+
+class AffiliationChangesTest(APITestCase):
+    """Tests for listing the affiliations that changed since a cursor."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create three affiliations and an API key."""
+        _, cls.api_key = CustomAPIKey.objects.create_key(name="test-service")
+        cls.cdwg, _ = ClinicalDomainWorkingGroup.objects.get_or_create(
+            name="Cardiology"
+        )
+        cls.affils = [
+            Affiliation.objects.create(
+                affiliation_id=10000 + i,
+                expert_panel_id=40000 + i,
+                full_name=f"Affil {i}",
+                status="ACTIVE",
+                type="GCEP",
+                clinical_domain_working_group=cls.cdwg,
+            )
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        """Authenticate every request with the API key, and let the changes settle."""
+        self.client.credentials(HTTP_X_API_KEY=self.api_key)
+        self._settle()
+
+    def _settle(self):
+        """Move every change back in time, so none are held back as too recent."""
+        Affiliation.objects.update(updated_at=F("updated_at") - timedelta(minutes=1))
+
+    def _changes(self, **params):
+        """Request the changes, return the response body."""
+        response = self.client.get("/api/affiliations/changes/", params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+
+    def _ids(self, body):
+        """Return the affiliation IDs in a response body."""
+        return [affil["affiliation_id"] for affil in body["results"]]
+
+    def test_first_sync_lists_every_affiliation_in_pages(self):
+        """Without a cursor, every affiliation is listed, a page at a time."""
+        first = self._changes(page_size=2)
+        self.assertEqual(self._ids(first), [10000, 10001])
+        self.assertTrue(first["has_more"])
+        second = self._changes(since=first["next"], page_size=2)
+        self.assertEqual(self._ids(second), [10002])
+        self.assertFalse(second["has_more"])
+        third = self._changes(since=second["next"])
+        self.assertEqual(third["results"], [])
+        self.assertEqual(third["next"], second["next"])
+
+    def test_only_changes_after_the_cursor_are_listed(self):
+        """Edits, child changes, and soft deletes after the cursor are listed."""
+        cursor = self._changes()["next"]
+        first, second, third = self.affils
+        third.full_name = "Renamed"
+        third.save()
+        Coordinator.objects.create(
+            affiliation=first,
+            coordinator_name="Oak",
+            coordinator_email="oak@email.com",
+        )
+        second.delete()
+        self._settle()
+
+        body = self._changes(since=cursor)
+        self.assertEqual(self._ids(body), [10002, 10000, 10001])
+        self.assertEqual(body["results"][0]["full_name"], "Renamed")
+        self.assertEqual(
+            body["results"][1]["coordinators"][0]["coordinator_name"], "Oak"
+        )
+        self.assertTrue(body["results"][2]["is_deleted"])
+        self.assertEqual(self._changes(since=body["next"])["results"], [])
+
+    def test_nested_updates_mark_the_affiliation_changed(self):
+        """Replacing nested objects through the serializer marks the change."""
+        cursor = self._changes()["next"]
+        serializer = AffiliationSerializer(
+            self.affils[1],
+            data={"approvers": [{"approver_name": "Mew"}]},
+            partial=True,
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        self._settle()
+        self.assertEqual(self._ids(self._changes(since=cursor)), [10001])
+
+    def test_recent_changes_are_held_back(self):
+        """Changes from the last few seconds wait for the next request."""
+        cursor = self._changes()["next"]
+        self.affils[0].save()
+        self.assertEqual(self._changes(since=cursor)["results"], [])
+
+    def _hold_transaction(self, sql):
+        """Run the SQL in a transaction on another connection, until the test ends."""
+        started = threading.Event()
+        release = threading.Event()
+
+        def hold_transaction():
+            try:
+                with transaction.atomic():
+                    with connection.cursor() as cursor:
+                        cursor.execute(sql)
+                    started.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=hold_transaction)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(release.set)
+        self.assertTrue(started.wait(10))
+        return release, thread
+
+    @skipUnless(connection.vendor == "postgresql", "Needs pg_stat_activity.")
+    def test_changes_wait_for_open_writes(self):
+        """Changes made after another write started wait for it to end."""
+        # Taking a transaction ID is what writing does first.
+        release, thread = self._hold_transaction("SELECT txid_current()")
+        with patch("affiliations.changes.CHANGES_SETTLE_TIME", timedelta(0)):
+            self.affils[0].save()
+            self.assertEqual(self._ids(self._changes()), [10001, 10002])
+            release.set()
+            thread.join()
+            self.assertEqual(self._ids(self._changes()), [10001, 10002, 10000])
+
+    @skipUnless(connection.vendor == "postgresql", "Needs pg_stat_activity.")
+    def test_changes_do_not_wait_for_reads(self):
+        """A transaction that only reads, like a long request, doesn't hold changes."""
+        self._hold_transaction("SELECT 1")
+        with patch("affiliations.changes.CHANGES_SETTLE_TIME", timedelta(0)):
+            self.affils[0].save()
+            self.assertEqual(self._ids(self._changes()), [10001, 10002, 10000])
+
+    def test_invalid_cursor(self):
+        """A cursor that wasn't handed out is rejected."""
+        response = self.client.get("/api/affiliations/changes/", {"since": "nope"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_requires_api_key(self):
+        """Requests without an API key are rejected."""
+        self.client.credentials()
+        response = self.client.get("/api/affiliations/changes/")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class ChangeEventsTest(APITestCase):
+    """Tests for recording and streaming change events."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create an affiliation, a CDWG, and an API key."""
+        _, cls.api_key = CustomAPIKey.objects.create_key(name="test-service")
+        cls.cdwg, _ = ClinicalDomainWorkingGroup.objects.get_or_create(
+            name="Cardiology"
+        )
+        cls.affil = Affiliation.objects.create(
+            affiliation_id=10000,
+            expert_panel_id=40000,
+            full_name="Affil",
+            status="ACTIVE",
+            type="GCEP",
+            clinical_domain_working_group=cls.cdwg,
+            uuid="00000000-0000-4000-0000-000000000000",
+        )
+        # Settle the events for creating them, so they don't hold back later ones.
+        ChangeEvent.objects.update(created_at=now() - timedelta(minutes=1))
+
+    def _kinds(self):
+        """Return the kinds of the recorded events, oldest first."""
+        return list(ChangeEvent.objects.order_by("pk").values_list("kind", flat=True))
+
+    def _event(self, kind=ChangeKind.UPDATED):
+        """Record a settled event for the affiliation."""
+        return ChangeEvent.objects.create(
+            kind=kind,
+            affiliation_id=self.affil.affiliation_id,
+            expert_panel_id=self.affil.expert_panel_id,
+            uuid=self.affil.uuid,
+            created_at=now() - timedelta(minutes=1),
+        )
+
+    def test_writes_record_events(self):
+        """Saves, soft deletes, nested updates, and CDWG edits record an event."""
+        ChangeEvent.objects.all().delete()
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.affil.full_name = "Renamed"
+            self.affil.save()
+            serializer = AffiliationSerializer(
+                self.affil,
+                data={"approvers": [{"approver_name": "Mew"}]},
+                partial=True,
+            )
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
+            self.affil.delete()
+            self.cdwg.name = "Cardio"
+            self.cdwg.save()
+        # The events are saved with the writes, not after they're committed.
+        self.assertEqual(callbacks, [])
+        self.assertEqual(
+            self._kinds(),
+            [
+                ChangeKind.UPDATED,
+                ChangeKind.UPDATED,
+                ChangeKind.DELETED,
+                ChangeKind.CDWG_UPDATED,
+            ],
+        )
+        event = ChangeEvent.objects.order_by("pk").first()
+        self.assertEqual(event.affiliation_id, 10000)
+        self.assertEqual(str(event.uuid), "00000000-0000-4000-0000-000000000000")
+
+    def test_rolled_back_writes_record_nothing(self):
+        """A write that is rolled back doesn't send an event."""
+        ChangeEvent.objects.all().delete()
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.affil.save()
+            self.assertEqual(self._kinds(), [ChangeKind.UPDATED])
+            raise RuntimeError
+        self.assertEqual(self._kinds(), [])
+
+    @skipUnless(connection.vendor == "postgresql", "Needs pg_stat_activity.")
+    def test_events_wait_for_open_writes(self):
+        """Events created after another write started wait for it to end."""
+        started = threading.Event()
+        release = threading.Event()
+
+        def hold_write():
+            try:
+                with transaction.atomic():
+                    ChangeEvent.objects.create(kind=ChangeKind.UPDATED)
+                    started.set()
+                    release.wait(10)
+                    transaction.set_rollback(True)
+            finally:
+                connection.close()
+
+        after = self._event().pk
+        thread = threading.Thread(target=hold_write)
+        thread.start()
+        try:
+            self.assertTrue(started.wait(10))
+            with patch("affiliations.events.EVENT_SETTLE_TIME", timedelta(0)):
+                event = ChangeEvent.objects.create(kind=ChangeKind.DELETED)
+                self.assertEqual(async_to_sync(settled_events)(after), [])
+                release.set()
+                thread.join()
+                self.assertEqual(async_to_sync(settled_events)(after), [event])
+        finally:
+            release.set()
+            thread.join()
+
+    async def _first_events(self, last_event_id, count):
+        """Return the first events streamed after the ID, after the retry delay."""
+        stream = event_stream(last_event_id, ChangeBroadcaster(poll_interval=60))
+        try:
+            self.assertEqual(await anext(stream), "retry: 5000\n\n")
+            return [await anext(stream) for _ in range(count)]
+        finally:
+            await stream.aclose()
+
+    async def test_stream_resets_when_the_last_event_is_gone(self):
+        """A client whose last event was deleted is told to sync again."""
+        pruned = await sync_to_async(self._event)()
+        await ChangeEvent.objects.filter(pk=pruned.pk).adelete()
+        # Even with no events left at all.
+        self.assertEqual(
+            await self._first_events(pruned.pk, 1), ["event: reset\ndata: {}\n\n"]
+        )
+        kept = await sync_to_async(self._event)()
+        self.assertEqual(
+            await self._first_events(pruned.pk, 2),
+            ["event: reset\ndata: {}\n\n", format_event(kept)],
+        )
+
+    async def test_stream_does_not_reset_on_gaps(self):
+        """IDs skipped by the sequence, e.g. by rolled back writes, aren't missed."""
+        first = await sync_to_async(self._event)()
+        second = await sync_to_async(self._event)()
+        await ChangeEvent.objects.filter(pk=second.pk).aupdate(id=second.pk + 10)
+        self.assertEqual(
+            await self._first_events(first.pk, 1),
+            [format_event(await ChangeEvent.objects.aget(pk=second.pk + 10))],
+        )
+
+    async def test_stream_resumes_and_then_follows_new_events(self):
+        """The events after Last-Event-ID are replayed, then new ones are sent."""
+        first = await sync_to_async(self._event)()
+        second = await sync_to_async(self._event)(ChangeKind.DELETED)
+        stream = event_stream(first.pk, ChangeBroadcaster(poll_interval=0.01))
+        try:
+            self.assertEqual(await anext(stream), "retry: 5000\n\n")
+            self.assertEqual(
+                await anext(stream),
+                f"id: {second.pk}\nevent: change\n"
+                'data: {"kind":"deleted","affiliation_id":10000,'
+                '"expert_panel_id":40000,'
+                '"uuid":"00000000-0000-4000-0000-000000000000"}\n\n',
+            )
+            third = await sync_to_async(self._event)()
+            self.assertTrue((await anext(stream)).startswith(f"id: {third.pk}\n"))
+        finally:
+            await stream.aclose()
+
+    async def test_feed_starts_before_unsettled_events(self):
+        """An event that commits after a newer one is sent to the first subscriber."""
+        settled = await sync_to_async(self._event)()
+        newer = await ChangeEvent.objects.acreate(
+            pk=settled.pk + 2, kind=ChangeKind.DELETED
+        )
+        source = ChangeBroadcaster(poll_interval=0.01)
+        queue, position = await source.subscribe()
+        try:
+            self.assertEqual(position, settled.pk)
+            older = await ChangeEvent.objects.acreate(
+                pk=settled.pk + 1,
+                kind=ChangeKind.UPDATED,
+                created_at=now() - timedelta(minutes=1),
+            )
+            await ChangeEvent.objects.filter(pk=newer.pk).aupdate(
+                created_at=now() - timedelta(minutes=1)
+            )
+            self.assertEqual(
+                [await asyncio.wait_for(queue.get(), 5) for _ in range(2)],
+                [older, newer],
+            )
+        finally:
+            source.unsubscribe(queue)
+
+    async def test_slow_subscribers_are_dropped(self):
+        """A subscriber whose buffer fills up is told to reconnect."""
+        source = ChangeBroadcaster(buffer_size=1)
+        queue, _ = await source.subscribe()
+        source.publish([ChangeEvent(pk=1), ChangeEvent(pk=2)])
+        self.assertIs(queue.get_nowait(), OVERFLOW)
+        self.assertEqual(source.subscribers, set())
+        self.assertEqual(source.position, 2)
+
+    async def test_events_view_streams_server_sent_events(self):
+        """The route streams events to clients with an API key."""
+        event = await sync_to_async(self._event)()
+        response = await self.async_client.get(
+            "/api/async/affiliations/events/",
+            headers={"X-Api-Key": self.api_key, "Last-Event-ID": str(event.pk - 1)},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        stream = response.streaming_content
+        try:
+            self.assertEqual(await anext(stream), b"retry: 5000\n\n")
+            self.assertTrue(
+                (await anext(stream)).startswith(f"id: {event.pk}".encode())
+            )
+        finally:
+            await stream.aclose()
+
+    def test_events_view_rejects_bad_requests(self):
+        """Requests without an API key, or with a bad Last-Event-ID, are rejected."""
+        response = self.client.get("/api/async/affiliations/events/")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.client.credentials(HTTP_X_API_KEY=self.api_key)
+        response = self.client.get(
+            "/api/async/affiliations/events/", HTTP_LAST_EVENT_ID="nope"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class AffiliationLookupTest(APITestCase):
+    """Tests for looking up many affiliations at once."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create a GCEP and VCEP that share an affiliation ID, and an API key."""
+        _, cls.api_key = CustomAPIKey.objects.create_key(name="test-service")
+        cls.cdwg, _ = ClinicalDomainWorkingGroup.objects.get_or_create(
+            name="Cardiology"
+        )
+        for i in range(3):
+            for type_, base in (("GCEP", 40000), ("VCEP", 50000)):
+                affil = Affiliation.objects.create(
+                    affiliation_id=10000 + i,
+                    expert_panel_id=base + i,
+                    full_name=f"Affil {i} {type_}",
+                    status="ACTIVE",
+                    type=type_,
+                    clinical_domain_working_group=cls.cdwg,
+                    uuid=f"00000000-0000-{base // 10}-0000-{i:012d}",
+                )
+                Approver.objects.create(affiliation=affil, approver_name="Mew")
+
+    def setUp(self):
+        """Authenticate every request with the API key."""
+        self.client.credentials(HTTP_X_API_KEY=self.api_key)
+
+    def test_get_resolves_each_identifier(self):
+        """Found identifiers map to affiliations, the rest to null."""
+        response = self.client.get(
+            "/api/affiliations/lookup/",
+            {
+                "uuids": "00000000-0000-4000-0000-000000000001,"
+                "00000000-0000-0000-0000-000000000000",
+                "affiliation_ids": ["10000", "99999"],
+                "expert_panel_ids": "50002",
+            },
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        body = response.json()
+        self.assertEqual(
+            body["uuids"]["00000000-0000-4000-0000-000000000001"]["expert_panel_id"],
+            40001,
+        )
+        self.assertIsNone(body["uuids"]["00000000-0000-0000-0000-000000000000"])
+        self.assertEqual(
+            [affil["type"] for affil in body["affiliation_ids"]["10000"]],
+            ["GCEP", "VCEP"],
+        )
+        self.assertIsNone(body["affiliation_ids"]["99999"])
+        self.assertEqual(
+            body["expert_panel_ids"]["50002"]["approvers"], [{"approver_name": "Mew"}]
+        )
+
+    def test_post_takes_lists_in_the_body(self):
+        """POST looks up the identifiers in the body, in the same format."""
+        response = self.client.post(
+            "/api/affiliations/lookup/",
+            {"expert_panel_ids": [40000, 40001]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(response.json()), ["expert_panel_ids"])
+        self.assertEqual(
+            response.json()["expert_panel_ids"]["40001"]["full_name"], "Affil 1 GCEP"
+        )
+
+    def test_results_are_keyed_by_the_identifiers_as_given(self):
+        """Mixed-case UUIDs and zero-padded IDs come back the way they were sent."""
+        uuid = "00000000-0000-4000-0000-00000000000A"
+        Affiliation.objects.filter(expert_panel_id=40001).update(uuid=uuid)
+        response = self.client.get(
+            "/api/affiliations/lookup/",
+            {"uuids": uuid, "affiliation_ids": "010001"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        body = response.json()
+        self.assertEqual(list(body["uuids"]), [uuid])
+        self.assertEqual(body["uuids"][uuid]["expert_panel_id"], 40001)
+        self.assertEqual(list(body["affiliation_ids"]), ["010001"])
+        self.assertEqual(len(body["affiliation_ids"]["010001"]), 2)
+        response = self.client.post(
+            "/api/affiliations/lookup/",
+            {"uuids": [uuid.lower(), uuid]},
+            format="json",
+        )
+        self.assertEqual(list(response.json()["uuids"]), [uuid.lower(), uuid])
+
+    def test_query_count_does_not_grow_with_identifiers(self):
+        """Each kind of identifier costs the same queries, however many there are."""
+
+        def count_queries(count):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.post(
+                    "/api/affiliations/lookup/",
+                    {
+                        "affiliation_ids": list(range(10000, 10000 + count)),
+                        "expert_panel_ids": list(range(40000, 40000 + count)),
+                    },
+                    format="json",
+                )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return len(ctx.captured_queries)
+
+        self.assertEqual(count_queries(1), count_queries(3))
+
+    def test_invalid_lookups_are_rejected(self):
+        """Bad identifiers, or none at all, are rejected."""
+        for params in [{}, {"uuids": "nope"}, {"affiliation_ids": "ten"}]:
+            with self.subTest(params=params):
+                response = self.client.get("/api/affiliations/lookup/", params)
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_requires_api_key(self):
+        """Requests without an API key are rejected."""
+        self.client.credentials()
+        response = self.client.get(
+            "/api/affiliations/lookup/", {"affiliation_ids": "10000"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
 
-    def test_should_be_able_to_view_list_of_affiliations(self):
-        """Make sure we are able to view our list of affiliations."""
-        client = APIClient()
-        response = client.get("/api/database_list/")
-        self.assertEqual(response.status_code, 200)
-        self.assertEqual(len(response.data), 1)
-        returned_names = {affil["full_name"] for affil in response.data}
-        self.assertIn("Test Success Result Affil", returned_names)
+class BulkCreateAffiliationsTest(APITestCase):
+    """Tests for creating many affiliations with one request."""
 
-    def test_should_be_able_to_view_single_affiliation_detail(self):
-        """Make sure we are able to view a single affiliation's details."""
-        client = APIClient()
-        affil = Affiliation.objects.get(full_name="Test Success Result Affil")
+    url = "/api/affiliation/bulk_create/"
 
-        response = client.get(f"/api/database_list/{affil.pk}/")
-        self.assertEqual(response.status_code, 200)
-        self.assertEqual(
-            response.data["full_name"], self.success_affiliation["full_name"]
+    @classmethod
+    def setUpTestData(cls):
+        """Seed the test database with CDWGs, an affiliation, and an API key."""
+        _, cls.api_key = CustomAPIKey.objects.create_key(
+            name="test-service", can_write=True
         )
-
-    def test_should_be_able_to_look_up_affiliation_by_uuid(self):
-        """Make sure we can look up an affiliation by its GPM UUID."""
-        client = APIClient()
-        response = client.get(
-            f"/api/affiliation_detail/uuid/{self.success_affiliation['uuid']}/"
+        cls.cdwg, _ = ClinicalDomainWorkingGroup.objects.get_or_create(
+            name="Cardiology"
         )
-        self.assertEqual(response.status_code, 200)
-        self.assertEqual(
-            response.data["full_name"], self.success_affiliation["full_name"]
+        cls.none_cdwg, _ = ClinicalDomainWorkingGroup.objects.get_or_create(name="None")
+        Affiliation.objects.create(
+            affiliation_id=10000,
+            expert_panel_id=40000,
+            full_name="Existing GCEP",
+            status="ACTIVE",
+            type="GCEP",
+            clinical_domain_working_group=cls.cdwg,
+            uuid="86af9d32-9e14-43de-b2a1-01acd33b2d02",
         )
 
-    def test_detail_affiliation_json_call(self):
-        """Make sure the API response of a single affiliation is returned
-        in the original JSON format ."""
+    def setUp(self):
+        """Authenticate every request with the API key."""
         self.client.credentials(HTTP_X_API_KEY=self.api_key)
-        response = self.client.get("/api/affiliation_detail/?affil_id=10000")
+
+    def _payload(self, count, type_="GCEP"):
+        """Build `count` affiliations to create, each with nested objects."""
+        return [
+            {
+                "full_name": f"Bulk {type_} {i}",
+                "type": type_,
+                "status": "APPLYING",
+                "clinical_domain_working_group": self.cdwg.id,
+                "uuid": f"00000000-0000-0000-0000-{i:012d}",
+                "coordinators": [
+                    {"coordinator_name": "Oak", "coordinator_email": "oak@email.com"}
+                ],
+                "approvers": [{"approver_name": "Mew"}],
+                "clinvar_submitter_ids": [{"clinvar_submitter_id": str(i)}],
+            }
+            for i in range(count)
+        ]
+
+    def test_bulk_create_success(self):
+        """IDs are handed out as one block, in the order affiliations were sent."""
+        payload = self._payload(2) + [
+            {
+                "full_name": "Bulk VCEP",
+                "type": "VCEP",
+                "status": "APPLYING",
+                "clinical_domain_working_group": self.cdwg.id,
+                "uuid": "72b0b9fc-a66e-4825-a747-429db7028ac5",
+            },
+            {
+                "full_name": "Bulk Independent",
+                "type": "INDEPENDENT_CURATION",
+                "status": "APPLYING",
+                "clinical_domain_working_group": self.none_cdwg.id,
+            },
+        ]
+        response = self.client.post(self.url, payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(
-            response.json(),
+            response.data,
             [
-                {
-                    "affiliation_id": "10000",
-                    "affiliation_fullname": "Test Success Result Affil",
-                    "subgroups": {
-                        "gcep": {
-                            "id": "40000",
-                            "fullname": "Test Success Result Affil",
-                        }
-                    },
-                    "approver": ["Mew"],
-                }
+                {"affiliation_id": 10001, "expert_panel_id": 40001},
+                {"affiliation_id": 10002, "expert_panel_id": 40002},
+                {"affiliation_id": 10003, "expert_panel_id": 50003},
+                {"affiliation_id": 10004, "expert_panel_id": None},
             ],
         )
-        self.assertEqual(response.status_code, 200)
+        created = Affiliation.objects.get(affiliation_id=10002)
+        self.assertEqual(created.full_name, "Bulk GCEP 1")
+        self.assertEqual(created.coordinators.get().coordinator_name, "Oak")
+        self.assertEqual(created.approvers.get().approver_name, "Mew")
+        self.assertEqual(created.clinvar_submitter_ids.get().clinvar_submitter_id, "1")
+
+    def test_query_count_does_not_grow(self):
+        """Creating 2 or 20 affiliations should take the same number of queries."""
+        with CaptureQueriesContext(connection) as small:
+            response = self.client.post(self.url, self._payload(2), format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        Affiliation.objects.exclude(affiliation_id=10000).delete()
+        Affiliation.objects.filter(is_deleted=True).update(uuid=None)
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.post(self.url, self._payload(20), format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(large.captured_queries), len(small.captured_queries))
 
-    def test_list_affiliation_json_call(self):
-        """Make sure the API response of all the affiliations in the db is
-        returned in the original JSON format ."""
-        self.client.credentials(HTTP_X_API_KEY=self.api_key)
-        response = self.client.get("/api/affiliations_list/")
-        self.assertEqual(response.status_code, 200)
-        self.assertEqual(len(response.json()), 1)
+    def test_existing_uuid_fails_whole_batch(self):
+        """An already-used UUID is reported per affiliation and nothing is created."""
+        payload = self._payload(2)
+        payload[1]["uuid"] = "86af9d32-9e14-43de-b2a1-01acd33b2d02"
+        response = self.client.post(self.url, payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["details"][0], {})
+        self.assertIn("uuid", response.data["details"][1])
+        self.assertEqual(Affiliation.objects.count(), 1)
+
+    def test_repeated_uuid_in_batch_fails(self):
+        """The same UUID can't be used twice in one batch."""
+        payload = self._payload(2)
+        payload[1]["uuid"] = payload[0]["uuid"]
+        response = self.client.post(self.url, payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("uuid", response.data["details"][1])
 
-    def test_create_affiliation__success(self):
-        """Test successful creation of affiliation via POST API with valid data."""
-        self.client.credentials(HTTP_X_API_KEY=self.api_key)
-        response = self.client.post(
-            "/api/affiliation/create/",
-            self.create_data,
-            format="json",
-        )
-        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
-        self.assertIn("affiliation_id", response.data)
-        self.assertIn("expert_panel_id", response.data)
+    def test_ids_cannot_be_assigned(self):
+        """Affiliation IDs are always generated, never taken from the request."""
+        payload = self._payload(1)
+        payload[0]["affiliation_id"] = 12345
+        response = self.client.post(self.url, payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("non_field_errors", response.data["details"][0])
 
-    def test_create_affiliation_missing_required_fields(self):
-        """Test that missing required fields in POST request returns 400 and error messages."""
-        self.client.credentials(HTTP_X_API_KEY=self.api_key)
-        response = self.client.post("/api/affiliation/create/", {}, format="json")
+    def test_unknown_cdwg_fails(self):
+        """A CDWG that doesn't exist is reported like a single create would."""
+        payload = self._payload(1)
+        payload[0]["clinical_domain_working_group"] = 999999
+        response = self.client.post(self.url, payload, format="json")
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
-        self.assertIn("full_name", response.data["details"])
-        self.assertIn("type", response.data["details"])
+        self.assertIn("clinical_domain_working_group", response.data["details"][0])
+
+    def test_empty_or_non_list_payload_fails(self):
+        """The request body must be a non-empty list of affiliations."""
+        for payload in ([], self._payload(1)[0]):
+            response = self.client.post(self.url, payload, format="json")
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_create_bumps_dataset_version(self):
+        """Bulk inserts don't send signals, so the version is bumped explicitly."""
+        before = current_dataset_version()
+        self.client.post(self.url, self._payload(1), format="json")
+        self.assertGreater(current_dataset_version().number, before.number)
 
 
 class TestCDWGModel(TestCase):
@@ -340,6 +2002,557 @@ class AffiliationUtilsTest(TestCase):
         self.assertIn("affiliation_id is required", str(cm.exception))
 
 
+class UppercaseShortNames(DataFix):
+    """Uppercase the short names of GCEPs, in Python."""
+
+    fields = ["short_name"]
+    filter = Q(type="GCEP")
+
+    def transform(self, obj):
+        return {"short_name": obj.short_name.upper()}
+
+
+class AddTypeSuffix(DataFix):
+    """Add the type to the full names that don't end with it, in SQL."""
+
+    fields = ["full_name"]
+    filter = ~Q(full_name__endswith=F("type"))
+    update = {"full_name": Concat("full_name", Value(" "), "type")}
+
+
+class DataFixTest(TestCase):
+    """Tests for applying data fixes in bulk."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create a GCEP with a lowercase short name and a VCEP without a suffix."""
+        cdwg, _ = ClinicalDomainWorkingGroup.objects.get_or_create(name="Cardiology")
+        fields = {"status": "ACTIVE", "clinical_domain_working_group": cdwg}
+        cls.gcep = Affiliation.objects.create(
+            affiliation_id=10000,
+            expert_panel_id=40000,
+            type="GCEP",
+            full_name="Heart GCEP",
+            short_name="heart",
+            **fields,
+        )
+        cls.vcep = Affiliation.objects.create(
+            affiliation_id=10000,
+            expert_panel_id=50000,
+            type="VCEP",
+            full_name="Heart",
+            short_name="HEART",
+            **fields,
+        )
+
+    def test_dry_run_changes_nothing(self):
+        """A dry run reports the changes without saving them."""
+        version = current_dataset_version()
+        summary = apply_fix(UppercaseShortNames(), dry_run=True)
+        self.assertEqual(summary["checked"], 1)
+        self.assertEqual(
+            summary["changes"], [(self.gcep.pk, {"short_name": ("heart", "HEART")})]
+        )
+        self.gcep.refresh_from_db()
+        self.assertEqual(self.gcep.short_name, "heart")
+        self.assertEqual(current_dataset_version().number, version.number)
+
+    def test_transform_fix_is_saved_in_bulk(self):
+        """Changed rows are saved with one update, and the version is bumped."""
+        version = current_dataset_version()
+        with CaptureQueriesContext(connection) as ctx:
+            summary = apply_fix(UppercaseShortNames())
+        updates = [
+            q
+            for q in ctx.captured_queries
+            if q["sql"].startswith('UPDATE "affiliations_affiliation"')
+        ]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(summary["changed"], 1)
+        self.gcep.refresh_from_db()
+        self.assertEqual(self.gcep.short_name, "HEART")
+        self.assertGreater(current_dataset_version().number, version.number)
+
+    def test_update_fix_runs_in_the_database(self):
+        """A fix with an update changes only the rows it filters to."""
+        summary = apply_fix(AddTypeSuffix())
+        self.assertEqual(
+            summary["changes"],
+            [(self.vcep.pk, {"full_name": ("Heart", "Heart VCEP")})],
+        )
+        self.vcep.refresh_from_db()
+        self.gcep.refresh_from_db()
+        self.assertEqual(self.vcep.full_name, "Heart VCEP")
+        self.assertEqual(self.gcep.full_name, "Heart GCEP")
+
+    def test_fix_records_change_events(self):
+        """Each changed affiliation records an event, and a dry run records none."""
+        ChangeEvent.objects.all().delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            apply_fix(AddTypeSuffix(), dry_run=True)
+        self.assertFalse(ChangeEvent.objects.exists())
+        with self.captureOnCommitCallbacks(execute=True):
+            apply_fix(AddTypeSuffix())
+        self.assertEqual(
+            list(ChangeEvent.objects.values_list("kind", "expert_panel_id")),
+            [(ChangeKind.UPDATED, self.vcep.expert_panel_id)],
+        )
+
+
+CSV_LOAD_COLUMNS = [
+    "Affiliation Full Name",
+    "short name",
+    "AffiliationID",
+    "Coordinator(s)",
+    "Email",
+    "Submitter ID",
+    "VCEP Affiliation ID",
+    "VCEP Affiliation Name",
+    "GCEP Affiliation ID",
+    "GCEP Affiliation Name",
+    "Status",
+    "CDWG",
+    "is_deleted",
+]
+
+
+def csv_load_row(**values):
+    """Build a row of the affiliations spreadsheet for a GCEP."""
+    row = dict.fromkeys(CSV_LOAD_COLUMNS, "")
+    row.update(
+        {
+            "Affiliation Full Name": "Heart",
+            "short name": "HRT",
+            "AffiliationID": "10000",
+            "Coordinator(s)": "Oak",
+            "Email": "oak@email.com",
+            "GCEP Affiliation ID": "40000",
+            "Status": "ACTIVE",
+            "CDWG": "Cardiology",
+            "is_deleted": "FALSE",
+        }
+    )
+    row.update(values)
+    return row
+
+
+class CsvLoadTest(TestCase):
+    """Tests for loading the affiliations spreadsheet in bulk."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create the CDWG the rows refer to."""
+        cls.cdwg, _ = ClinicalDomainWorkingGroup.objects.get_or_create(
+            name="Cardiology"
+        )
+        cls.cdwgs = {cls.cdwg.name: cls.cdwg}
+
+    def _run(self, rows, *args):
+        """Run the script on a file with the rows, and return what it printed."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "affiliations.csv"
+            with open(path, "w", encoding="utf-8", newline="") as file:
+                writer = csv.DictWriter(file, CSV_LOAD_COLUMNS)
+                writer.writeheader()
+                writer.writerows(rows)
+            output = StringIO()
+            with patch("scripts.csv_load.FILEPATH", path), redirect_stdout(output):
+                csv_load.run(*args)
+        return output.getvalue()
+
+    def test_plan_row_builds_each_type(self):
+        """A row with both IDs becomes a GCEP and a VCEP with their children."""
+        planned = csv_load.plan_row(
+            csv_load_row(
+                **{
+                    "Coordinator(s)": "Oak,Birch",
+                    "Submitter ID": "123",
+                    "VCEP Affiliation ID": "50000",
+                    "VCEP Affiliation Name": "Heart SC-VCEP",
+                }
+            ),
+            self.cdwgs,
+        )
+        self.assertEqual(len(planned), 2)
+        gcep, submitters, coordinators = planned[0]
+        vcep = planned[1][0]
+        self.assertEqual((gcep.type, gcep.expert_panel_id), ("GCEP", 40000))
+        self.assertEqual(gcep.full_name, "Heart")
+        self.assertEqual((vcep.type, vcep.expert_panel_id), ("SC_VCEP", 50000))
+        self.assertEqual([s.clinvar_submitter_id for s in submitters], ["123"])
+        self.assertEqual(
+            [(c.coordinator_name, c.coordinator_email) for c in coordinators],
+            [("Oak", "oak@email.com"), ("Birch", "")],
+        )
+
+    def test_plan_row_without_ids_is_independent(self):
+        """A row without expert panel IDs is an independent curation group."""
+        planned = csv_load.plan_row(
+            csv_load_row(**{"GCEP Affiliation ID": ""}), self.cdwgs
+        )
+        self.assertEqual(len(planned), 1)
+        affil = planned[0][0]
+        self.assertEqual(affil.type, "INDEPENDENT_CURATION")
+        self.assertIsNone(affil.expert_panel_id)
+
+    def test_plan_rows_collects_every_problem(self):
+        """Each bad row is reported by line, and the good rows are still planned."""
+        planned, errors = csv_load.plan_rows(
+            [
+                csv_load_row(),
+                csv_load_row(CDWG="Nowhere"),
+                csv_load_row(Status="MAYBE"),
+                csv_load_row(AffiliationID="ten"),
+            ],
+            self.cdwgs,
+        )
+        self.assertEqual(len(planned), 1)
+        self.assertEqual(
+            errors,
+            [
+                "Row 3: CDWG 'Nowhere' does not exist.",
+                "Row 4: 'MAYBE' is not a valid status.",
+                "Row 5: AffiliationID 'ten' is not a number.",
+            ],
+        )
+
+    def test_skip_existing_drops_loaded_and_repeated_rows(self):
+        """Affiliations in the DB, or earlier in the file, are skipped."""
+        Affiliation.objects.create(
+            affiliation_id=10000,
+            expert_panel_id=40000,
+            full_name="Heart",
+            status="ACTIVE",
+            type="GCEP",
+            clinical_domain_working_group=self.cdwg,
+        )
+        planned, _ = csv_load.plan_rows(
+            [
+                csv_load_row(),
+                csv_load_row(AffiliationID="10001", **{"GCEP Affiliation ID": "40001"}),
+                csv_load_row(AffiliationID="10001", **{"GCEP Affiliation ID": "40001"}),
+            ],
+            self.cdwgs,
+        )
+        new, skipped = csv_load.skip_existing(planned)
+        self.assertEqual([entry[0].expert_panel_id for entry in new], [40001])
+        self.assertEqual(skipped, 2)
+
+    def test_load_bumps_the_version_once_per_chunk(self):
+        """Each chunk is added in bulk, bumps the version, and records its events."""
+        planned, _ = csv_load.plan_rows(
+            [
+                csv_load_row(
+                    AffiliationID=str(10000 + i),
+                    **{"GCEP Affiliation ID": str(40000 + i)},
+                )
+                for i in range(5)
+            ],
+            self.cdwgs,
+        )
+        ChangeEvent.objects.all().delete()
+        before = current_dataset_version()
+        with patch("scripts.csv_load.CHUNK_SIZE", 2):
+            with self.captureOnCommitCallbacks(execute=True):
+                csv_load.load(planned)
+        self.assertEqual(current_dataset_version().number, before.number + 3)
+        self.assertEqual(Affiliation.objects.count(), 5)
+        self.assertEqual(Coordinator.objects.count(), 5)
+        self.assertEqual(ChangeEvent.objects.filter(kind=ChangeKind.CREATED).count(), 5)
+
+    def test_dry_run_loads_nothing(self):
+        """A dry run reports what it would add without adding it."""
+        before = current_dataset_version()
+        output = self._run([csv_load_row()], "dry-run")
+        self.assertIn("1 affiliations to add", output)
+        self.assertFalse(Affiliation.objects.exists())
+        self.assertEqual(current_dataset_version().number, before.number)
+
+    def test_bad_file_loads_nothing(self):
+        """A problem in any row stops the whole load."""
+        output = self._run([csv_load_row(), csv_load_row(Status="MAYBE")])
+        self.assertIn("1 problem(s) found", output)
+        self.assertFalse(Affiliation.objects.exists())
+
+    def test_run_loads_the_file(self):
+        """The script adds the affiliations in the file."""
+        self._run([csv_load_row()])
+        affil = Affiliation.objects.get()
+        self.assertEqual(affil.short_name, "HRT")
+        self.assertEqual(affil.coordinators.get().coordinator_email, "oak@email.com")
+
+
+def gpm_row(expert_panel_id, ep_type="GCEP", **values):
+    """Build a row of the GPM expert panel spreadsheet."""
+    return {
+        "UUID": "00000000-0000-4000-0000-000000000001",
+        "Affiliation ID": str(expert_panel_id),
+        "EP Type": ep_type,
+        "Long Name": "Heart GCEP",
+        "Short Name": "HRT",
+        **values,
+    }
+
+
+class GpmCsvTest(TestCase):
+    """Tests for matching GPM spreadsheet rows against the affiliations."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create a GCEP that matches the spreadsheet, and a VCEP that doesn't."""
+        cdwg, _ = ClinicalDomainWorkingGroup.objects.get_or_create(name="Cardiology")
+        fields = {"status": "ACTIVE", "clinical_domain_working_group": cdwg}
+        cls.gcep = Affiliation.objects.create(
+            affiliation_id=10000,
+            expert_panel_id=40000,
+            type="GCEP",
+            full_name="Heart GCEP",
+            short_name="HRT",
+            uuid="00000000-0000-4000-0000-000000000001",
+            **fields,
+        )
+        cls.vcep = Affiliation.objects.create(
+            affiliation_id=10000,
+            expert_panel_id=50000,
+            type="VCEP",
+            full_name="Heart",
+            **fields,
+        )
+
+    def _reconcile(self, rows):
+        """Reconcile the rows against a fresh index of the affiliations."""
+        return gpm_csv.reconcile(rows, gpm_csv.index_affiliations())
+
+    def test_matched_row_without_changes_is_unchanged(self):
+        """A row that agrees with its affiliation changes nothing."""
+        report = self._reconcile([gpm_row(40000)])
+        self.assertEqual(
+            report["unchanged"], [{"expert_panel_id": "40000", "type": "GCEP"}]
+        )
+        self.assertEqual(report["updated"], [])
+        self.assertEqual(gpm_csv.changed_fields(report), [])
+
+    def test_changed_row_updates_in_memory(self):
+        """A row that differs changes its affiliation, but doesn't save it."""
+        report = self._reconcile(
+            [
+                gpm_row(
+                    50000,
+                    "VCEP",
+                    UUID="00000000-0000-4000-0000-000000000002",
+                    **{"Long Name": "Heart VCEP"},
+                )
+            ]
+        )
+        self.assertEqual(len(report["updated"]), 1)
+        entry = report["updated"][0]
+        self.assertEqual(entry["affiliation"].pk, self.vcep.pk)
+        self.assertEqual(
+            entry["changes"],
+            {
+                "uuid": (None, UUID("00000000-0000-4000-0000-000000000002")),
+                "full_name": ("Heart", "Heart VCEP"),
+                "short_name": (None, "HRT"),
+            },
+        )
+        self.assertEqual(entry["affiliation"].full_name, "Heart VCEP")
+        self.vcep.refresh_from_db()
+        self.assertEqual(self.vcep.full_name, "Heart")
+        self.assertEqual(
+            gpm_csv.changed_fields(report), ["uuid", "full_name", "short_name"]
+        )
+
+    def test_unmatched_and_invalid_rows_are_reported(self):
+        """Rows with no affiliation, or a bad UUID, are reported and skipped."""
+        report = self._reconcile(
+            [
+                gpm_row(40000, "VCEP"),
+                gpm_row("not a number"),
+                gpm_row(40000, UUID="nope"),
+            ]
+        )
+        self.assertEqual(
+            report["missing"],
+            [
+                {"expert_panel_id": "40000", "type": "VCEP"},
+                {"expert_panel_id": "not a number", "type": "GCEP"},
+            ],
+        )
+        self.assertEqual(
+            report["invalid_uuid"],
+            [{"expert_panel_id": "40000", "type": "GCEP", "uuid": "nope"}],
+        )
+        self.assertEqual(report["updated"], [])
+
+    def test_duplicates_match_once(self):
+        """A repeated row, or a key two affiliations share, matches the oldest once."""
+        Affiliation.objects.create(
+            affiliation_id=10001,
+            expert_panel_id=50000,
+            type="VCEP",
+            full_name="Heart",
+            status="ACTIVE",
+            clinical_domain_working_group=self.vcep.clinical_domain_working_group,
+        )
+        row = gpm_row(50000, "VCEP", UUID="00000000-0000-4000-0000-000000000002")
+        report = self._reconcile([row, row])
+        self.assertEqual(
+            [entry["affiliation"].pk for entry in report["updated"]], [self.vcep.pk]
+        )
+        self.assertEqual(
+            report["unchanged"], [{"expert_panel_id": "50000", "type": "VCEP"}]
+        )
+
+    def test_add_uuid_saves_changes_in_bulk(self):
+        """The script saves the changed affiliations and bumps the version once."""
+        rows = [gpm_row(40000), gpm_row(50000, "VCEP", UUID=str(uuid4()))]
+        before = current_dataset_version()
+        with patch("scripts.add_uuid.read_rows", return_value=rows):
+            with redirect_stdout(StringIO()):
+                add_uuid.run("dry-run")
+            self.vcep.refresh_from_db()
+            self.assertIsNone(self.vcep.uuid)
+            with redirect_stdout(StringIO()):
+                add_uuid.run()
+        self.vcep.refresh_from_db()
+        self.assertEqual(str(self.vcep.uuid), rows[1]["UUID"])
+        self.assertEqual(current_dataset_version().number, before.number + 1)
+
+
+class AffilsCompareTest(SimpleTestCase):
+    """Tests for comparing affiliation files a few affiliations at a time."""
+
+    def _parse(self, text, read_size=2):
+        """Read the JSON array in the text, a couple of characters at a time."""
+        return list(affils_compare.iter_json_array(StringIO(text), read_size))
+
+    def test_reads_arrays_across_reads(self):
+        """Elements that span several reads are decoded whole."""
+        text = '[ {"affiliation_id": "10000", "approver": ["Mew"]}, 12345 , "x"]\n'
+        for read_size in (1, 2, 7, 1000):
+            self.assertEqual(
+                self._parse(text, read_size),
+                [{"affiliation_id": "10000", "approver": ["Mew"]}, 12345, "x"],
+            )
+        self.assertEqual(self._parse(" [ ] "), [])
+
+    def test_reads_many_elements_from_one_read(self):
+        """A large array held in one read is decoded element by element."""
+        elements = [{"affiliation_id": str(i)} for i in range(5000)]
+        text = json.dumps(elements, indent=1)
+        self.assertEqual(self._parse(text, len(text)), elements)
+
+    def test_rejects_malformed_arrays(self):
+        """Missing or extra separators, and anything after the array, are errors."""
+        for text in ["[1 2]", "[1,,2]", "[1,]", "[1]garbage", "[1] ]", "[1", "{}"]:
+            with self.subTest(text=text):
+                with self.assertRaises(ValueError):
+                    self._parse(text)
+
+    def test_diff_values_descends_into_objects(self):
+        """Objects are compared key by key, and lists as a whole."""
+        self.assertEqual(
+            affils_compare.diff_values(
+                {"subgroups": {"gcep": {"id": "1"}}, "approver": ["Mew"]},
+                {"subgroups": {"gcep": {"id": "2"}, "vcep": {}}, "approver": ["Mew"]},
+            ),
+            [
+                {"path": "subgroups.gcep.id", "old": "1", "new": "2"},
+                {"path": "subgroups.vcep", "old": None, "new": {}},
+            ],
+        )
+        self.assertEqual(affils_compare.diff_values([1, 2], [1, 2]), [])
+
+    def test_compare_finds_changed_added_and_removed(self):
+        """Only the compared fields count, and each affiliation is reported once."""
+        old = [
+            {"affiliation_id": "1", "affiliation_fullname": "A", "ignored": 1},
+            {"affiliation_id": "2", "affiliation_fullname": "B"},
+            {"affiliation_id": "3", "affiliation_fullname": "C"},
+        ]
+        new = [
+            {"affiliation_id": "1", "affiliation_fullname": "A", "ignored": 2},
+            {"affiliation_id": "2", "affiliation_fullname": "Bee"},
+            {"affiliation_id": "4", "affiliation_fullname": "D"},
+        ]
+        diffs = list(affils_compare.compare(old, new))
+        self.assertEqual(
+            [(diff["affiliation_id"], diff["change"]) for diff in diffs],
+            [("2", "changed"), ("4", "added"), ("3", "removed")],
+        )
+        self.assertEqual(
+            diffs[0]["differences"],
+            [{"path": "affiliation_fullname", "old": "B", "new": "Bee"}],
+        )
+
+
+class AffiliationIdConcurrencyTest(TransactionTestCase):
+    """Tests for allocating affiliation IDs from several connections at once."""
+
+    def setUp(self):
+        """Create a CDWG and an existing affiliation."""
+        self.cdwg = ClinicalDomainWorkingGroup.objects.create(name="Cardiology")
+        Affiliation.objects.create(
+            affiliation_id=10000,
+            expert_panel_id=40000,
+            full_name="Existing GCEP",
+            status="ACTIVE",
+            type="GCEP",
+            clinical_domain_working_group=self.cdwg,
+        )
+
+    def _create_affiliation(self, index):
+        """Create an affiliation through the serializer on this thread's connection."""
+        try:
+            serializer = AffiliationSerializer(
+                data={
+                    "full_name": f"Parallel GCEP {index}",
+                    "type": "GCEP",
+                    "status": "APPLYING",
+                    "clinical_domain_working_group": self.cdwg.id,
+                    "uuid": f"00000000-0000-0000-0000-{index:012d}",
+                }
+            )
+            serializer.is_valid(raise_exception=True)
+            return serializer.save().affiliation_id
+        finally:
+            connection.close()
+
+    @skipUnlessDBFeature("has_select_for_update")
+    def test_parallel_creates_get_unique_ids(self):
+        """Parallel creates each get their own affiliation and expert panel ID."""
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            ids = list(executor.map(self._create_affiliation, range(40)))
+        self.assertEqual(sorted(ids), list(range(10001, 10041)))
+        ep_ids = Affiliation.objects.values_list("expert_panel_id", flat=True)
+        self.assertEqual(len(set(ep_ids)), 41)
+
+    def test_allocation_does_not_lock_affiliations(self):
+        """Affiliation rows can still be locked while an allocation is held."""
+        held = threading.Event()
+        release = threading.Event()
+
+        def hold_allocation():
+            try:
+                with transaction.atomic():
+                    allocate_affiliation_ids(1)
+                    held.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=hold_allocation)
+        thread.start()
+        try:
+            self.assertTrue(held.wait(10))
+            with transaction.atomic():
+                locked = list(Affiliation.objects.select_for_update(nowait=True))
+            self.assertEqual(len(locked), 1)
+        finally:
+            release.set()
+            thread.join()
+
+
 class TestAffiliationUpdateView(APITestCase):
     """Test cases for updating affiliations via API"""
 
@@ -394,6 +2607,85 @@ class TestAffiliationUpdateView(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertIn("type", response.data["details"])
 
+    def _patch(self, payload):
+        """Send a PATCH request for the test affiliation."""
+        self.client.credentials(HTTP_X_API_KEY=self.api_key)
+        return self.client.patch(
+            f"/api/affiliation/update/affiliation_id/{self.affiliation.affiliation_id}/",
+            data=payload,
+            format="json",
+        )
+
+    def test_update_only_writes_changes(self):
+        """Unchanged nested objects are kept, and only the difference is written."""
+        kept = Coordinator.objects.create(
+            affiliation=self.affiliation,
+            coordinator_name="Oak",
+            coordinator_email="oak@email.com",
+        )
+        Coordinator.objects.create(
+            affiliation=self.affiliation,
+            coordinator_name="Elm",
+            coordinator_email="elm@email.com",
+        )
+        Approver.objects.create(affiliation=self.affiliation, approver_name="Mew")
+        response = self._patch(
+            {
+                "full_name": "Original Name",
+                "coordinators": [
+                    {"coordinator_name": "Oak", "coordinator_email": "oak@email.com"},
+                    {"coordinator_name": "Birch", "coordinator_email": "b@email.com"},
+                ],
+                "approvers": [{"approver_name": "Mew"}, {"approver_name": "Mewtwo"}],
+            }
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        coordinators = self.affiliation.coordinators.order_by("pk")
+        self.assertEqual(coordinators[0].pk, kept.pk)
+        self.assertEqual([c.coordinator_name for c in coordinators], ["Oak", "Birch"])
+        self.assertEqual(
+            sorted(a["approver_name"] for a in response.data["approvers"]),
+            ["Mew", "Mewtwo"],
+        )
+
+    def test_update_saves_only_changed_fields(self):
+        """The affiliation row is updated with just the fields that changed."""
+        with CaptureQueriesContext(connection) as ctx:
+            response = self._patch({"full_name": "Updated Name", "members": "Dr. Oak"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        updates = [
+            q["sql"]
+            for q in ctx.captured_queries
+            if q["sql"].startswith('UPDATE "affiliations_affiliation"')
+        ]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"full_name"', updates[0])
+        self.assertNotIn('"members"', updates[0])
+
+    def test_unchanged_update_writes_nothing(self):
+        """Sending back the same data doesn't write or bump the dataset version."""
+        Approver.objects.create(affiliation=self.affiliation, approver_name="Mew")
+        before = current_dataset_version()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self._patch(
+                {"full_name": "Original Name", "approvers": [{"approver_name": "Mew"}]}
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        writes = [
+            q["sql"]
+            for q in ctx.captured_queries
+            if q["sql"].startswith(("INSERT", "UPDATE", "DELETE"))
+        ]
+        self.assertEqual(writes, [])
+        self.assertEqual(current_dataset_version().number, before.number)
+
+    def test_update_bumps_dataset_version_on_insert(self):
+        """Bulk inserted nested objects still bump the dataset version."""
+        before = current_dataset_version()
+        response = self._patch({"approvers": [{"approver_name": "Mew"}]})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertGreater(current_dataset_version().number, before.number)
+
 
 class TestCDWGApi(APITestCase):
     """Class for CDWG API tests."""
@@ -653,3 +2945,208 @@ class HasWriteAccessTests(TestCase):
         view = DummyView.as_view()
         response = view(request)
         self.assertEqual(response.status_code, 403)
+
+
+class APIKeyCacheTest(TestCase):
+    """Tests for the cache of verified API keys."""
+
+    def setUp(self):
+        """Create an API key with write access and start with an empty cache."""
+        api_key_cache().clear()
+        self.api_key, self.raw_key = CustomAPIKey.objects.create_key(
+            name="cached-key", can_write=True
+        )
+        self.factory = APIRequestFactory()
+
+    def _write_access(self, key):
+        """Return the status code of a request that needs write access."""
+        request = self.factory.get("/dummy-endpoint/", HTTP_X_API_KEY=key)
+        return DummyView.as_view()(request).status_code
+
+    def _read_access(self, key):
+        """Return whether a request with the key passes HasAffilsAPIKey."""
+        request = self.factory.get("/dummy-endpoint/", HTTP_X_API_KEY=key)
+        return HasAffilsAPIKey().has_permission(request, None)
+
+    def test_verified_key_is_served_from_cache(self):
+        """Once a key is verified, later requests don't query the database."""
+        self.assertEqual(self._write_access(self.raw_key), 200)
+        with self.assertNumQueries(0):
+            self.assertTrue(self._read_access(self.raw_key))
+            self.assertEqual(self._write_access(self.raw_key), 200)
+
+    def test_revoking_key_is_honored_at_once(self):
+        """A revoked key is never honored from the cache."""
+        self.assertTrue(self._read_access(self.raw_key))
+        self.api_key.revoked = True
+        self.api_key.save()
+        self.assertFalse(self._read_access(self.raw_key))
+        self.assertEqual(self._write_access(self.raw_key), 403)
+
+    def test_deleting_key_is_honored_at_once(self):
+        """A deleted key is never honored from the cache."""
+        self.assertTrue(self._read_access(self.raw_key))
+        self.api_key.delete()
+        self.assertFalse(self._read_access(self.raw_key))
+
+    def test_losing_write_access_is_honored_at_once(self):
+        """Taking away write access applies to the next request."""
+        self.assertEqual(self._write_access(self.raw_key), 200)
+        self.api_key.can_write = False
+        self.api_key.save()
+        self.assertEqual(self._write_access(self.raw_key), 403)
+
+    def test_change_is_cleared_again_once_committed(self):
+        """The entry is cleared when the change commits, too."""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.api_key.revoked = True
+            self.api_key.save()
+            # Cached while the change was still in flight.
+            api_key_cache().set(
+                api_key_cache_key(self.api_key.prefix),
+                {
+                    "hashed_key": self.api_key.hashed_key,
+                    "can_write": True,
+                    "revoked": False,
+                    "expiry_date": None,
+                },
+            )
+        self.assertFalse(self._read_access(self.raw_key))
+
+    def test_wrong_secret_with_cached_prefix_fails(self):
+        """A cached prefix doesn't let a different key through."""
+        self.assertTrue(self._read_access(self.raw_key))
+        prefix, _, _ = self.raw_key.partition(".")
+        wrong_key = f"{prefix}.not-the-secret"
+        with self.assertNumQueries(0):
+            self.assertFalse(self._read_access(wrong_key))
+        self.assertEqual(self._write_access(wrong_key), 403)
+
+    def test_unknown_key_fails(self):
+        """A key that doesn't exist is denied instead of raising an error."""
+        self.assertFalse(self._read_access("nope.nope"))
+        self.assertEqual(self._write_access("nope.nope"), 403)
+        self.assertEqual(self._write_access("not a key"), 403)
+
+    def test_expired_key_fails_once_verified(self):
+        """A cached key that has since expired is denied."""
+        self.api_key.expiry_date = now() + timedelta(hours=1)
+        self.api_key.save()
+        self.assertTrue(self._read_access(self.raw_key))
+        later = now() + timedelta(hours=2)
+        with patch("affiliations.permissions.now", return_value=later):
+            self.assertFalse(self._read_access(self.raw_key))
+            self.assertEqual(self._write_access(self.raw_key), 403)
+
+
+class BatchingQueueHandlerTest(TestCase):
+    """Tests for shipping log records from a background thread."""
+
+    def _logger(self, handler):
+        """Return a logger that only logs to the handler."""
+        logger = logging.getLogger(f"affiliations.tests.{self._testMethodName}")
+        logger.propagate = False
+        logger.addHandler(handler)
+        self.addCleanup(logger.removeHandler, handler)
+        self.addCleanup(handler.close)
+        return logger
+
+    def test_records_are_shipped_in_batches(self):
+        """Records reach the target in order, one flush per batch."""
+        sink = InMemoryHandler()
+        handler = BatchingQueueHandler(target=sink, batch_size=3, flush_interval=5)
+        logger = self._logger(handler)
+        for i in range(6):
+            logger.warning("Record %d", i)
+        handler.flush()
+        self.assertEqual(
+            [record.getMessage() for record in sink.records],
+            [f"Record {i}" for i in range(6)],
+        )
+        self.assertLessEqual(sink.flushes, 6)
+        self.assertGreaterEqual(sink.flushes, 2)
+
+    def test_traceback_is_rendered_before_queueing(self):
+        """Exception info is turned into text on the thread that logged it."""
+        sink = InMemoryHandler()
+        handler = BatchingQueueHandler(target=sink)
+        logger = self._logger(handler)
+        try:
+            raise ValueError("Broken")
+        except ValueError:
+            logger.exception("Failed")
+        handler.flush()
+        self.assertIsNone(sink.records[0].exc_info)
+        self.assertIn("ValueError: Broken", sink.records[0].exc_text)
+
+    def test_full_queue_drops_records(self):
+        """Logging never blocks. Records that don't fit are counted and reported."""
+        release = threading.Event()
+
+        class SlowHandler(InMemoryHandler):
+            """A target that waits until it is released."""
+
+            def emit(self, record):
+                release.wait(10)
+                super().emit(record)
+
+        sink = SlowHandler()
+        handler = BatchingQueueHandler(capacity=2, target=sink, batch_size=1)
+        logger = self._logger(handler)
+        logger.warning("Picked up")
+        while not handler.queue.empty():
+            time.sleep(0.001)
+        for i in range(5):
+            logger.warning("Record %d", i)
+        self.assertEqual(handler.dropped, 3)
+        release.set()
+        handler.flush()
+        logger.warning("After")
+        handler.flush()
+        messages = [record.getMessage() for record in sink.records]
+        self.assertIn("Dropped 3 log records because the log queue was full.", messages)
+        self.assertEqual(messages[-1], "After")
+
+    def test_close_ships_remaining_records(self):
+        """Closing the handler ships what's queued and stops the thread."""
+        sink = InMemoryHandler()
+        handler = BatchingQueueHandler(target=sink, flush_interval=5)
+        handler.handle(
+            logging.LogRecord("test", logging.INFO, __file__, 0, "Last", None, None)
+        )
+        handler.close()
+        self.assertEqual([record.getMessage() for record in sink.records], ["Last"])
+        self.assertFalse(handler._thread.is_alive())  # pylint: disable=protected-access
+
+
+class LazyCloudWatchLogHandlerTest(TestCase):
+    """Tests for connecting to CloudWatch on the first log record."""
+
+    def test_tests_log_to_memory(self):
+        """Running the tests keeps log records in memory, away from CloudWatch."""
+        (handler,) = logging.getLogger("watchtower").handlers
+        self.assertIsInstance(handler.target, InMemoryHandler)
+
+    def test_handler_is_not_created_on_startup(self):
+        """Creating the handler doesn't create the watchtower handler yet."""
+        handler = LazyCloudWatchLogHandler(log_group_name="Affiliation_Logs")
+        handler.flush()
+        handler.close()
+        self.assertIsNone(handler._handler)  # pylint: disable=protected-access
+
+    def test_failed_creation_is_retried_later(self):
+        """Records are dropped for a while after the handler couldn't be created."""
+        errors = []
+
+        class RecordingHandler(LazyCloudWatchLogHandler):
+            """Keep the records that couldn't be handled."""
+
+            def handleError(self, record):
+                errors.append(record)
+
+        handler = RecordingHandler(region_name="us-east-1", not_an_option=True)
+        record = logging.LogRecord("test", logging.INFO, __file__, 0, "Hi", None, None)
+        handler.handle(record)
+        handler.handle(record)
+        self.assertEqual(errors, [record])
+        self.assertEqual(handler.dropped, 1)
@@ -6,7 +6,7 @@ from django.urls import URLResolver, URLPattern
 from rest_framework.urlpatterns import format_suffix_patterns
 
 # In-house code:
-from affiliations import views
+from affiliations import async_views, views
 
 urlpatterns: list[URLResolver | URLPattern] = [
     path("database_list/", views.AffiliationsList.as_view()),
@@ -22,10 +22,22 @@ urlpatterns: list[URLResolver | URLPattern] = [
     path(
         "affiliation_detail/uuid/<str:uuid>/", views.AffiliationDetailByUUID.as_view()
     ),
+    path(
+        "affiliations/changes/",
+        views.AffiliationChangesView.as_view(),
+    ),
+    path(
+        "affiliations/lookup/",
+        views.AffiliationLookupView.as_view(),
+    ),
     path(
         "affiliation/create/",
         views.create_affiliation,
     ),
+    path(
+        "affiliation/bulk_create/",
+        views.bulk_create_affiliations,
+    ),
     path(
         "affiliation/update/affiliation_id/<int:affiliation_id>/",
         views.AffiliationUpdateView.as_view(),
@@ -57,3 +69,35 @@ urlpatterns: list[URLResolver | URLPattern] = [
 ]
 
 urlpatterns = format_suffix_patterns(urlpatterns)
+
+# Async versions of the read-only routes, for when the service is served over ASGI.
+urlpatterns += [
+    path(
+        "async/affiliations_list/",
+        async_views.affiliations_list_json_format,
+    ),
+    path(
+        "async/affiliation_detail/",
+        async_views.affiliation_detail_json_format,
+    ),
+    path(
+        "async/affiliation_detail/uuid/<str:uuid>/",
+        async_views.affiliation_detail_by_uuid,
+    ),
+    path(
+        "async/cdwg_list/",
+        async_views.cdwg_list,
+    ),
+    path(
+        "async/cdwg_detail/id/<int:id>/",
+        async_views.cdwg_detail,
+    ),
+    path(
+        "async/cdwg_detail/name/<str:name>/",
+        async_views.cdwg_detail,
+    ),
+    path(
+        "async/affiliations/events/",
+        async_views.affiliation_events,
+    ),
+]
@@ -2,9 +2,13 @@
 
 from uuid import UUID
 from django.db import transaction
-from django.db.models import Q
+from django.db.models import Max, Q
 from django.core.exceptions import ValidationError
-from affiliations.models import Affiliation, ClinicalDomainWorkingGroup
+from affiliations.models import (
+    Affiliation,
+    AffiliationIdCounter,
+    ClinicalDomainWorkingGroup,
+)
 
 
 VCEP_BASE = 50000
@@ -12,33 +16,67 @@ GCEP_BASE = 40000
 AFFIL_BASE = 10000
 
 
-def generate_next_affiliation_id(cleaned_data: dict) -> None:
-    """Generate the next sequential affiliation_id as an integer."""
-    with transaction.atomic():
+def allocate_affiliation_ids(count: int) -> range:
+    """Reserve a block of `count` consecutive affiliation IDs.
 
-        if (
-            cleaned_data.get("affiliation_id") is not None
-            or cleaned_data.get("expert_panel_id") is not None
-        ):
-            raise ValidationError(
-                "ID's cannot be manually assigned. Please remove from request."
-            )
-        existing_ids = (
-            Affiliation.objects.select_for_update()
-            .values_list("affiliation_id", flat=True)
-            .order_by("affiliation_id")
+    Only the counter row is locked, until the surrounding transaction ends, so
+    creates don't have to wait on a lock over every affiliation.
+    """
+    with transaction.atomic():
+        counter, _ = AffiliationIdCounter.objects.select_for_update().get_or_create(
+            pk=1, defaults={"next_id": AFFIL_BASE}
         )
+        next_id = next_free_affiliation_id(counter.next_id)
+        check_affiliation_ids_in_range(next_id, count)
+
+        counter.next_id = next_id + count
+        counter.save(update_fields=["next_id"])
+        return range(next_id, next_id + count)
+
+
+def next_free_affiliation_id(start: int) -> int:
+    """Return the first affiliation ID from `start` on that hasn't been used."""
+    # Affiliations can also be added with IDs that didn't come from the counter,
+    # e.g. by loading them from a file, so never hand out an ID below those.
+    last_id = Affiliation.objects.filter(affiliation_id__gte=start).aggregate(
+        Max("affiliation_id")
+    )["affiliation_id__max"]
+    return start if last_id is None else last_id + 1
 
-        if existing_ids:
-            last_id = max(existing_ids)
-            next_id = last_id + 1
-        else:
-            next_id = AFFIL_BASE
 
-        if next_id < AFFIL_BASE or next_id >= 20000:
-            raise ValidationError("Affiliation ID out of range. Contact administrator.")
+def check_affiliation_ids_in_range(next_id: int, count: int) -> None:
+    """Raise ValidationError if `count` IDs from `next_id` on aren't all in range."""
+    if next_id < AFFIL_BASE or next_id + count > 20000:
+        raise ValidationError("Affiliation ID out of range. Contact administrator.")
 
-        cleaned_data["affiliation_id"] = next_id
+
+def check_ids_available(affiliation_type: str | None) -> None:
+    """Raise ValidationError if a new affiliation of the type can't be given IDs.
+
+    Nothing is reserved, so a submission that fails validation doesn't use up an
+    ID. Another request can still take the last ID before this one is saved.
+    """
+    counter = AffiliationIdCounter.objects.filter(pk=1).first()
+    next_id = next_free_affiliation_id(counter.next_id if counter else AFFIL_BASE)
+    check_affiliation_ids_in_range(next_id, 1)
+    set_expert_panel_id({"type": affiliation_type, "affiliation_id": next_id})
+
+
+def check_ids_not_assigned(cleaned_data: dict) -> None:
+    """Raise ValidationError if the request tries to pick its own IDs."""
+    if (
+        cleaned_data.get("affiliation_id") is not None
+        or cleaned_data.get("expert_panel_id") is not None
+    ):
+        raise ValidationError(
+            "ID's cannot be manually assigned. Please remove from request."
+        )
+
+
+def generate_next_affiliation_id(cleaned_data: dict) -> None:
+    """Generate the next sequential affiliation_id as an integer."""
+    check_ids_not_assigned(cleaned_data)
+    cleaned_data["affiliation_id"] = allocate_affiliation_ids(1)[0]
 
 
 def set_expert_panel_id(cleaned_data: dict) -> None:
@@ -93,9 +131,9 @@ def validate_cdwg_matches_type(cleaned_data: dict, instance=None) -> None:
     if not cdwg:
         return
 
+    # CDWG names are unique, so comparing names saves looking the CDWG up.
     if type_ == "SC_VCEP":
-        expected = ClinicalDomainWorkingGroup.objects.get(name="Somatic Cancer")
-        if cdwg != expected:
+        if cdwg.name != "Somatic Cancer":
             raise ValidationError(
                 "If type is 'Somatic Cancer Variant Curation Expert Panel', "
                 + "then CDWG must be 'Somatic Cancer'."
@@ -104,13 +142,19 @@ def validate_cdwg_matches_type(cleaned_data: dict, instance=None) -> None:
     elif (
         type_ == "INDEPENDENT_CURATION"
     ):  # If your type for independent groups is 'ICG'
-        expected = ClinicalDomainWorkingGroup.objects.get(name="None")
-        if cdwg != expected:
+        if cdwg.name != "None":
             raise ValidationError(
                 "If type is 'Independent Curation Group', then CDWG must be 'None'."
             )
 
 
+def find_existing_affiliation_uuids(uuid_vals: list[UUID]) -> set[UUID]:
+    """Return which of the given UUIDs already belong to an affiliation."""
+    return set(
+        Affiliation.objects.filter(uuid__in=uuid_vals).values_list("uuid", flat=True)
+    )
+
+
 def check_duplicate_affiliation_uuid(uuid_val: UUID, instance=None) -> bool:
     """Check if an affiliation with the given UUID already exists."""
     if uuid_val is None:
@@ -0,0 +1,121 @@
+"""Track the version of the affiliations dataset for conditional requests.
+
+Consumers that poll the API can send back the `ETag` or `Last-Modified` value of the
+last response they got. If nothing has been written since, they get a `304 Not
+Modified` response, which only costs a lookup of the dataset version.
+"""
+
+# Built-in libraries:
+import hashlib
+from functools import wraps
+
+# Third-party dependencies:
+from django.db.models import F
+from django.db.models.functions import Now
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+# In-house code:
+from affiliations.models import DatasetVersion
+
+# The ID of the one row that holds the dataset version.
+DATASET_VERSION_ID = 1
+
+
+def bump_dataset_version() -> None:
+    """Record that the dataset has been written to.
+
+    Other requests see the new version once the write is committed. Until then, the
+    version is locked, and other writes that bump it wait for this one to commit.
+    """
+    if not DatasetVersion.objects.update(number=F("number") + 1, changed_at=Now()):
+        # The row is missing, e.g. after the tables are flushed.
+        DatasetVersion.objects.get_or_create(pk=DATASET_VERSION_ID)
+        DatasetVersion.objects.update(number=F("number") + 1, changed_at=Now())
+
+
+def current_dataset_version() -> DatasetVersion | None:
+    """Return the current version of the dataset."""
+    return DatasetVersion.objects.first()
+
+
+async def acurrent_dataset_version() -> DatasetVersion | None:
+    """Return the current version of the dataset, from async code."""
+    return await DatasetVersion.objects.afirst()
+
+
+def dataset_etag(request, version: DatasetVersion) -> str:
+    """Build a strong ETag for the response to the request at the given version.
+
+    The same dataset version is rendered differently depending on the URL and the
+    format that is asked for, so both are part of the ETag.
+    """
+    representation = "\n".join(
+        [request.get_full_path(), request.META.get("HTTP_ACCEPT", "")]
+    )
+    digest = hashlib.sha256(representation.encode("utf-8")).hexdigest()[:16]
+    return quote_etag(f"{version.number}-{digest}")
+
+
+def conditional_response(request, version: DatasetVersion):
+    """Return the ETag and Last-Modified values for the request at the given version.
+
+    Also returns a `304 Not Modified` response if the client already has them, or
+    None if the view has to run.
+    """
+    etag = dataset_etag(request, version)
+    last_modified = int(version.changed_at.timestamp())
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    return etag, last_modified, response
+
+
+def set_validators(response, etag: str, last_modified: int):
+    """Add the ETag and Last-Modified headers to a successful response."""
+    if response.status_code in (200, 304):
+        response.headers.setdefault("ETag", etag)
+        response.headers.setdefault("Last-Modified", http_date(last_modified))
+    return response
+
+
+def conditional_on_dataset_version(view_func):
+    """Answer conditional `GET` requests using the version of the dataset.
+
+    Successful responses get an `ETag` and a `Last-Modified` header. Requests with a
+    matching `If-None-Match` or `If-Modified-Since` header get a `304 Not Modified`
+    response without the view running at all.
+    """
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return view_func(request, *args, **kwargs)
+        version = current_dataset_version()
+        if version is None:
+            return view_func(request, *args, **kwargs)
+
+        etag, last_modified, response = conditional_response(request, version)
+        if response is None:
+            response = view_func(request, *args, **kwargs)
+        return set_validators(response, etag, last_modified)
+
+    return wrapper
+
+
+def async_conditional_on_dataset_version(view_func):
+    """Answer conditional `GET` requests to an async view, like
+    `conditional_on_dataset_version` does for synchronous views."""
+
+    @wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return await view_func(request, *args, **kwargs)
+        version = await acurrent_dataset_version()
+        if version is None:
+            return await view_func(request, *args, **kwargs)
+
+        etag, last_modified, response = conditional_response(request, version)
+        if response is None:
+            response = await view_func(request, *args, **kwargs)
+        return set_validators(response, etag, last_modified)
+
+    return wrapper
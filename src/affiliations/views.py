@@ -3,23 +3,55 @@
 # Third-party dependencies:
 import logging
 from rest_framework import generics, status
+from rest_framework.exceptions import ValidationError
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
 from rest_framework.response import Response
-from rest_framework.views import exception_handler
+from rest_framework.views import APIView, exception_handler
 
 from django.shortcuts import get_object_or_404
+from django.utils.decorators import method_decorator
 
 # from rest_framework_api_key.permissions import HasAPIKey
-from django.http import JsonResponse, Http404
+from django.http import HttpResponse, Http404
 
 # In-house code:
-from affiliations.models import Affiliation, Approver, ClinicalDomainWorkingGroup
+from affiliations.models import Affiliation, ClinicalDomainWorkingGroup
+from affiliations.changes import (
+    CHANGES_PAGE_SIZE,
+    MAX_CHANGES_PAGE_SIZE,
+    changed_affiliations,
+    decode_cursor,
+    encode_cursor,
+)
+from affiliations.legacy import (
+    build_legacy_affiliations,
+    legacy_affiliations,
+    legacy_affiliations_snapshot,
+    render_legacy_json,
+    stream_legacy_json,
+)
+from affiliations.lookups import LOOKUP_FIELDS, lookup_affiliations
 from affiliations.serializers import (
+    AffiliationLookupSerializer,
     AffiliationSerializer,
     ClinicalDomainWorkingGroupSerializer,
 )
+from affiliations.pagination import AffiliationCursorPagination
 from affiliations.permissions import HasWriteAccess, HasAffilsAPIKey
+from affiliations.renderers import FastJSONRenderer
+from affiliations.streaming import (
+    STREAM_CHUNK_SIZE,
+    batched,
+    json_array_chunks,
+    streaming_json_response,
+    wants_stream,
+)
+from affiliations.versioning import conditional_on_dataset_version
+
+
+# The most affiliations that can be created with one bulk create request.
+BULK_CREATE_LIMIT = 500
 
 
 def custom_exception_handler(exc, context):
@@ -44,15 +76,53 @@ def custom_exception_handler(exc, context):
     )
 
 
-class AffiliationsList(generics.ListCreateAPIView):
+class SparseFieldsMixin:
+    """Only load the affiliation fields a GET request asked for.
+
+    See `AffiliationSerializer.requested_fields` for how they're asked for.
+    """
+
+    def get_queryset(self):
+        """Return the affiliations, loading only the fields that are serialized."""
+        return AffiliationSerializer.setup_eager_loading(
+            super().get_queryset(),
+            AffiliationSerializer.requested_fields(self.request),
+        )
+
+
+@method_decorator(conditional_on_dataset_version, name="get")
+class AffiliationsList(SparseFieldsMixin, generics.ListCreateAPIView):
     """List all affiliations, or create a new affiliation."""
 
     permission_classes = [IsAuthenticatedOrReadOnly]
     queryset = Affiliation.objects.all()
     serializer_class = AffiliationSerializer
+    pagination_class = AffiliationCursorPagination
 
+    def list(self, request, *args, **kwargs):
+        """List the affiliations, streaming them out if the client asks for it."""
+        if not wants_stream(request):
+            return super().list(request, *args, **kwargs)
 
-class AffiliationsDetail(generics.RetrieveUpdateDestroyAPIView):
+        queryset = self.filter_queryset(self.get_queryset()).order_by(
+            "affiliation_id", "pk"
+        )
+        renderer = FastJSONRenderer()
+        batches = (
+            self.get_serializer(batch, many=True).data
+            for batch in batched(
+                queryset.iterator(chunk_size=STREAM_CHUNK_SIZE), STREAM_CHUNK_SIZE
+            )
+        )
+        return streaming_json_response(
+            request, json_array_chunks(batches, renderer.render, b",")
+        )
+
+
+@method_decorator(conditional_on_dataset_version, name="get")
+class AffiliationsDetail(  # pylint: disable=too-many-ancestors
+    SparseFieldsMixin, generics.RetrieveUpdateDestroyAPIView
+):
     """Retrieve, update or delete an affiliation."""
 
     permission_classes = [IsAuthenticatedOrReadOnly]
@@ -60,7 +130,8 @@ class AffiliationsDetail(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = AffiliationSerializer
 
 
-class AffiliationDetailByUUID(generics.RetrieveAPIView):
+@method_decorator(conditional_on_dataset_version, name="get")
+class AffiliationDetailByUUID(SparseFieldsMixin, generics.RetrieveAPIView):
     """Look up an affiliation by its UUID."""
 
     permission_classes = [IsAuthenticatedOrReadOnly]
@@ -69,10 +140,109 @@ class AffiliationDetailByUUID(generics.RetrieveAPIView):
 
     def get_object(self):
         uuid = self.kwargs.get("uuid")
-        return get_object_or_404(Affiliation, uuid=uuid)
+        return get_object_or_404(self.get_queryset(), uuid=uuid)
 
 
-class AffiliationUpdateView(generics.RetrieveUpdateAPIView):
+class AffiliationChangesView(generics.ListAPIView):
+    """List the affiliations that changed since a cursor, oldest change first.
+
+    Clients pass the `next` cursor from one response as `since` in the next request.
+    Without `since`, every affiliation is listed, a page at a time.
+    """
+
+    permission_classes = [HasAffilsAPIKey]
+    serializer_class = AffiliationSerializer
+
+    def list(self, request, *args, **kwargs):
+        since = request.query_params.get("since")
+        try:
+            position = decode_cursor(since) if since else None
+        except ValueError as exc:
+            raise ValidationError({"since": ["Invalid cursor."]}) from exc
+        try:
+            page_size = int(request.query_params.get("page_size", CHANGES_PAGE_SIZE))
+        except ValueError as exc:
+            raise ValidationError({"page_size": ["Must be a number."]}) from exc
+        page_size = max(1, min(page_size, MAX_CHANGES_PAGE_SIZE))
+
+        queryset = AffiliationSerializer.setup_eager_loading(
+            changed_affiliations(position),
+            AffiliationSerializer.requested_fields(request),
+        )
+        # Fetch one more than a page to find out if there are more changes.
+        affiliations = list(queryset[: page_size + 1])
+        has_more = len(affiliations) > page_size
+        affiliations = affiliations[:page_size]
+        if affiliations:
+            last = affiliations[-1]
+            next_cursor = encode_cursor(last.updated_at, last.pk)
+        else:
+            next_cursor = since
+        return Response(
+            {
+                "next": next_cursor,
+                "has_more": has_more,
+                "results": self.get_serializer(affiliations, many=True).data,
+            }
+        )
+
+
+@method_decorator(conditional_on_dataset_version, name="get")
+class AffiliationLookupView(APIView):
+    """Look up many affiliations at once by UUID, affiliation ID, or expert panel ID.
+
+    GET takes comma-separated identifiers in the query string, e.g.
+    `?uuids=...,...&affiliation_ids=10001`, and POST takes lists of them in the body,
+    for when there are too many to fit in a URL.
+    """
+
+    permission_classes = [HasAffilsAPIKey]
+
+    def get(self, request):
+        """Look up the affiliations in the query string."""
+        data = {
+            kind: [
+                value
+                for param in request.query_params.getlist(kind)
+                for value in param.split(",")
+                if value
+            ]
+            for kind in LOOKUP_FIELDS
+            if kind in request.query_params
+        }
+        return self.lookup(request, data)
+
+    def post(self, request):
+        """Look up the affiliations in the body."""
+        return self.lookup(request, request.data)
+
+    def lookup(self, request, data):
+        """Return the affiliations found for each identifier, or None if not found."""
+        serializer = AffiliationLookupSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        results = lookup_affiliations(
+            serializer.validated_data, AffiliationSerializer.requested_fields(request)
+        )
+        return Response(
+            {
+                kind: {
+                    identifier: self.serialize(request, found)
+                    for identifier, found in matches.items()
+                }
+                for kind, matches in results.items()
+            }
+        )
+
+    def serialize(self, request, found):
+        """Serialize an affiliation, a list of them, or None."""
+        if found is None:
+            return None
+        return AffiliationSerializer(
+            found, many=isinstance(found, list), context={"request": request}
+        ).data
+
+
+class AffiliationUpdateView(SparseFieldsMixin, generics.RetrieveUpdateAPIView):
     """Update editable affiliation data, return all affiliation information.
     This view supports lookup by either `affiliation_id` or `expert_panel_id`
     (only one should be provided in the URL).
@@ -84,12 +254,13 @@ class AffiliationUpdateView(generics.RetrieveUpdateAPIView):
 
     def get_object(self):
         """Retrieve Affiliation by either affiliation_id or expert_panel_id."""
+        queryset = self.get_queryset()
         affiliation_id = self.kwargs.get("affiliation_id")
         expert_panel_id = self.kwargs.get("expert_panel_id")
 
         if affiliation_id is not None:
             try:
-                return Affiliation.objects.get(affiliation_id=affiliation_id)
+                return queryset.get(affiliation_id=affiliation_id)
             except Affiliation.DoesNotExist as exc:
                 raise Http404(
                     "Affiliation with the provided affiliation_id was not found."
@@ -97,7 +268,7 @@ class AffiliationUpdateView(generics.RetrieveUpdateAPIView):
 
         if expert_panel_id is not None:
             try:
-                return Affiliation.objects.get(expert_panel_id=expert_panel_id)
+                return queryset.get(expert_panel_id=expert_panel_id)
             except Affiliation.DoesNotExist as exc:
                 raise Http404(
                     "Affiliation with the provided expert_panel_id was not found."
@@ -136,6 +307,7 @@ class CDWGUpdateView(generics.RetrieveUpdateAPIView):
     lookup_field = "id"
 
 
+@method_decorator(conditional_on_dataset_version, name="get")
 class CDWGListView(generics.ListAPIView):
     """List all CDWGs."""
 
@@ -144,6 +316,7 @@ class CDWGListView(generics.ListAPIView):
     serializer_class = ClinicalDomainWorkingGroupSerializer
 
 
+@method_decorator(conditional_on_dataset_version, name="get")
 class CDWGDetailView(generics.RetrieveAPIView):
     """List a single CDWG, lookup by either name or ID."""
 
@@ -172,147 +345,34 @@ class CDWGDetailView(generics.RetrieveAPIView):
 
 @api_view(["GET"])
 @permission_classes([HasAffilsAPIKey])
-def affiliations_list_json_format(request):  # pylint: disable=unused-argument
+@conditional_on_dataset_version
+def affiliations_list_json_format(request):
     """List all affiliations in old JSON format."""
-    affils_queryset = Affiliation.objects.filter(is_deleted=False).values()
-    response_obj = {}
-    for affil in affils_queryset:
-        affil_type = affil["type"].lower()
-        # In old JSON, SC-VCEPS are only considered VCEPS.
-        if affil_type == "sc_vcep":
-            affil_type = "vcep"
-        # In old JSON, Affiliation IDs and EP Ids are in string format.
-        affil_id = str(affil["affiliation_id"])
-        ep_id = str(affil["expert_panel_id"])
-
-        if affil_id not in response_obj:
-            if affil_type in ["vcep", "gcep"]:
-                old_json_format = {
-                    "affiliation_id": affil_id,
-                    "affiliation_fullname": affil["full_name"],
-                    "subgroups": {
-                        affil_type: {
-                            "id": ep_id,
-                            "fullname": affil["full_name"],
-                        },
-                    },
-                }
-            # Independent curation group format
-            else:
-                old_json_format = {
-                    "affiliation_id": affil_id,
-                    "affiliation_fullname": affil["full_name"],
-                }
-            response_obj[affil_id] = old_json_format
-        elif affil_type not in response_obj[affil_id]["subgroups"]:
-            # If VCEP or GCEP in full name, add other subgroup to end of name.
-            if ("VCEP" in response_obj[affil_id]["affiliation_fullname"]) or (
-                "GCEP" in response_obj[affil_id]["affiliation_fullname"]
-            ):
-                response_obj[affil_id]["affiliation_fullname"] = (
-                    response_obj[affil_id]["affiliation_fullname"] + "/" + affil["type"]
-                )
-            # Else append affiliation subgroup name to full name
-            else:
-                response_obj[affil_id]["affiliation_fullname"] = (
-                    response_obj[affil_id]["affiliation_fullname"]
-                    + "/"
-                    + affil["full_name"]
-                )
-
-            response_obj[affil_id]["subgroups"][affil_type] = {
-                "id": ep_id,
-                "fullname": affil["full_name"],
-            }
-        # If there are approvers, add them to the object.
-        approvers_queryset = Approver.objects.filter(
-            affiliation_id=affil["id"]
-        ).values_list("approver_name", flat=True)
-        if approvers_queryset and "approver" not in response_obj[affil_id]:
-            response_obj[affil_id]["approver"] = []
-        for name in approvers_queryset:
-            if name not in response_obj[affil_id]["approver"]:
-                response_obj[affil_id]["approver"].append(name)
-
-    return JsonResponse(
-        list(response_obj.values()),
+    if wants_stream(request):
+        return streaming_json_response(
+            request, stream_legacy_json(legacy_affiliations())
+        )
+    return HttpResponse(
+        legacy_affiliations_snapshot(),
         status=200,
-        safe=False,
-        json_dumps_params={"ensure_ascii": False},
+        content_type="application/json",
     )
 
 
 @api_view(["GET"])
 @permission_classes([HasAffilsAPIKey])
+@conditional_on_dataset_version
 def affiliation_detail_json_format(request):
     """List specific affiliation in old JSON format."""
     affil_id = request.GET.get("affil_id")
-    affils_queryset = Affiliation.objects.filter(
-        affiliation_id=affil_id, is_deleted=False
-    ).values()
-    response_obj = {}
-    for affil in affils_queryset:
-        affil_type = affil["type"].lower()
-        # In old JSON, SC-VCEPS are only considered VCEPS.
-        if affil_type == "sc_vcep":
-            affil_type = "vcep"
-        # In old JSON, Affiliation IDs and EP Ids are in string format.
-        affil_id = str(affil["affiliation_id"])
-        ep_id = str(affil["expert_panel_id"])
-
-        if affil_id not in response_obj:
-            if affil_type in ["vcep", "gcep"]:
-                old_json_format = {
-                    "affiliation_id": affil_id,
-                    "affiliation_fullname": affil["full_name"],
-                    "subgroups": {
-                        affil_type: {
-                            "id": ep_id,
-                            "fullname": affil["full_name"],
-                        },
-                    },
-                }
-            # Independent curation group format
-            else:
-                old_json_format = {
-                    "affiliation_id": affil_id,
-                    "affiliation_fullname": affil["full_name"],
-                }
-            response_obj[affil_id] = old_json_format
-        elif affil_type not in response_obj[affil_id]["subgroups"]:
-            # If VCEP or GCEP in full name, add other subgroup to end of name.
-            if ("VCEP" in response_obj[affil_id]["affiliation_fullname"]) or (
-                "GCEP" in response_obj[affil_id]["affiliation_fullname"]
-            ):
-                response_obj[affil_id]["affiliation_fullname"] = (
-                    response_obj[affil_id]["affiliation_fullname"] + "/" + affil["type"]
-                )
-            # Else append affiliation subgroup name to full name
-            else:
-                response_obj[affil_id]["affiliation_fullname"] = (
-                    response_obj[affil_id]["affiliation_fullname"]
-                    + "/"
-                    + affil["full_name"]
-                )
-
-            response_obj[affil_id]["subgroups"][affil_type] = {
-                "id": ep_id,
-                "fullname": affil["full_name"],
-            }
-        # If there are approvers, add them to the object.
-        approvers_queryset = Approver.objects.filter(
-            affiliation_id=affil["id"]
-        ).values_list("approver_name", flat=True)
-        if approvers_queryset and "approver" not in response_obj[affil_id]:
-            response_obj[affil_id]["approver"] = []
-        for name in approvers_queryset:
-            if name not in response_obj[affil_id]["approver"]:
-                response_obj[affil_id]["approver"].append(name)
-    return JsonResponse(
-        list(response_obj.values()),
+    return HttpResponse(
+        render_legacy_json(
+            build_legacy_affiliations(
+                legacy_affiliations().filter(affiliation_id=affil_id)
+            )
+        ),
         status=200,
-        safe=False,
-        json_dumps_params={"ensure_ascii": False},
+        content_type="application/json",
     )
 
 
@@ -339,3 +399,36 @@ def create_affiliation(request):
         },
         status=status.HTTP_400_BAD_REQUEST,
     )
+
+
+@api_view(["POST"])
+@permission_classes([HasWriteAccess])
+def bulk_create_affiliations(request):
+    """Handle POST request to create many affiliations at once, return the
+    affiliation_id and expert_panel_id of each, in the order they were sent."""
+    serializer = AffiliationSerializer(
+        data=request.data,
+        many=True,
+        allow_empty=False,
+        max_length=BULK_CREATE_LIMIT,
+    )
+    if serializer.is_valid():
+        instances = serializer.save()
+        return Response(
+            [
+                {
+                    "affiliation_id": instance.affiliation_id,
+                    "expert_panel_id": instance.expert_panel_id,
+                }
+                for instance in instances
+            ],
+            status=status.HTTP_201_CREATED,
+        )
+    logging.warning("Bulk affiliation creation failed: %s", serializer.errors)
+    return Response(
+        {
+            "error": "Validation Failed",
+            "details": serializer.errors,
+        },
+        status=status.HTTP_400_BAD_REQUEST,
+    )
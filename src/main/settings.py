@@ -12,11 +12,12 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 # Built-in libraries:
 from pathlib import Path
 import os
+import sys
+import tempfile
 
 # Third-party dependencies:
 from dotenv import load_dotenv, find_dotenv
 from django.templatetags.static import static
-import boto3
 
 # Set environment variables.
 load_dotenv(find_dotenv())
@@ -125,6 +126,25 @@ DATABASES = {
     }
 }
 
+# Caching:
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# The rendered legacy affiliations JSON is kept in the cache between writes.
+# Verified API keys are kept in files that every process on the host shares, so a
+# change to a key clears its entry for all of them.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "api_keys": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.environ.get(
+            "AFFILS_API_KEY_CACHE_DIR",
+            os.path.join(tempfile.gettempdir(), "affils-api-keys"),
+        ),
+        "OPTIONS": {"MAX_ENTRIES": 1000},
+    },
+}
+
 STORAGES = {
     "dbbackup": {
         "BACKEND": "storages.backends.s3boto3.S3Boto3Storage",
@@ -183,7 +203,7 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 REST_FRAMEWORK = {
     "DEFAULT_RENDERER_CLASSES": (
-        "rest_framework.renderers.JSONRenderer",
+        "affiliations.renderers.FastJSONRenderer",
         "affiliations.renderers.BrowsableAPIRendererWithoutForms",
     ),
     "EXCEPTION_HANDLER": "affiliations.views.custom_exception_handler",
@@ -231,17 +251,39 @@ CRONJOBS = [
 ]
 
 # Logging and Cloudwatch
-logger_boto3_session = boto3.client(
-    "logs",
-    aws_access_key_id=os.environ.get("AFFILS_AWS_ACCESS_KEY"),
-    aws_secret_access_key=os.environ.get("AFFILS_AWS_SECRET_KEY"),
-    region_name=os.environ.get("AFFILS_AWS_REGION"),
-)
+WATCHTOWER_HANDLER = {
+    "level": "INFO",
+    # Connects to CloudWatch when the first record is sent, not on startup.
+    "class": "affiliations.log_handlers.LazyCloudWatchLogHandler",
+    "aws_access_key_id": os.environ.get("AFFILS_AWS_ACCESS_KEY"),
+    "aws_secret_access_key": os.environ.get("AFFILS_AWS_SECRET_KEY"),
+    "region_name": os.environ.get("AFFILS_AWS_REGION"),
+    "log_group_name": "Affiliation_Logs",
+    # Different stream for each environment
+    "log_stream_name": f"affiliation-{os.environ.get('AFFILS_ENV')}-logs",
+    "formatter": "aws",
+}
+# Tests keep log records in memory, and without AWS credentials they're printed, so
+# nothing tries to reach CloudWatch.
+if sys.argv[1:2] == ["test"]:
+    WATCHTOWER_HANDLER = {
+        "level": "INFO",
+        "class": "affiliations.log_handlers.InMemoryHandler",
+    }
+elif not all(
+    os.environ.get(name)
+    for name in ("AFFILS_AWS_ACCESS_KEY", "AFFILS_AWS_SECRET_KEY", "AFFILS_AWS_REGION")
+):
+    WATCHTOWER_HANDLER = {
+        "level": "INFO",
+        "class": "logging.StreamHandler",
+        "formatter": "aws",
+    }
 
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
-    "root": {"level": "INFO", "handlers": ["watchtower"]},
+    "root": {"level": "INFO", "handlers": ["cloudwatch_queue"]},
     "formatters": {
         "aws": {
             "format": "%(asctime)s [%(levelname)-8s] %(message)s [%(pathname)s:%(lineno)d]",
@@ -249,15 +291,17 @@ LOGGING = {
         },
     },
     "handlers": {
-        "watchtower": {
+        # Requests only put records on a bounded queue. A background thread passes
+        # them to the watchtower handler in batches, so CloudWatch is never waited on.
+        "cloudwatch_queue": {
             "level": "INFO",
-            "class": "watchtower.CloudWatchLogHandler",
-            "boto3_client": logger_boto3_session,
-            "log_group_name": "Affiliation_Logs",
-            # Different stream for each environment
-            "stream_name": f"affiliation-{os.environ.get('AFFILS_ENV')}-logs",
-            "formatter": "aws",
+            "class": "affiliations.log_handlers.BatchingQueueHandler",
+            "target": "watchtower",
+            "capacity": 10000,
+            "batch_size": 500,
+            "flush_interval": 5.0,
         },
+        "watchtower": WATCHTOWER_HANDLER,
         "console": {
             "class": "logging.StreamHandler",
             "formatter": "aws",
@@ -267,7 +311,7 @@ LOGGING = {
         # Use this logger to send data just to Cloudwatch
         "watchtower": {
             "level": "INFO",
-            "handlers": ["watchtower"],
+            "handlers": ["cloudwatch_queue"],
             "propagate": False,
         }
     },
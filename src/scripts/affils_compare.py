@@ -6,41 +6,172 @@ Both files need to be saved in the `scripts` folder in directory before running.
 You can then run this script by running:
 `python manage.py runscript affils_compare` in the command line from the directory.
 
+Both files are read one affiliation at a time, and only the legacy-format fields
+(`affiliation_fullname`, `subgroups`, and `approver`) are compared. Each affiliation
+that differs is written as a line of JSON to `affils_diff_output.jsonl`, e.g.
+`{"affiliation_id": "10001", "change": "changed", "differences": [{"path":
+"subgroups.vcep.fullname", "old": "...", "new": "..."}]}`. Affiliations that are only
+in the API response are "added", and ones that are only in the JSON file "removed".
+
 Follow steps outlined in [tutorial.md](
 doc/tutorial.md/#running-the-loadpy-script-to-import-data-into-the-database).
 """
 
+from collections import Counter
 from pathlib import Path
-import os
 import json
-from deepdiff import DeepDiff  # type: ignore
 
-CURRENT_DIR = os.path.dirname(__file__)
-FILENAME = os.path.join(CURRENT_DIR, "affils_diff_output.txt")
+FILENAME = Path(__file__).parent / "affils_diff_output.jsonl"
 
 AFFIL_JSON_PATH = Path(__file__).parent / "affiliations.json"
 AFFIL_RESPONSE_PATH = Path(__file__).parent / "affils_response.json"
 
+# The fields of a legacy affiliation that are compared.
+COMPARED_FIELDS = ["affiliation_fullname", "subgroups", "approver"]
+
+# How many characters are read from a file at a time.
+READ_SIZE = 64 * 1024
+
+WHITESPACE = " \t\n\r"
+
 
 def run():
-    """Compare JSON file to API response and return a txt file of any differences."""
+    """Compare JSON file to API response and write a JSON line for each difference."""
+    counts: Counter = Counter()
     with open(AFFIL_JSON_PATH, encoding="utf-8") as f, open(
         AFFIL_RESPONSE_PATH, encoding="utf-8"
-    ) as f2:
-        affils_json = json.load(f)
-        affils_response = json.load(f2)
-        affils_json_dict = {}
-        affils_response_dict = {}
-
-        # Build dict for each file.
-        for affil in affils_json:
-            affil_id = affil["affiliation_id"]
-            affils_json_dict[affil_id] = affil
-        for affil in affils_response:
-            affil_id = affil["affiliation_id"]
-            affils_response_dict[affil_id] = affil
-
-        # Compare both files
-        diff = DeepDiff(affils_json_dict, affils_response_dict)
-        with open(FILENAME, "w", encoding="utf-8") as f:
-            print(diff, file=f)
+    ) as f2, open(FILENAME, "w", encoding="utf-8") as output:
+        for diff in compare(iter_json_array(f), iter_json_array(f2)):
+            counts[diff["change"]] += 1
+            print(json.dumps(diff, ensure_ascii=False), file=output)
+
+    print(
+        f"{counts['changed']} changed, {counts['added']} added,"
+        f" {counts['removed']} removed. Written to {FILENAME.name}."
+    )
+
+
+def iter_json_array(file, read_size=READ_SIZE):
+    """Yield the elements of the JSON array in the file, one at a time.
+
+    Only a little more of the file than the element being decoded is held in memory.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    at_end = False
+
+    def read_more():
+        # Drop what has already been decoded before adding more of the file.
+        nonlocal buffer, position, at_end
+        more = file.read(read_size)
+        at_end = not more
+        buffer = buffer[position:] + more
+        position = 0
+
+    def skip(characters):
+        # Move past the characters, reading more of the file if needed.
+        nonlocal position
+        while True:
+            while position < len(buffer) and buffer[position] in characters:
+                position += 1
+            if position < len(buffer) or at_end:
+                return
+            read_more()
+
+    def expect_end():
+        # Nothing but whitespace can follow the array.
+        skip(WHITESPACE)
+        if position < len(buffer):
+            raise ValueError("Unexpected data after the JSON array.")
+
+    skip(WHITESPACE)
+    if buffer[position : position + 1] != "[":
+        raise ValueError("Expected the file to hold a JSON array.")
+    position += 1
+    skip(WHITESPACE)
+    if buffer[position : position + 1] == "]":
+        position += 1
+        expect_end()
+        return
+
+    while True:
+        skip(WHITESPACE)
+        try:
+            element, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if at_end:
+                raise
+            read_more()
+            continue
+        # Look past the element by index, as copying the rest of the buffer for
+        # every element would make large files quadratic.
+        after = end
+        while after < len(buffer) and buffer[after] in WHITESPACE:
+            after += 1
+        if buffer[after : after + 1] not in (",", "]") and not at_end:
+            # Until the next "," or "]" is read, a number might carry on in the
+            # next read, so decode it again once there's more.
+            read_more()
+            continue
+        yield element
+        position = after
+        skip(WHITESPACE)
+        separator = buffer[position : position + 1]
+        position += 1
+        if separator == "]":
+            expect_end()
+            return
+        if separator != ",":
+            if not separator:
+                raise ValueError("The JSON array isn't closed.")
+            raise ValueError(
+                f"Expected ',' or ']' after an element, not {separator!r}."
+            )
+
+
+def compared_fields(affil):
+    """Return just the fields of the affiliation that are compared."""
+    return {field: affil.get(field) for field in COMPARED_FIELDS}
+
+
+def diff_values(old, new, path=""):
+    """List the differences between two values, descending into objects.
+
+    Lists, like the approvers, are compared as a whole.
+    """
+    if isinstance(old, dict) and isinstance(new, dict):
+        differences = []
+        for key in [*old, *(key for key in new if key not in old)]:
+            key_path = f"{path}.{key}" if path else key
+            differences.extend(diff_values(old.get(key), new.get(key), key_path))
+        return differences
+    if old != new:
+        return [{"path": path, "old": old, "new": new}]
+    return []
+
+
+def compare(old_affils, new_affils):
+    """Yield a diff for each affiliation that differs between the two.
+
+    Only the compared fields of the old affiliations are kept in memory, keyed by
+    affiliation ID. The new affiliations are compared as they're read.
+    """
+    old_by_id = {
+        affil["affiliation_id"]: compared_fields(affil) for affil in old_affils
+    }
+    for affil in new_affils:
+        affil_id = affil["affiliation_id"]
+        new = compared_fields(affil)
+        if affil_id not in old_by_id:
+            yield {"affiliation_id": affil_id, "change": "added", "new": new}
+            continue
+        differences = diff_values(old_by_id.pop(affil_id), new)
+        if differences:
+            yield {
+                "affiliation_id": affil_id,
+                "change": "changed",
+                "differences": differences,
+            }
+    for affil_id, old in old_by_id.items():
+        yield {"affiliation_id": affil_id, "change": "removed", "old": old}
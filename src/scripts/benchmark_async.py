@@ -0,0 +1,77 @@
+"""Compare the synchronous and async read endpoints under concurrent requests.
+
+Each route is requested many times at once through Django's ASGI handler, the same
+handler Daphne runs, and the time taken and the most threads in use are printed.
+
+A temporary API key is created for the run and deleted afterwards.
+
+You can run this script by running:
+`python manage.py runscript benchmark_async` in the command line from the directory.
+Pass `--script-args 50 200` to choose how many requests are sent at once.
+"""
+
+import asyncio
+import threading
+import time
+
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient, override_settings
+
+from affiliations.models import CustomAPIKey
+
+DEFAULT_CONCURRENCY = [10, 50, 200]
+ROUTES = [
+    "affiliations_list/",
+    "affiliation_detail/?affil_id=10000",
+    "cdwg_list/",
+]
+
+
+async def measure(client: AsyncClient, path: str, concurrency: int, api_key: str):
+    """Send `concurrency` requests at once, return the time taken and peak threads."""
+    peak_threads = threading.active_count()
+    done = False
+
+    async def watch_threads():
+        nonlocal peak_threads
+        while not done:
+            peak_threads = max(peak_threads, threading.active_count())
+            await asyncio.sleep(0.001)
+
+    watcher = asyncio.create_task(watch_threads())
+    start = time.perf_counter()
+    responses = await asyncio.gather(
+        *(client.get(path, headers={"X-Api-Key": api_key}) for _ in range(concurrency))
+    )
+    elapsed = time.perf_counter() - start
+    done = True
+    await watcher
+    statuses = {response.status_code for response in responses}
+    return elapsed, peak_threads, statuses
+
+
+async def benchmark(concurrency_levels: list[int], api_key: str) -> None:
+    """Print the results for each route, concurrency level, and kind of view."""
+    client = AsyncClient()
+    for route in ROUTES:
+        print(f"\n{route}")
+        for concurrency in concurrency_levels:
+            for label, prefix in (("sync", "/api/"), ("async", "/api/async/")):
+                elapsed, threads, statuses = await measure(
+                    client, prefix + route, concurrency, api_key
+                )
+                print(
+                    f"  {concurrency:>4} at once, {label:<5}: {elapsed * 1000:8.1f} ms,"
+                    f" {threads:>3} threads, status {sorted(statuses)}"
+                )
+
+
+def run(*args):
+    """Run the benchmark with a temporary API key."""
+    concurrency_levels = [int(arg) for arg in args] or DEFAULT_CONCURRENCY
+    api_key, raw_key = CustomAPIKey.objects.create_key(name="benchmark-async")
+    try:
+        with override_settings(ALLOWED_HOSTS=["testserver"]):
+            async_to_sync(benchmark)(concurrency_levels, raw_key)
+    finally:
+        api_key.delete()
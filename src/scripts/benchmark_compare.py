@@ -0,0 +1,106 @@
+"""Compare the speed and memory use of `affils_compare` and DeepDiff.
+
+Two synthetic legacy-format files are written for each size, the second with some
+affiliations renamed, given new approvers, added, or removed. Both comparisons are
+run on them, and the time taken and the peak memory allocated are printed.
+
+The files are written to a temporary directory, and nothing is read from or written to
+the database.
+
+You can run this script by running:
+`python manage.py runscript benchmark_compare` in the command line from the directory.
+Pass `--script-args 10000 50000` to choose how many affiliations are in each file.
+"""
+
+import json
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from deepdiff import DeepDiff  # type: ignore
+
+from scripts.affils_compare import compare, iter_json_array
+
+DEFAULT_SIZES = [10000, 50000]
+# Every nth affiliation is changed in the second file.
+CHANGE_EVERY = 100
+
+
+def fake_affiliation(i: int, renamed: bool = False) -> dict:
+    """Build a legacy-format affiliation, with both subgroups for even numbers."""
+    name = f"Affiliation {i} Renamed" if renamed else f"Affiliation {i}"
+    affil = {
+        "affiliation_id": str(10000 + i),
+        "affiliation_fullname": name,
+        "subgroups": {"gcep": {"id": str(40000 + i), "fullname": name}},
+        "approver": [f"Approver {i}", f"Approver {i + 1}"],
+    }
+    if i % 2 == 0:
+        affil["subgroups"]["vcep"] = {"id": str(50000 + i), "fullname": name}
+    return affil
+
+
+def write_files(directory: Path, size: int) -> tuple[Path, Path]:
+    """Write the two files to compare, and return their paths."""
+    old = [fake_affiliation(i) for i in range(size)]
+    new = []
+    for i in range(size):
+        change = i % CHANGE_EVERY
+        if change == 1:
+            continue  # Removed.
+        affil = fake_affiliation(i, renamed=change == 2)
+        if change == 3:
+            affil["approver"].append("New Approver")
+        new.append(affil)
+    new.extend(fake_affiliation(i) for i in range(size, size + size // CHANGE_EVERY))
+
+    old_path, new_path = directory / "old.json", directory / "new.json"
+    old_path.write_text(json.dumps(old), encoding="utf-8")
+    new_path.write_text(json.dumps(new), encoding="utf-8")
+    return old_path, new_path
+
+
+def streaming_compare(old_path: Path, new_path: Path) -> int:
+    """Compare the files with `affils_compare`, return how many affiliations differ."""
+    with open(old_path, encoding="utf-8") as f, open(new_path, encoding="utf-8") as f2:
+        return sum(1 for _ in compare(iter_json_array(f), iter_json_array(f2)))
+
+
+def deepdiff_compare(old_path: Path, new_path: Path) -> int:
+    """Compare the files the way `affils_compare` used to, return the changed paths."""
+    with open(old_path, encoding="utf-8") as f, open(new_path, encoding="utf-8") as f2:
+        old = {affil["affiliation_id"]: affil for affil in json.load(f)}
+        new = {affil["affiliation_id"]: affil for affil in json.load(f2)}
+    diff = DeepDiff(old, new)
+    return sum(len(paths) for paths in diff.values())
+
+
+def measure(comparison, old_path: Path, new_path: Path) -> tuple[float, float, int]:
+    """Run the comparison, return the seconds taken, peak MiB, and its result."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = comparison(old_path, new_path)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1024 / 1024, result
+
+
+def run(*args):
+    """Print the time and memory each comparison takes for each size."""
+    sizes = [int(arg) for arg in args] or DEFAULT_SIZES
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            old_path, new_path = write_files(Path(directory), size)
+            megabytes = new_path.stat().st_size / 1024 / 1024
+            print(f"\n{size} affiliations ({megabytes:.1f} MiB per file):")
+            for label, comparison, unit in (
+                ("affils_compare", streaming_compare, "affiliations differ"),
+                ("DeepDiff", deepdiff_compare, "paths differ"),
+            ):
+                elapsed, peak, found = measure(comparison, old_path, new_path)
+                print(
+                    f"  {label:<14} {elapsed:8.2f} s, peak {peak:7.1f} MiB,"
+                    f" {found} {unit}"
+                )
@@ -0,0 +1,88 @@
+"""Show how the query plans for common affiliation lookups change as the table grows.
+
+For each table size, fake affiliations and coordinators are added, the planner
+statistics are refreshed, and the plan for each lookup is printed. Everything runs in
+a transaction that is rolled back at the end, so the database is left as it was.
+
+You can run this script by running:
+`python manage.py runscript benchmark_indexes` in the command line from the directory.
+Pass `--script-args 100 1000 100000` to choose the table sizes.
+"""
+
+from django.db import connection, transaction
+
+from affiliations.models import Affiliation, ClinicalDomainWorkingGroup, Coordinator
+
+DEFAULT_SIZES = [100, 1000, 10000, 100000]
+STATUSES = ["ACTIVE", "ACTIVE", "ACTIVE", "INACTIVE", "RETIRED"]
+TYPES = ["GCEP", "VCEP", "SC_VCEP", "INDEPENDENT_CURATION"]
+
+# The lookups the API and admin make, by the name they're reported under.
+LOOKUPS = {
+    "affiliation_id": lambda: Affiliation.objects.filter(affiliation_id=10500),
+    "expert_panel_id": lambda: Affiliation.objects.filter(expert_panel_id=40500),
+    "legacy detail": lambda: Affiliation.objects.filter(
+        is_deleted=False, affiliation_id=10500
+    ),
+    "status filter": lambda: Affiliation.objects.filter(status="RETIRED"),
+    "type filter": lambda: Affiliation.objects.filter(type="SC_VCEP"),
+    "coordinator email": lambda: Coordinator.objects.filter(
+        coordinator_email="coordinator500@example.com"
+    ),
+}
+
+
+def add_fake_affiliations(start: int, stop: int) -> None:
+    """Add fake affiliations, each with a coordinator, numbered from start to stop."""
+    cdwg, _ = ClinicalDomainWorkingGroup.objects.get_or_create(name="Benchmark")
+    affiliations = Affiliation.objects.bulk_create(
+        Affiliation(
+            affiliation_id=10000 + i,
+            expert_panel_id=40000 + i,
+            full_name=f"Benchmark Affiliation {i}",
+            status=STATUSES[i % len(STATUSES)],
+            type=TYPES[i % len(TYPES)],
+            clinical_domain_working_group=cdwg,
+            is_deleted=i % 50 == 0,
+        )
+        for i in range(start, stop)
+    )
+    Coordinator.objects.bulk_create(
+        Coordinator(
+            affiliation=affiliation,
+            coordinator_name=f"Coordinator {i}",
+            coordinator_email=f"coordinator{i}@example.com",
+        )
+        for i, affiliation in zip(range(start, stop), affiliations)
+    )
+
+
+def scan_type(plan: str) -> str:
+    """Return the first scan in the plan, and the index or table it reads."""
+    for line in plan.splitlines():
+        for scan in ["Index Only Scan", "Bitmap Index Scan", "Index Scan", "Seq Scan"]:
+            if scan in line:
+                # e.g. "Index Scan using affiliation_id_idx on affiliations_affiliation"
+                if " using " in line:
+                    target = line.split(" using ", 1)[1]
+                else:
+                    target = line.split(" on ", 1)[1]
+                return f"{scan} ({target.split()[0]})"
+    return plan.splitlines()[0]
+
+
+def run(*args):
+    """Print the scan type for each lookup at each table size."""
+    sizes = [int(arg) for arg in args] or DEFAULT_SIZES
+    with transaction.atomic():
+        existing = 0
+        for size in sorted(sizes):
+            add_fake_affiliations(existing, size)
+            existing = size
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+
+            print(f"\n{size} fake affiliations:")
+            for name, lookup in LOOKUPS.items():
+                print(f"  {name:<18} {scan_type(lookup().explain())}")
+        transaction.set_rollback(True)
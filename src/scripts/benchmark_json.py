@@ -0,0 +1,111 @@
+"""Compare the speed and memory use of the standard and fast JSON encoders.
+
+Synthetic affiliations are encoded for each size, in the legacy format as a whole list
+and an affiliation at a time (as when streaming), and in the DRF format through the
+renderers. The time taken and the peak memory allocated are printed, and the outputs
+are checked to be the same bytes.
+
+Nothing is read from or written to the database. Without orjson installed, both
+encoders take the same path.
+
+You can run this script by running:
+`python manage.py runscript benchmark_json` in the command line from the directory.
+Pass `--script-args 10000 50000` to choose how many affiliations are encoded.
+"""
+
+import json
+import time
+import tracemalloc
+
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.renderers import JSONRenderer
+
+from affiliations.encoding import dumps_legacy, orjson
+from affiliations.renderers import FastJSONRenderer
+
+DEFAULT_SIZES = [10000, 50000]
+
+
+def fake_legacy_affiliation(i: int) -> dict:
+    """Build a legacy-format affiliation with both subgroups."""
+    name = f"Affiliation {i} – Hereditary Cancer: ü"
+    return {
+        "affiliation_id": str(10000 + i),
+        "affiliation_fullname": name,
+        "subgroups": {
+            "gcep": {"id": str(40000 + i), "fullname": f"{name} GCEP"},
+            "vcep": {"id": str(50000 + i), "fullname": f"{name} VCEP"},
+        },
+        "approver": [f"Approver {i}", f"Approver {i + 1}"],
+    }
+
+
+def fake_affiliation(i: int) -> dict:
+    """Build an affiliation the way `AffiliationSerializer` returns it."""
+    return {
+        "affiliation_id": 10000 + i,
+        "expert_panel_id": 40000 + i,
+        "full_name": f"Affiliation {i} – Hereditary Cancer: ü",
+        "short_name": None,
+        "status": "ACTIVE",
+        "type": "GCEP",
+        "clinical_domain_working_group": i % 10,
+        "members": ", ".join(f"Member {j}" for j in range(20)),
+        "approvers": [{"approver_name": f"Approver {i}"}],
+        "coordinators": [
+            {"coordinator_name": "Oak", "coordinator_email": f"oak{i}@example.org"}
+        ],
+        "clinvar_submitter_ids": [{"clinvar_submitter_id": str(i)}],
+        "is_deleted": False,
+        "uuid": f"00000000-0000-0000-0000-{i:012d}",
+    }
+
+
+def legacy_json_dumps(data) -> bytes:
+    """Encode legacy JSON the way the legacy views used to."""
+    return json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False).encode("utf-8")
+
+
+def measure(encode, data) -> tuple[float, float, bytes]:
+    """Run the encoding, return the seconds taken, peak MiB, and its output.
+
+    Tracing allocations slows encoding down, so it's timed in a separate run.
+    """
+    start = time.perf_counter()
+    result = encode(data)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    encode(data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1024 / 1024, result
+
+
+def run(*args):
+    """Print the time and memory each encoder takes for each size."""
+    sizes = [int(arg) for arg in args] or DEFAULT_SIZES
+    print(f"orjson {'is' if orjson else 'is not'} installed.")
+    for size in sizes:
+        legacy = [fake_legacy_affiliation(i) for i in range(size)]
+        affiliations = [fake_affiliation(i) for i in range(size)]
+        print(f"\n{size} affiliations:")
+        for label, data, standard, fast in (
+            ("legacy list", legacy, legacy_json_dumps, dumps_legacy),
+            (
+                "legacy stream",
+                legacy,
+                lambda data: b", ".join(map(legacy_json_dumps, data)),
+                lambda data: b", ".join(map(dumps_legacy, data)),
+            ),
+            ("DRF", affiliations, JSONRenderer().render, FastJSONRenderer().render),
+        ):
+            results = []
+            for encoder, encode in (("standard", standard), ("fast", fast)):
+                elapsed, peak, output = measure(encode, data)
+                results.append(output)
+                print(
+                    f"  {label:<14} {encoder:<9} {elapsed:6.3f} s,"
+                    f" peak {peak:7.1f} MiB, {len(output) / 1024 / 1024:.1f} MiB out"
+                )
+            if results[0] != results[1]:
+                print(f"  {label}: the outputs differ!")
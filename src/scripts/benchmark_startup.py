@@ -0,0 +1,73 @@
+"""Measure how long it takes the affiliations service to start.
+
+Runs `python -X importtime manage.py check` a few times, then prints how long startup
+took and which top-level imports took the longest. Run it before and after a change to
+see whether the change made startup slower.
+
+You can run this script from the `src` directory with:
+`python scripts/benchmark_startup.py [runs]`
+or with `python manage.py runscript benchmark_startup`.
+"""
+
+import re
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+MANAGE_PY = Path(__file__).resolve().parent.parent / "manage.py"
+DEFAULT_RUNS = 5
+SLOWEST_IMPORTS = 15
+
+# e.g. "import time:       315 |       1604 |   django.db"
+IMPORT_TIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)")
+
+
+def start_once() -> tuple[float, str]:
+    """Run `manage.py check` once, return the seconds taken and the import times."""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", str(MANAGE_PY), "check"],
+        capture_output=True,
+        check=True,
+        cwd=MANAGE_PY.parent,
+        text=True,
+    )
+    return time.perf_counter() - start, result.stderr
+
+
+def top_level_imports(import_times: str) -> dict[str, int]:
+    """Map each top-level import to its cumulative import time, in microseconds."""
+    imports = {}
+    for line in import_times.splitlines():
+        match = IMPORT_TIME.match(line)
+        # Imports made by other imports are indented further.
+        if match and len(match.group(3)) == 1:
+            imports[match.group(4)] = int(match.group(2))
+    return imports
+
+
+def run(*args):
+    """Print the startup times and the slowest top-level imports."""
+    runs = int(args[0]) if args else DEFAULT_RUNS
+    timings = []
+    imports: dict[str, list[int]] = {}
+    for _ in range(runs):
+        elapsed, import_times = start_once()
+        timings.append(elapsed)
+        for name, micros in top_level_imports(import_times).items():
+            imports.setdefault(name, []).append(micros)
+
+    print(f"`manage.py check` over {runs} runs:")
+    print(f"  median {statistics.median(timings) * 1000:.0f} ms")
+    print(f"  min    {min(timings) * 1000:.0f} ms")
+    print(f"  max    {max(timings) * 1000:.0f} ms")
+    print("\nSlowest top-level imports (median cumulative time):")
+    medians = {name: statistics.median(times) for name, times in imports.items()}
+    for name in sorted(medians, key=medians.get, reverse=True)[:SLOWEST_IMPORTS]:
+        print(f"  {medians[name] / 1000:8.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    run(*sys.argv[1:])
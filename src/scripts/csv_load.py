@@ -6,6 +6,11 @@ CSV needs to be saved in the `scripts` folder in directory before running.
 
 You can then run this script by running:
 `python manage.py runscript csv_load` in the command line from the directory.
+Pass `--script-args dry-run` to only print what would be added.
+
+The whole file is read and checked before anything is added, so a bad row stops the
+load before it starts. Affiliations that are already in the database are skipped, so
+the script can be run again after a partial load.
 
 Follow steps outlined in [tutorial.md](
 doc/tutorial.md/#running-the-loadpy-script-to-import-data-into-the-database).
@@ -13,91 +18,212 @@ doc/tutorial.md/#running-the-loadpy-script-to-import-data-into-the-database).
 
 from pathlib import Path
 import csv
+import time
+
+from django.db import transaction
+from affiliations.events import change_event, record_changes
 from affiliations.models import (
     Affiliation,
+    AffiliationStatus,
+    ChangeKind,
     Submitter,
     Coordinator,
     ClinicalDomainWorkingGroup,
 )
+from affiliations.streaming import batched
+from affiliations.versioning import bump_dataset_version
 
 FILEPATH = Path(__file__).parent / "Affiliations - VCI_GCI Affiliation List.csv"
 
+# How many affiliations, with their submitters and coordinators, are added in
+# each transaction.
+CHUNK_SIZE = 500
 
-def run():  # pylint: disable-msg=too-many-locals disable-msg=too-many-branches
-    """Iterate through CSV and create Affiliation, Submitter ID, and Coordinator
-    objects in the DB."""
+
+def run(*args):
+    """Read and check the CSV, then add the Affiliation, Submitter ID, and
+    Coordinator objects that aren't in the DB yet."""
+    dry_run = "dry-run" in args
+    start = time.perf_counter()
 
     with open(
         FILEPATH,
         encoding="utf-8",
     ) as file:
-        csv_reader = csv.DictReader(file)
-
-        for row in csv_reader:
-            external_full_name = row["Affiliation Full Name"].strip()
-            external_short_name = row["short name"].strip()
-            affil_id = row["AffiliationID"].strip()
-            coordinator_name = row["Coordinator(s)"].strip()
-            coordinator_email = row["Email"].strip()
-            clinvar_submitter_id = row["Submitter ID"]
-            vcep_ep_id = row["VCEP Affiliation ID"].strip()
-            vcep_full_name = row["VCEP Affiliation Name"].strip()
-            gcep_ep_id = row["GCEP Affiliation ID"].strip()
-            gcep_full_name = row["GCEP Affiliation Name"].strip()
-            status = row["Status"].strip()
-            cdwg = row["CDWG"].strip()
-            is_deleted = row["is_deleted"].strip()
-            is_deleted = is_deleted_value(is_deleted)
-
-            coordinator_names = coordinator_name.split(",")
-            coordinator_emails = coordinator_email.split(",")
-
-            type_list = []
-            if gcep_ep_id:
-                if gcep_full_name == "":
-                    gcep_full_name = external_full_name
-                type_list.append(("GCEP", gcep_ep_id, gcep_full_name))
-            if vcep_ep_id:
-                if vcep_full_name == "":
-                    vcep_full_name = external_full_name
-                if "SC-VCEP" in vcep_full_name:
-                    type_list.append(("SC_VCEP", vcep_ep_id, vcep_full_name))
-                else:
-                    type_list.append(("VCEP", vcep_ep_id, vcep_full_name))
-            if not gcep_ep_id and not vcep_ep_id:
-                type_list.append(("INDEPENDENT_CURATION", None, external_full_name))
-
-            cdwg_obj = ClinicalDomainWorkingGroup.objects.get(name=cdwg)
-            for type_name, ep_id, name in type_list:
-                affil = Affiliation.objects.create(
-                    affiliation_id=affil_id,
-                    expert_panel_id=ep_id,
-                    type=type_name,
-                    full_name=name,
-                    short_name=external_short_name,
-                    status=status,
-                    clinical_domain_working_group=cdwg_obj,
-                    is_deleted=is_deleted,
+        rows = list(csv.DictReader(file))
+
+    cdwgs = {cdwg.name: cdwg for cdwg in ClinicalDomainWorkingGroup.objects.all()}
+    planned, errors = plan_rows(rows, cdwgs)
+    if errors:
+        for error in errors:
+            print(error)
+        print(f"{len(errors)} problem(s) found, nothing was loaded.")
+        return
+
+    new, skipped = skip_existing(planned)
+    submitters = sum(len(entry[1]) for entry in new)
+    coordinators = sum(len(entry[2]) for entry in new)
+    print(
+        f"{len(rows)} rows: {len(new)} affiliations to add, {skipped} already loaded,"
+        f" {submitters} submitters and {coordinators} coordinators to add."
+    )
+    if dry_run:
+        print("Dry run, nothing was loaded.")
+        return
+
+    load(new)
+    elapsed = time.perf_counter() - start
+    print(
+        f"Loaded {len(new)} affiliations from {len(rows)} rows in {elapsed:.2f}s"
+        f" ({len(rows) / elapsed:.0f} rows/sec)."
+    )
+
+
+def plan_rows(rows, cdwgs):
+    """Build the objects to add for each row, and collect any problems.
+
+    Returns a list of (affiliation, submitters, coordinators) tuples, and a list of
+    error messages.
+    """
+    planned = []
+    errors = []
+    # Row 1 is the header.
+    for line, row in enumerate(rows, start=2):
+        try:
+            planned.extend(plan_row(row, cdwgs))
+        except ValueError as error:
+            errors.append(f"Row {line}: {error}")
+    return planned, errors
+
+
+def plan_row(row, cdwgs):  # pylint: disable-msg=too-many-locals,too-many-branches
+    """Build the affiliations, submitters, and coordinators for one row."""
+    external_full_name = row["Affiliation Full Name"].strip()
+    external_short_name = row["short name"].strip()
+    affil_id = to_int(row["AffiliationID"].strip(), "AffiliationID")
+    coordinator_name = row["Coordinator(s)"].strip()
+    coordinator_email = row["Email"].strip()
+    clinvar_submitter_id = row["Submitter ID"]
+    vcep_ep_id = row["VCEP Affiliation ID"].strip()
+    vcep_full_name = row["VCEP Affiliation Name"].strip()
+    gcep_ep_id = row["GCEP Affiliation ID"].strip()
+    gcep_full_name = row["GCEP Affiliation Name"].strip()
+    status = row["Status"].strip()
+    cdwg = row["CDWG"].strip()
+    is_deleted = row["is_deleted"].strip()
+    is_deleted = is_deleted_value(is_deleted)
+
+    if cdwg not in cdwgs:
+        raise ValueError(f"CDWG {cdwg!r} does not exist.")
+    if status not in AffiliationStatus.values:
+        raise ValueError(f"{status!r} is not a valid status.")
+
+    coordinator_names = coordinator_name.split(",")
+    coordinator_emails = coordinator_email.split(",")
+
+    type_list = []
+    if gcep_ep_id:
+        if gcep_full_name == "":
+            gcep_full_name = external_full_name
+        type_list.append(
+            ("GCEP", to_int(gcep_ep_id, "GCEP Affiliation ID"), gcep_full_name)
+        )
+    if vcep_ep_id:
+        if vcep_full_name == "":
+            vcep_full_name = external_full_name
+        vcep_id = to_int(vcep_ep_id, "VCEP Affiliation ID")
+        if "SC-VCEP" in vcep_full_name:
+            type_list.append(("SC_VCEP", vcep_id, vcep_full_name))
+        else:
+            type_list.append(("VCEP", vcep_id, vcep_full_name))
+    if not gcep_ep_id and not vcep_ep_id:
+        type_list.append(("INDEPENDENT_CURATION", None, external_full_name))
+
+    planned = []
+    for type_name, ep_id, name in type_list:
+        affil = Affiliation(
+            affiliation_id=affil_id,
+            expert_panel_id=ep_id,
+            type=type_name,
+            full_name=name,
+            short_name=external_short_name,
+            status=status,
+            clinical_domain_working_group=cdwgs[cdwg],
+            is_deleted=is_deleted,
+        )
+        submitters = []
+        if clinvar_submitter_id != "":
+            submitters.append(
+                Submitter(affiliation=affil, clinvar_submitter_id=clinvar_submitter_id)
+            )
+        coordinators = []
+        for i, name in enumerate(coordinator_names):
+            # If email is is less than name list, the name will be added
+            # without any email fields.
+            if len(coordinator_emails) > i:
+                coordinators.append(
+                    Coordinator(
+                        affiliation=affil,
+                        coordinator_name=name,
+                        coordinator_email=coordinator_emails[i],
+                    )
                 )
-                if clinvar_submitter_id != "":
-                    Submitter.objects.create(
+            else:
+                coordinators.append(
+                    Coordinator(
                         affiliation=affil,
-                        clinvar_submitter_id=clinvar_submitter_id,
+                        coordinator_name=coordinator_names[i],
                     )
-                for i, name in enumerate(coordinator_names):
-                    # If email is is less than name list, the name will be added
-                    # without any email fields.
-                    if len(coordinator_emails) > i:
-                        Coordinator.objects.create(
-                            affiliation=affil,
-                            coordinator_name=name,
-                            coordinator_email=coordinator_emails[i],
-                        )
-                    else:
-                        Coordinator.objects.create(
-                            affiliation=affil,
-                            coordinator_name=coordinator_names[i],
-                        )
+                )
+        planned.append((affil, submitters, coordinators))
+    return planned
+
+
+def skip_existing(planned):
+    """Drop the affiliations that are already in the DB, or earlier in the file.
+
+    Returns the affiliations left to add, and how many were dropped.
+    """
+    seen = set(
+        Affiliation.objects.values_list("affiliation_id", "expert_panel_id", "type")
+    )
+    new = []
+    for entry in planned:
+        affil = entry[0]
+        key = (affil.affiliation_id, affil.expert_panel_id, affil.type)
+        if key not in seen:
+            seen.add(key)
+            new.append(entry)
+    return new, len(planned) - len(new)
+
+
+def load(planned):
+    """Add the affiliations with their submitters and coordinators, in chunks.
+
+    `bulk_create` doesn't send the signals that bump the dataset version and record
+    change events, so each chunk does both itself.
+    """
+    for chunk in batched(planned, CHUNK_SIZE):
+        with transaction.atomic():
+            Affiliation.objects.bulk_create(entry[0] for entry in chunk)
+            Submitter.objects.bulk_create(
+                submitter for entry in chunk for submitter in entry[1]
+            )
+            Coordinator.objects.bulk_create(
+                coordinator for entry in chunk for coordinator in entry[2]
+            )
+            bump_dataset_version()
+            record_changes(
+                [change_event(ChangeKind.CREATED, entry[0]) for entry in chunk]
+            )
+
+
+def to_int(value, column):
+    """Return the column's value as an integer."""
+    try:
+        return int(value)
+    except ValueError as error:
+        raise ValueError(f"{column} {value!r} is not a number.") from error
 
 
 def is_deleted_value(is_deleted):
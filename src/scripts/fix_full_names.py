@@ -6,43 +6,29 @@ imported UUIDs from the GPM, around August 14th. When we were importing UUIDs, w
 overwrote the full name and short name of the affiliation with the full name and short
 name from the GPM. This was bad because the GPM didn't have the GCEP and VCEP suffixes
 in the full names.
+
+You can run this script by running:
+`python manage.py runscript fix_full_names` in the command line from the directory.
+Pass `--script-args dry-run` to only print the names that would change.
 """
 
-from affiliations.models import Affiliation
+from django.db.models import F, Q, Value
+from django.db.models.functions import Concat
+
+from affiliations.data_fixes import DataFix, apply_fix, print_summary
 
 GCEP = "GCEP"
 VCEP = "VCEP"
 
 
-def add_suffix(full_name: str, suffix: str) -> str:
-    """Adds a suffix to the full name if necessary.
-
-    Args:
-        full_name: The full name of the affiliation.
-        suffix: The suffix to add.
-
-    Returns:
-        The full name of the affiliation with the suffix added if it needed to be added
-        or the original name otherwise.
-    """
-    if full_name[-4:] != suffix:
-        return f"{full_name} {suffix}"
-    return full_name
-
-
-def run() -> None:
-    """Iterates through affiliations adding the suffix if necessary."""
-    affiliations = Affiliation.objects.all()
-    for a in affiliations:
-        if a.type == GCEP:
-            print("before/after:")
-            print(f"\t{a.full_name}")
-            a.full_name = add_suffix(a.full_name, GCEP)
-            a.save()
-            print(f"\t{a.full_name}")
-        elif a.type == VCEP:
-            print("before/after:")
-            print(f"\t{a.full_name}")
-            a.full_name = add_suffix(a.full_name, VCEP)
-            a.save()
-            print(f"\t{a.full_name}")
+class AddTypeSuffix(DataFix):
+    """Add the 'GCEP' or 'VCEP' suffix to full names that are missing it."""
+
+    fields = ["full_name"]
+    filter = Q(type__in=[GCEP, VCEP]) & ~Q(full_name__endswith=F("type"))
+    update = {"full_name": Concat("full_name", Value(" "), "type")}
+
+
+def run(*args) -> None:
+    """Adds the suffix to the affiliations that need it, in a single update."""
+    print_summary(apply_fix(AddTypeSuffix(), dry_run="dry-run" in args))
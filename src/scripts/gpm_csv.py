@@ -0,0 +1,117 @@
+"""
+Compare affiliations with the GPM expert panel spreadsheet.
+
+Shared by the `add_uuid` and `check_uuid` scripts. Every affiliation is read once into
+an index keyed by `(expert_panel_id, type)`, so each spreadsheet row is matched in
+memory rather than with a query of its own.
+"""
+
+import csv
+import uuid
+from pathlib import Path
+
+from affiliations.models import Affiliation
+
+CSV_FILE = Path(__file__).parent / "gpm-expert-panel_custom.csv"
+
+# The affiliation fields that are filled in from the spreadsheet.
+FIELDS = ["uuid", "full_name", "short_name"]
+
+
+def read_rows(path=CSV_FILE):
+    """Return the spreadsheet's rows."""
+    with open(path, encoding="utf-8-sig") as file:
+        return list(csv.DictReader(file))
+
+
+def index_affiliations():
+    """Map each `(expert_panel_id, type)` to its affiliation.
+
+    If more than one affiliation has the same key, the oldest one is used.
+    """
+    index = {}
+    for affil in Affiliation.objects.order_by("pk"):
+        index.setdefault((affil.expert_panel_id, affil.type), affil)
+    return index
+
+
+def reconcile(rows, index):
+    """Work out what each row would change on its affiliation.
+
+    The affiliations that differ from the spreadsheet are changed in memory, but not
+    saved. Returns a report of the rows that are "updated", "unchanged", "missing"
+    (no affiliation matches), or have an "invalid_uuid".
+    """
+    report = {"updated": [], "unchanged": [], "missing": [], "invalid_uuid": []}
+    for row in rows:
+        uuid_value = row["UUID"].strip()
+        expert_panel_id = row["Affiliation ID"].strip()
+        type_value = row["EP Type"].strip()
+        entry = {"expert_panel_id": expert_panel_id, "type": type_value}
+
+        affil = index.get((to_int(expert_panel_id), type_value))
+        if affil is None:
+            report["missing"].append(entry)
+            continue
+        try:
+            new_values = {
+                "uuid": uuid.UUID(uuid_value),
+                "full_name": row["Long Name"].strip(),
+                "short_name": row["Short Name"].strip(),
+            }
+        except ValueError:
+            report["invalid_uuid"].append({**entry, "uuid": uuid_value})
+            continue
+
+        changes = {
+            field: (getattr(affil, field), value)
+            for field, value in new_values.items()
+            if getattr(affil, field) != value
+        }
+        if not changes:
+            report["unchanged"].append(entry)
+            continue
+        for field, (_, value) in changes.items():
+            setattr(affil, field, value)
+        report["updated"].append({**entry, "affiliation": affil, "changes": changes})
+    return report
+
+
+def changed_fields(report):
+    """Return the fields that any updated affiliation changes."""
+    fields = {field for entry in report["updated"] for field in entry["changes"]}
+    return [field for field in FIELDS if field in fields]
+
+
+def print_report(report, updated_label="updated"):
+    """Print how many rows fall under each heading, then the rows themselves."""
+    print(f"{len(report['updated'])} {updated_label}")
+    print(f"{len(report['unchanged'])} unchanged")
+    print(f"{len(report['missing'])} missing (no match found)")
+    print(f"{len(report['invalid_uuid'])} with an invalid UUID")
+
+    if report["updated"]:
+        print(f"\n{updated_label.capitalize()}:")
+        for entry in report["updated"]:
+            print(f" - ID: {entry['expert_panel_id']}, Type: {entry['type']}")
+            for field, (old, new) in entry["changes"].items():
+                print(f"     {field}: {old!r} -> {new!r}")
+    if report["missing"]:
+        print("\nMissing:")
+        for entry in report["missing"]:
+            print(f" - ID: {entry['expert_panel_id']}, Type: {entry['type']}")
+    if report["invalid_uuid"]:
+        print("\nInvalid UUID:")
+        for entry in report["invalid_uuid"]:
+            print(
+                f" - ID: {entry['expert_panel_id']}, Type: {entry['type']}:"
+                f" {entry['uuid']}"
+            )
+
+
+def to_int(value):
+    """Return the value as an integer, or None if it isn't a number."""
+    try:
+        return int(value)
+    except ValueError:
+        return None